@@ -0,0 +1,76 @@
+"""create_week_plan_jobs
+
+Revision ID: 5b7f3c2a9d14
+Revises: 91a2ce9e2eca
+Create Date: 2026-10-18 14:05:37.114392
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from advanced_alchemy.types import GUID, DateTimeUTC
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7f3c2a9d14"
+down_revision: Union[str, None] = "91a2ce9e2eca"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Like the week plans it references, this table is otherwise created by the app
+    # on start-up, so it may already exist, or week_plans may not exist yet.
+    table_names = sa.inspect(op.get_bind()).get_table_names()
+    if "week_plan_jobs" in table_names or "week_plans" not in table_names:
+        return
+
+    op.create_table(
+        "week_plan_jobs",
+        sa.Column("user_id", sa.String(length=100), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("stage", sa.String(length=32), nullable=False),
+        sa.Column("error", sa.String(length=1000), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column(
+            "available_at",
+            DateTimeUTC(timezone=True),
+            nullable=False,
+        ),
+        sa.Column("week_plan_id", GUID(length=16), nullable=True),
+        sa.Column("id", GUID(length=16), nullable=False),
+        sa.Column("sa_orm_sentinel", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at",
+            DateTimeUTC(timezone=True),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            DateTimeUTC(timezone=True),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["week_plan_id"],
+            ["week_plans.id"],
+            name=op.f("fk_week_plan_jobs_week_plan_id_week_plans"),
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_week_plan_jobs")),
+    )
+    op.create_index(
+        "ix_week_plan_jobs_status_available_at",
+        "week_plan_jobs",
+        ["status", "available_at"],
+    )
+    op.create_index(
+        "ix_week_plan_jobs_user_id_created_at",
+        "week_plan_jobs",
+        ["user_id", "created_at"],
+    )
+
+
+def downgrade() -> None:
+    if "week_plan_jobs" in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table("week_plan_jobs")
@@ -0,0 +1,39 @@
+"""add_exercise_result_idempotency_key
+
+Revision ID: 7f0c9d3e1a58
+Revises: e2d95b6a7c30
+Create Date: 2026-10-18 17:34:26.908153
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7f0c9d3e1a58"
+down_revision: Union[str, None] = "e2d95b6a7c30"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "exercise_results",
+        sa.Column("idempotency_key", sa.String(length=64), nullable=True),
+    )
+    op.create_index(
+        "ix_exercise_results_user_id_idempotency_key",
+        "exercise_results",
+        ["user_id", "idempotency_key"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_exercise_results_user_id_idempotency_key", table_name="exercise_results"
+    )
+    op.drop_column("exercise_results", "idempotency_key")
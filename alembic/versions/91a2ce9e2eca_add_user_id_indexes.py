@@ -0,0 +1,59 @@
+"""add_user_id_indexes
+
+Revision ID: 91a2ce9e2eca
+Revises: 3e8d9c1193c8
+Create Date: 2026-10-18 10:12:43.518204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "91a2ce9e2eca"
+down_revision: Union[str, None] = "3e8d9c1193c8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    # id is included so that pages ordered by (date, id) can be read from the index
+    "ix_exercise_results_user_id_date": (
+        "exercise_results",
+        ["user_id", "date", "id"],
+    ),
+    "ix_week_plans_user_id_created_at": ("week_plans", ["user_id", "created_at"]),
+}
+
+
+def _existing_indexes() -> dict[str, set[str]]:
+    # The week plan tables are created by the app on start-up rather than by a
+    # migration, so they may not exist yet on a fresh DB. In that case they will be
+    # created with these indexes from the models.
+    inspector = sa.inspect(op.get_bind())
+    return {
+        table_name: {
+            index["name"]
+            for index in inspector.get_indexes(table_name)
+            if index["name"] is not None
+        }
+        for table_name in inspector.get_table_names()
+    }
+
+
+def upgrade() -> None:
+    existing_indexes = _existing_indexes()
+    for index_name, (table_name, columns) in INDEXES.items():
+        if table_name not in existing_indexes:
+            continue
+        if index_name not in existing_indexes[table_name]:
+            op.create_index(index_name, table_name, columns)
+
+
+def downgrade() -> None:
+    existing_indexes = _existing_indexes()
+    for index_name, (table_name, _) in INDEXES.items():
+        if index_name in existing_indexes.get(table_name, set()):
+            op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,46 @@
+"""create_personal_records
+
+Revision ID: a3b6d2f94c17
+Revises: 7f0c9d3e1a58
+Create Date: 2026-10-18 19:02:51.336810
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from advanced_alchemy.types import DateTimeUTC
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3b6d2f94c17"
+down_revision: Union[str, None] = "7f0c9d3e1a58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The records of existing results are filled in by
+    # `python -m app.rebuild_personal_records`
+    op.create_table(
+        "personal_records",
+        sa.Column("user_id", sa.String(length=100), nullable=False),
+        sa.Column("exercise_id", sa.BigInteger(), nullable=False),
+        sa.Column("best_weight", sa.Float(), nullable=False),
+        sa.Column("best_estimated_one_rep_max", sa.Float(), nullable=False),
+        sa.Column("best_volume", sa.Float(), nullable=False),
+        sa.Column("updated_at", DateTimeUTC(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["exercise_id"],
+            ["exercises.id"],
+            name=op.f("fk_personal_records_exercise_id_exercises"),
+        ),
+        sa.PrimaryKeyConstraint(
+            "user_id", "exercise_id", name=op.f("pk_personal_records")
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("personal_records")
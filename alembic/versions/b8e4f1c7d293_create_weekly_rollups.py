@@ -0,0 +1,46 @@
+"""create_weekly_rollups
+
+Revision ID: b8e4f1c7d293
+Revises: a3b6d2f94c17
+Create Date: 2026-10-18 20:14:37.582044
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e4f1c7d293"
+down_revision: Union[str, None] = "a3b6d2f94c17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The rollups of existing results are filled in by
+    # `python -m app.verify_weekly_rollups --rebuild`
+    op.create_table(
+        "weekly_rollups",
+        sa.Column("user_id", sa.String(length=100), nullable=False),
+        sa.Column("exercise_id", sa.BigInteger(), nullable=False),
+        sa.Column("week_start", sa.Date(), nullable=False),
+        sa.Column("result_count", sa.Integer(), nullable=False),
+        sa.Column("sets", sa.Integer(), nullable=False),
+        sa.Column("reps", sa.Integer(), nullable=False),
+        sa.Column("volume", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["exercise_id"],
+            ["exercises.id"],
+            name=op.f("fk_weekly_rollups_exercise_id_exercises"),
+        ),
+        sa.PrimaryKeyConstraint(
+            "user_id", "exercise_id", "week_start", name=op.f("pk_weekly_rollups")
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("weekly_rollups")
@@ -0,0 +1,39 @@
+"""create_screening_verdicts
+
+Revision ID: c41e8a6f0b27
+Revises: 5b7f3c2a9d14
+Create Date: 2026-10-18 15:21:09.402716
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from advanced_alchemy.types import DateTimeUTC
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c41e8a6f0b27"
+down_revision: Union[str, None] = "5b7f3c2a9d14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The app may already have created this table on start-up
+    if "screening_verdicts" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "screening_verdicts",
+        sa.Column("user_id", sa.String(length=100), nullable=False),
+        sa.Column("prompt_hash", sa.String(length=64), nullable=False),
+        sa.Column("screened_at", DateTimeUTC(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", name=op.f("pk_screening_verdicts")),
+    )
+
+
+def downgrade() -> None:
+    if "screening_verdicts" in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table("screening_verdicts")
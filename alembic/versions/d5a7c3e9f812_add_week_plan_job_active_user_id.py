@@ -0,0 +1,65 @@
+"""add_week_plan_job_active_user_id
+
+Revision ID: d5a7c3e9f812
+Revises: b8e4f1c7d293
+Create Date: 2026-10-18 22:41:09.274316
+
+"""
+
+from typing import Any, Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a7c3e9f812"
+down_revision: Union[str, None] = "b8e4f1c7d293"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+week_plan_jobs = sa.table(
+    "week_plan_jobs",
+    sa.column("id"),
+    sa.column("user_id", sa.String),
+    sa.column("status", sa.String),
+    sa.column("created_at"),
+    sa.column("active_user_id", sa.String),
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "week_plan_jobs",
+        sa.Column("active_user_id", sa.String(length=100), nullable=True),
+    )
+
+    # Jobs in progress keep their user's id. If a user already has more than one,
+    # only the latest is marked, and the others still run but can't be reused.
+    bind = op.get_bind()
+    active_jobs = bind.execute(
+        sa.select(week_plan_jobs.c.id, week_plan_jobs.c.user_id)
+        .where(week_plan_jobs.c.status.in_(["pending", "running"]))
+        .order_by(week_plan_jobs.c.created_at.desc())
+    )
+    latest_job_ids: dict[str, Any] = {}
+    for job_id, user_id in active_jobs:
+        latest_job_ids.setdefault(user_id, job_id)
+    for user_id, job_id in latest_job_ids.items():
+        bind.execute(
+            sa.update(week_plan_jobs)
+            .where(week_plan_jobs.c.id == job_id)
+            .values(active_user_id=user_id)
+        )
+
+    op.create_index(
+        "ix_week_plan_jobs_active_user_id",
+        "week_plan_jobs",
+        ["active_user_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_week_plan_jobs_active_user_id", table_name="week_plan_jobs")
+    op.drop_column("week_plan_jobs", "active_user_id")
@@ -0,0 +1,158 @@
+"""create_app_managed_tables
+
+Revision ID: e2d95b6a7c30
+Revises: c41e8a6f0b27
+Create Date: 2026-10-18 16:48:52.730115
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from advanced_alchemy.types import GUID, DateTimeUTC
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2d95b6a7c30"
+down_revision: Union[str, None] = "c41e8a6f0b27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _audit_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", GUID(length=16), nullable=False),
+        sa.Column("sa_orm_sentinel", sa.Integer(), nullable=True),
+        sa.Column("created_at", DateTimeUTC(timezone=True), nullable=False),
+        sa.Column("updated_at", DateTimeUTC(timezone=True), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    # These tables used to be created by the app on start-up rather than by
+    # migrations, so they only need creating on DBs the app hasn't run against yet.
+    # After this, migrations create the whole schema.
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "user_profiles" not in existing_tables:
+        op.create_table(
+            "user_profiles",
+            sa.Column("user_id", sa.String(length=100), nullable=False),
+            sa.Column("age", sa.Integer(), nullable=False),
+            sa.Column("gender", sa.String(length=12), nullable=False),
+            sa.Column("number_of_days", sa.Integer(), nullable=False),
+            sa.Column("workout_duration", sa.Integer(), nullable=False),
+            sa.Column("fitness_level", sa.String(length=24), nullable=False),
+            sa.Column("goal", sa.String(length=1000), nullable=False),
+            sa.Column("injury_description", sa.String(length=1000), nullable=True),
+            sa.PrimaryKeyConstraint("user_id", name=op.f("pk_user_profiles")),
+        )
+
+    if "week_plans" not in existing_tables:
+        op.create_table(
+            "week_plans",
+            sa.Column("user_id", sa.String(length=100), nullable=False),
+            sa.Column("summary", sa.String(length=1000), nullable=False),
+            sa.Column("complete", sa.Boolean(), nullable=False),
+            *_audit_columns(),
+            sa.PrimaryKeyConstraint("id", name=op.f("pk_week_plans")),
+        )
+        op.create_index(
+            "ix_week_plans_user_id_created_at",
+            "week_plans",
+            ["user_id", "created_at"],
+        )
+
+    if "workout_plans" not in existing_tables:
+        op.create_table(
+            "workout_plans",
+            sa.Column("user_id", sa.String(length=100), nullable=False),
+            sa.Column("title", sa.String(length=100), nullable=False),
+            sa.Column("complete", sa.Boolean(), nullable=False),
+            sa.Column("week_plan_id", GUID(length=16), nullable=False),
+            *_audit_columns(),
+            sa.ForeignKeyConstraint(
+                ["week_plan_id"],
+                ["week_plans.id"],
+                name=op.f("fk_workout_plans_week_plan_id_week_plans"),
+            ),
+            sa.PrimaryKeyConstraint("id", name=op.f("pk_workout_plans")),
+        )
+
+    if "warm_up_plans" not in existing_tables:
+        op.create_table(
+            "warm_up_plans",
+            sa.Column("user_id", sa.String(length=100), nullable=False),
+            sa.Column("workout_plan_id", GUID(length=16), nullable=False),
+            sa.Column("description", sa.String(length=1000), nullable=False),
+            *_audit_columns(),
+            sa.ForeignKeyConstraint(
+                ["workout_plan_id"],
+                ["workout_plans.id"],
+                name=op.f("fk_warm_up_plans_workout_plan_id_workout_plans"),
+            ),
+            sa.PrimaryKeyConstraint("id", name=op.f("pk_warm_up_plans")),
+        )
+
+    if "exercise_plans" not in existing_tables:
+        op.create_table(
+            "exercise_plans",
+            sa.Column("user_id", sa.String(length=100), nullable=False),
+            sa.Column("workout_plan_id", GUID(length=16), nullable=False),
+            sa.Column("exercise_name", sa.String(length=100), nullable=False),
+            sa.Column("exercise_id", sa.Integer(), nullable=False),
+            sa.Column("complete", sa.Boolean(), nullable=False),
+            sa.Column("exercise_result_id", GUID(length=16), nullable=True),
+            sa.Column("weight", sa.Float(), nullable=True),
+            sa.Column("reps", sa.Integer(), nullable=True),
+            sa.Column("sets", sa.Integer(), nullable=True),
+            sa.Column("rpe", sa.Integer(), nullable=True),
+            *_audit_columns(),
+            sa.ForeignKeyConstraint(
+                ["workout_plan_id"],
+                ["workout_plans.id"],
+                name=op.f("fk_exercise_plans_workout_plan_id_workout_plans"),
+            ),
+            sa.ForeignKeyConstraint(
+                ["exercise_result_id"],
+                ["exercise_results.id"],
+                name=op.f("fk_exercise_plans_exercise_result_id_exercise_results"),
+            ),
+            sa.PrimaryKeyConstraint("id", name=op.f("pk_exercise_plans")),
+        )
+
+    # Skipped by its own migration if week_plans didn't exist yet
+    if "week_plan_jobs" not in existing_tables:
+        op.create_table(
+            "week_plan_jobs",
+            sa.Column("user_id", sa.String(length=100), nullable=False),
+            sa.Column("status", sa.String(length=16), nullable=False),
+            sa.Column("stage", sa.String(length=32), nullable=False),
+            sa.Column("error", sa.String(length=1000), nullable=True),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("available_at", DateTimeUTC(timezone=True), nullable=False),
+            sa.Column("week_plan_id", GUID(length=16), nullable=True),
+            *_audit_columns(),
+            sa.ForeignKeyConstraint(
+                ["week_plan_id"],
+                ["week_plans.id"],
+                name=op.f("fk_week_plan_jobs_week_plan_id_week_plans"),
+            ),
+            sa.PrimaryKeyConstraint("id", name=op.f("pk_week_plan_jobs")),
+        )
+        op.create_index(
+            "ix_week_plan_jobs_status_available_at",
+            "week_plan_jobs",
+            ["status", "available_at"],
+        )
+        op.create_index(
+            "ix_week_plan_jobs_user_id_created_at",
+            "week_plan_jobs",
+            ["user_id", "created_at"],
+        )
+
+
+def downgrade() -> None:
+    # The tables may hold data created before this migration, so they're kept
+    pass
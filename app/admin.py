@@ -0,0 +1,29 @@
+from litestar import Request, Router, get
+from litestar.datastructures import State
+from litestar.exceptions import NotAuthorizedException
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.db_pool import PoolStats, pool_stats
+from app.user_auth import AccessToken, User
+
+
+@get(path="/db_pool")
+async def get_db_pool(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+) -> PoolStats:
+    """Get the state of this process's DB connection pool"""
+    if not request.user.admin:
+        raise NotAuthorizedException("User does not have admin status")
+
+    engine = db_session.bind
+    if not isinstance(engine, AsyncEngine):
+        raise TypeError(f"Expected the session to be bound to an engine, not {engine}")
+    return pool_stats(engine.pool)
+
+
+admin_router = Router(
+    path="/api/admin",
+    route_handlers=[get_db_pool],
+    tags=["admin"],
+)
@@ -0,0 +1,237 @@
+"""
+Training load analytics over a user's exercise results.
+
+A user's results are loaded once into one NumPy array per column, and every metric
+is computed from those arrays without looping over the results in Python.
+"""
+
+import json
+from collections.abc import Iterable
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+from attrs import define
+from litestar import Request, Router, get
+from litestar.datastructures import State
+from litestar.exceptions import HTTPException
+from litestar.params import Parameter
+from pydantic import BaseModel
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.exercise_catalogue import ExerciseCatalogue
+from app.models.models import ExerciseResult
+from app.pagination import as_utc
+from app.user_auth import AccessToken, User
+
+# The muscle groups that each of the default exercises mainly works
+with open(Path(__file__).parent / "data/exercise_muscle_groups.json") as f:
+    MUSCLE_GROUPS: dict[str, list[str]] = json.load(f)
+# The group of exercises that aren't in MUSCLE_GROUPS, e.g. ones added by admins
+OTHER_MUSCLE_GROUP = "other"
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+# Assumed for results recorded without an RPE when weighting their load
+DEFAULT_RPE = 7
+DEFAULT_DAYS = 90
+MAX_DAYS = 5 * 366
+
+_EPOCH = date(1970, 1, 1)
+
+
+@define
+class ResultColumns:
+    """A user's results, as one array per column."""
+
+    # Days since 1970-01-01 of the results' UTC dates
+    days: np.ndarray
+    # sets x reps x weight
+    tonnage: np.ndarray
+    # NaN where no RPE was recorded
+    rpe: np.ndarray
+    # -1 where the result has no exercise
+    exercise_ids: np.ndarray
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[tuple[datetime, int, int, float, int | None, int | None]],
+    ) -> "ResultColumns":
+        """Build the columns from (date, sets, reps, weight, rpe, exercise_id) rows."""
+        columns = list(zip(*rows)) or [()] * 6
+        dates, sets, reps, weights, rpes, exercise_ids = columns
+        seconds = np.fromiter(
+            (as_utc(value).timestamp() for value in dates),
+            dtype=np.float64,
+            count=len(dates),
+        )
+        return cls(
+            days=(seconds // 86_400).astype(np.int64),
+            tonnage=(
+                np.array(sets, dtype=np.float64)
+                * np.array(reps, dtype=np.float64)
+                * np.array(weights, dtype=np.float64)
+            ),
+            # None becomes NaN
+            rpe=np.array(rpes, dtype=np.float64),
+            exercise_ids=np.array(
+                [
+                    -1 if exercise_id is None else exercise_id
+                    for exercise_id in exercise_ids
+                ],
+                dtype=np.int64,
+            ),
+        )
+
+
+async def load_result_columns(
+    db_session: AsyncSession,
+    user_id: str,
+    from_date: datetime | None = None,
+    to_date: datetime | None = None,
+) -> ResultColumns:
+    """Load a user's results in [from_date, to_date) with one query."""
+    query: Select[datetime, int, int, float, int | None, int | None] = select(
+        ExerciseResult.date,
+        ExerciseResult.sets,
+        ExerciseResult.reps,
+        ExerciseResult.weight,
+        ExerciseResult.rpe,
+        ExerciseResult.exercise_id,
+    ).where(ExerciseResult.user_id == user_id)
+    if from_date:
+        query = query.where(ExerciseResult.date >= as_utc(from_date))
+    if to_date:
+        query = query.where(ExerciseResult.date < as_utc(to_date))
+    return ResultColumns.from_rows(await db_session.execute(query))
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """The sum of each value and the window - 1 values before it."""
+    sums = np.cumsum(values)
+    sums[window:] -= sums[:-window].copy()
+    return sums
+
+
+class TrainingLoad(BaseModel):
+    from_date: date
+    # Each series has one entry per day from from_date
+    tonnage: list[float]
+    rpe_weighted_load: list[float]
+    tonnage_7_day: list[float]
+    tonnage_28_day: list[float]
+    # The mean daily RPE-weighted load of the last 7 days over that of the last 28,
+    # or None without any load in the last 28 days
+    acute_chronic_ratio: list[float | None]
+    # The tonnage of exercises working each muscle group, over all the days
+    muscle_group_volume: dict[str, float]
+
+
+def compute_training_load(
+    columns: ResultColumns,
+    from_date: date,
+    to_date: date,
+    exercise_names: dict[int, str],
+) -> TrainingLoad:
+    """
+    Compute daily training load series for the days in [from_date, to_date).
+
+    Rolling series include the days before from_date, so columns should include
+    results from CHRONIC_DAYS - 1 days earlier. The RPE-weighted load is the
+    tonnage scaled by RPE / 10.
+    """
+    first_day = (from_date - _EPOCH).days - (CHRONIC_DAYS - 1)
+    day_count = (to_date - _EPOCH).days - first_day
+
+    in_range = (columns.days >= first_day) & (columns.days < first_day + day_count)
+    offsets = columns.days[in_range] - first_day
+    tonnage = columns.tonnage[in_range]
+    rpe = np.nan_to_num(columns.rpe[in_range], nan=DEFAULT_RPE)
+
+    daily_tonnage = np.bincount(offsets, weights=tonnage, minlength=day_count)
+    daily_load = np.bincount(offsets, weights=tonnage * rpe / 10, minlength=day_count)
+    acute = _rolling_sum(daily_load, ACUTE_DAYS) / ACUTE_DAYS
+    chronic = _rolling_sum(daily_load, CHRONIC_DAYS) / CHRONIC_DAYS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(chronic > 0, acute / chronic, np.nan)
+
+    # Only the days from from_date are returned
+    shown = slice(CHRONIC_DAYS - 1, None)
+
+    # Volume is summed per exercise with the arrays, then shared out to the groups
+    in_window = in_range & (columns.days >= first_day + CHRONIC_DAYS - 1)
+    exercise_ids, exercise_indexes = np.unique(
+        columns.exercise_ids[in_window], return_inverse=True
+    )
+    exercise_volumes = np.bincount(
+        exercise_indexes,
+        weights=columns.tonnage[in_window],
+        minlength=len(exercise_ids),
+    )
+    muscle_group_volume: dict[str, float] = {}
+    for exercise_id, volume in zip(exercise_ids.tolist(), exercise_volumes.tolist()):
+        if exercise_id < 0:
+            continue
+        name = exercise_names.get(exercise_id)
+        for muscle_group in MUSCLE_GROUPS.get(name or "", [OTHER_MUSCLE_GROUP]):
+            muscle_group_volume[muscle_group] = (
+                muscle_group_volume.get(muscle_group, 0.0) + volume
+            )
+
+    return TrainingLoad(
+        from_date=from_date,
+        tonnage=daily_tonnage[shown].tolist(),
+        rpe_weighted_load=daily_load[shown].tolist(),
+        tonnage_7_day=_rolling_sum(daily_tonnage, ACUTE_DAYS)[shown].tolist(),
+        tonnage_28_day=_rolling_sum(daily_tonnage, CHRONIC_DAYS)[shown].tolist(),
+        acute_chronic_ratio=[
+            None if np.isnan(value) else value for value in ratio[shown].tolist()
+        ],
+        muscle_group_volume=dict(sorted(muscle_group_volume.items())),
+    )
+
+
+@get(path="/training_load")
+async def get_training_load(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    exercise_catalogue: ExerciseCatalogue,
+    from_date: date | None = Parameter(query="from", default=None),
+    to_date: date | None = Parameter(query="to", default=None),
+) -> TrainingLoad:
+    """
+    Get a user's daily training load, for the UTC days in [from, to).
+
+    By default this is the last 90 days, including today. The acute:chronic workload
+    ratio compares the RPE-weighted load of the last 7 and 28 days.
+    """
+    user = request.user
+    if to_date is None:
+        to_date = datetime.now(timezone.utc).date() + timedelta(days=1)
+    if from_date is None:
+        from_date = to_date - timedelta(days=DEFAULT_DAYS)
+    if not 0 < (to_date - from_date).days <= MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"from must be before to, and at most {MAX_DAYS} days before it",
+        )
+
+    history_from = from_date - timedelta(days=CHRONIC_DAYS - 1)
+    columns = await load_result_columns(
+        db_session,
+        user.user_id,
+        datetime.combine(history_from, time(), timezone.utc),
+        datetime.combine(to_date, time(), timezone.utc),
+    )
+    catalogue = await exercise_catalogue.get(db_session)
+    exercise_names = {id: name for name, id in catalogue.name_to_id.items()}
+    return compute_training_load(columns, from_date, to_date, exercise_names)
+
+
+analytics_router = Router(
+    path="/api/analytics",
+    route_handlers=[get_training_load],
+    tags=["analytics"],
+)
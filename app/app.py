@@ -4,17 +4,30 @@ from typing import Any
 from litestar import Litestar, get
 from litestar.config.cors import CORSConfig
 from litestar.contrib.sqlalchemy.plugins import SQLAlchemyPlugin
+from litestar.datastructures import State
+from litestar.di import Provide
 from litestar.logging import LoggingConfig
 from litestar.middleware import DefineMiddleware
 from litestar.openapi.config import OpenAPIConfig
 from litestar.openapi.plugins import ScalarRenderPlugin
 
+from app.admin import admin_router
+from app.analytics import analytics_router
+from app.exercise_catalogue import ExerciseCatalogue, provide_exercise_catalogue
 from app.exercise_results import exercise_result_router
 from app.exercises import exercise_router
+from app.personal_records import personal_record_router
+from app.progression import progression_router
+from app.query_instrumentation import (
+    QueryInstrumentationMiddleware,
+    install_query_listeners,
+)
 from app.sqlalchemy_async import on_startup, sqlalchemy_config
 from app.user_auth import MyAuthenticationMiddleware
 from app.user_profile import user_profile_router
+from app.week_plan_jobs import WeekPlanJobWorkers, provide_week_plan_job_workers
 from app.week_plans import week_plan_router
+from app.weekly_rollups import weekly_rollup_router
 
 
 @get("/", exclude_from_auth=True)
@@ -45,6 +58,13 @@ def create_app(
     # Allow local testing
     cors_config = CORSConfig(allow_origins=["http://localhost:3000"])
     auth_mw = DefineMiddleware(MyAuthenticationMiddleware, exclude=["/api/docs"])
+    install_query_listeners()
+
+    exercise_catalogue = ExerciseCatalogue()
+    week_plan_job_workers = WeekPlanJobWorkers(
+        anthropic_client_provider=dependencies["anthropic_client"],
+        exercise_catalogue=exercise_catalogue,
+    )
 
     return Litestar(
         route_handlers=[
@@ -52,11 +72,30 @@ def create_app(
             version,
             exercise_router,
             exercise_result_router,
+            personal_record_router,
+            weekly_rollup_router,
+            analytics_router,
+            progression_router,
             week_plan_router,
             user_profile_router,
+            admin_router,
         ],
-        dependencies=dependencies,
-        middleware=[auth_mw],
+        dependencies={
+            "exercise_catalogue": Provide(
+                provide_exercise_catalogue, sync_to_thread=False
+            ),
+            "week_plan_job_workers": Provide(
+                provide_week_plan_job_workers, sync_to_thread=False
+            ),
+            **dependencies,
+        },
+        state=State(
+            {
+                "exercise_catalogue": exercise_catalogue,
+                "week_plan_job_workers": week_plan_job_workers,
+            }
+        ),
+        middleware=[QueryInstrumentationMiddleware, auth_mw],
         openapi_config=OpenAPIConfig(
             title="Gym Track Core",
             path="/api/docs",
@@ -65,7 +104,8 @@ def create_app(
             render_plugins=[ScalarRenderPlugin()],
         ),
         cors_config=cors_config,
-        on_startup=[on_startup],
+        on_startup=[on_startup, week_plan_job_workers.start],
+        on_shutdown=[week_plan_job_workers.stop],
         logging_config=logging_config,
         plugins=[SQLAlchemyPlugin(config=sqlalchemy_config)],
     )
@@ -0,0 +1,77 @@
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any
+
+from attrs import define
+from pydantic import BaseModel
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, Pool, QueuePool
+
+from app.query_instrumentation import record_pool_wait
+
+
+@define
+class PoolMetrics:
+    checkouts: int = 0
+    timeouts: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+# QueuePool._do_get retries by calling itself, which shouldn't count as another wait
+_in_checkout: ContextVar[bool] = ContextVar("in_checkout", default=False)
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """A queue pool that records how long callers wait to check out a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        if _in_checkout.get():
+            return super()._do_get()
+
+        start = perf_counter()
+        token = _in_checkout.set(True)
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            _in_checkout.reset(token)
+            wait = perf_counter() - start
+            self.metrics.checkouts += 1
+            self.metrics.total_wait_seconds += wait
+            self.metrics.max_wait_seconds = max(self.metrics.max_wait_seconds, wait)
+            record_pool_wait(wait)
+
+
+class PoolStats(BaseModel):
+    pool_class: str
+    size: int | None = None
+    checked_in: int | None = None
+    checked_out: int | None = None
+    # Negative while the pool hasn't yet opened size connections
+    overflow: int | None = None
+    checkouts: int | None = None
+    timeouts: int | None = None
+    total_wait_seconds: float | None = None
+    max_wait_seconds: float | None = None
+
+
+def pool_stats(pool: Pool) -> PoolStats:
+    stats = PoolStats(pool_class=type(pool).__name__)
+    if isinstance(pool, QueuePool):
+        stats.size = pool.size()
+        stats.checked_in = pool.checkedin()
+        stats.checked_out = pool.checkedout()
+        stats.overflow = pool.overflow()
+    if isinstance(pool, TimedAsyncAdaptedQueuePool):
+        stats.checkouts = pool.metrics.checkouts
+        stats.timeouts = pool.metrics.timeouts
+        stats.total_wait_seconds = pool.metrics.total_wait_seconds
+        stats.max_wait_seconds = pool.metrics.max_wait_seconds
+    return stats
@@ -0,0 +1,33 @@
+import hashlib
+from typing import Any
+
+from litestar import Request, Response
+
+# Clients may store responses, but must revalidate them with their ETag before use
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Create a strong ETag from the values that identify a version of a resource."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header matches the current ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    candidates = {candidate.removeprefix("W/") for candidate in candidates}
+    return "*" in candidates or etag in candidates
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    return {"etag": etag, "cache-control": CACHE_CONTROL}
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(content=None, status_code=304, headers=etag_headers(etag))
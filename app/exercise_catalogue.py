@@ -0,0 +1,100 @@
+import os
+import time
+
+from attrs import define
+from litestar.datastructures import State
+from litestar.serialization import encode_json
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.etags import make_etag
+from app.llm.claude_prompts import workout_plan_system_prompt
+from app.models.models import Exercise
+
+# Seconds between checks that another replica hasn't changed the catalogue
+EXERCISE_CATALOGUE_REVALIDATE_SECONDS = float(
+    os.getenv("EXERCISE_CATALOGUE_REVALIDATE_SECONDS", "30")
+)
+
+
+@define(frozen=True)
+class CatalogueSnapshot:
+    version: str
+    name_to_id: dict[str, int]
+    response_body: bytes
+    etag: str
+    # Built once per version so that it's an identical, cacheable prefix for Claude
+    workout_plan_system_prompt: str
+
+
+class ExerciseCatalogue:
+    """
+    A process-local cache of the exercise catalogue.
+
+    Exercises are only ever added or deleted, so the count and maximum ID of the
+    exercises table identify a version of the catalogue. Writes through this process
+    invalidate the cache straight away, and writes through other replicas are picked
+    up by comparing that version at most every revalidate_after seconds.
+    """
+
+    def __init__(
+        self, revalidate_after: float = EXERCISE_CATALOGUE_REVALIDATE_SECONDS
+    ) -> None:
+        self.revalidate_after = revalidate_after
+        self._snapshot: CatalogueSnapshot | None = None
+        self._validated_at = 0.0
+
+    async def get(self, db_session: AsyncSession) -> CatalogueSnapshot:
+        if self._snapshot is not None:
+            if time.monotonic() - self._validated_at < self.revalidate_after:
+                return self._snapshot
+            if await self._current_version(db_session) == self._snapshot.version:
+                self._validated_at = time.monotonic()
+                return self._snapshot
+
+        self._snapshot = await self._load(db_session)
+        self._validated_at = time.monotonic()
+        return self._snapshot
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    @staticmethod
+    async def _current_version(db_session: AsyncSession) -> str:
+        count, max_id = (
+            await db_session.execute(
+                select(func.count(Exercise.id), func.max(Exercise.id))
+            )
+        ).one()
+        return f"{count}.{max_id or 0}"
+
+    async def _load(self, db_session: AsyncSession) -> CatalogueSnapshot:
+        version = await self._current_version(db_session)
+        exercises = list(
+            await db_session.scalars(select(Exercise).order_by(Exercise.id))
+        )
+        response_body = encode_json(
+            [
+                {
+                    "name": exercise.name,
+                    "video_link": exercise.video_link,
+                    "exercise_results": [],
+                    "id": exercise.id,
+                }
+                for exercise in exercises
+            ]
+        )
+        name_to_id = {str(exercise.name): exercise.id for exercise in exercises}
+        return CatalogueSnapshot(
+            version=version,
+            name_to_id=name_to_id,
+            response_body=response_body,
+            etag=make_etag(response_body.decode()),
+            workout_plan_system_prompt=workout_plan_system_prompt(
+                list(name_to_id.keys())
+            ),
+        )
+
+
+def provide_exercise_catalogue(state: State) -> ExerciseCatalogue:
+    return state.exercise_catalogue
@@ -1,11 +1,67 @@
+from datetime import date, datetime, timezone
+from uuid import UUID, uuid4
+
 from litestar import Request, Response, Router, delete, get, patch, post
+from litestar.contrib.sqlalchemy.dto import SQLAlchemyDTO
 from litestar.datastructures import State
-from sqlalchemy import select, update
-from sqlalchemy.exc import NoResultFound, StatementError
+from litestar.exceptions import HTTPException
+from litestar.params import Parameter
+from sqlalchemy import (
+    ColumnElement,
+    Result,
+    Select,
+    and_,
+    func,
+    insert,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError, NoResultFound, StatementError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.models import ExerciseResult, ExerciseResultCreate, ExerciseResultUpdate
+from app.models.models import (
+    Exercise,
+    ExerciseResult,
+    ExerciseResultBatchResult,
+    ExerciseResultCreate,
+    ExerciseResultsBatchCreate,
+    ExerciseResultStats,
+    ExerciseResultUpdate,
+    ExerciseWeeklyStats,
+)
+from app.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    as_utc,
+    decode_cursor,
+    encode_cursor,
+    parse_cursor_datetime,
+)
+from app.personal_records import (
+    Records,
+    add_to_personal_records,
+    remove_from_personal_records,
+)
+from app.sql_functions import iso_week_start
 from app.user_auth import AccessToken, User
+from app.weekly_rollups import Contribution, apply_to_weekly_rollups
+
+
+def _weekly_contributions(user_id: str, *results: dict) -> list[Contribution]:
+    """The contributions of results with exercises to their weeks' rollups."""
+    return [
+        Contribution.of_result(
+            user_id,
+            result["exercise_id"],
+            result["date"],
+            result["sets"],
+            result["reps"],
+            result["weight"],
+        )
+        for result in results
+        if result["exercise_id"] is not None
+    ]
 
 
 @post(path="")
@@ -23,14 +79,144 @@ async def post_exercise_results(
         reps=data.reps,
         weight=data.weight,
         rpe=data.rpe,
-        date=data.date,
+        # Set here rather than by default, so that its week is known
+        date=as_utc(data.date) if data.date else datetime.now(timezone.utc),
     )
     db_session.add(exercise_result)
+    if data.exercise_id is not None:
+        await add_to_personal_records(
+            db_session,
+            user.user_id,
+            data.exercise_id,
+            Records.of_result(data.sets, data.reps, data.weight, data.rpe),
+        )
+    await apply_to_weekly_rollups(
+        db_session,
+        _weekly_contributions(
+            user.user_id, {**data.model_dump(), "date": exercise_result.date}
+        ),
+    )
     await db_session.commit()
     await db_session.refresh(exercise_result)
     return str(exercise_result.id)
 
 
+@post(path="/batch")
+async def post_exercise_results_batch(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    data: ExerciseResultsBatchCreate,
+) -> list[ExerciseResultBatchResult]:
+    """
+    Create several exercise_results for a particular user at once.
+
+    Results are recorded in one transaction. A result whose idempotency_key has
+    already been recorded, e.g. by an earlier attempt at the same sync, isn't
+    recorded again, and the existing result's id is returned for it instead.
+    """
+    user = request.user
+    items = data.exercise_results
+
+    keys = [item.idempotency_key for item in items if item.idempotency_key]
+    if len(set(keys)) != len(keys):
+        raise HTTPException(
+            status_code=400, detail="Idempotency keys must be unique within a batch"
+        )
+
+    exercise_ids = {item.exercise_id for item in items if item.exercise_id is not None}
+    if exercise_ids:
+        found_ids = set(
+            await db_session.scalars(
+                select(Exercise.id).where(Exercise.id.in_(exercise_ids))
+            )
+        )
+        if missing_ids := exercise_ids - found_ids:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Exercises not found: {sorted(missing_ids)}",
+            )
+
+    # Retry once in case a concurrent retry of the same sync records some of the keys
+    for attempt in range(2):
+        existing_ids: dict[str, UUID] = {}
+        if keys:
+            existing: Result[str, UUID] = await db_session.execute(
+                select(ExerciseResult.idempotency_key, ExerciseResult.id).where(
+                    ExerciseResult.user_id == user.user_id,
+                    ExerciseResult.idempotency_key.in_(keys),
+                )
+            )
+            existing_ids = {key: id for key, id in existing}
+
+        now = datetime.now(timezone.utc)
+        results = []
+        rows = []
+        records: dict[int, Records] = {}
+        for item in items:
+            if item.idempotency_key in existing_ids:
+                results.append(
+                    ExerciseResultBatchResult(
+                        id=existing_ids[item.idempotency_key],
+                        idempotency_key=item.idempotency_key,
+                        created=False,
+                    )
+                )
+                continue
+
+            # Ids are generated up front so they needn't be read back after inserting
+            id = uuid4()
+            rows.append(
+                {
+                    "id": id,
+                    "user_id": user.user_id,
+                    "exercise_id": item.exercise_id,
+                    "sets": item.sets,
+                    "reps": item.reps,
+                    "weight": item.weight,
+                    "rpe": item.rpe,
+                    "date": as_utc(item.date) if item.date else now,
+                    "idempotency_key": item.idempotency_key,
+                }
+            )
+            if item.exercise_id is not None:
+                item_records = Records.of_result(
+                    item.sets, item.reps, item.weight, item.rpe
+                )
+                records[item.exercise_id] = (
+                    records[item.exercise_id].merge(item_records)
+                    if item.exercise_id in records
+                    else item_records
+                )
+            results.append(
+                ExerciseResultBatchResult(
+                    id=id, idempotency_key=item.idempotency_key, created=True
+                )
+            )
+
+        try:
+            if rows:
+                # Without render_nulls, rows with and without e.g. an RPE would be
+                # inserted by separate statements
+                await db_session.execute(
+                    insert(ExerciseResult).execution_options(render_nulls=True), rows
+                )
+            for exercise_id, exercise_records in records.items():
+                await add_to_personal_records(
+                    db_session, user.user_id, exercise_id, exercise_records
+                )
+            await apply_to_weekly_rollups(
+                db_session, _weekly_contributions(user.user_id, *rows)
+            )
+            await db_session.commit()
+            break
+        except IntegrityError:
+            await db_session.rollback()
+            if attempt:
+                raise
+
+    return results
+
+
 @delete(path="/{exercise_result_id:str}", status_code=200)
 async def delete_exercise_results(
     db_session: AsyncSession,
@@ -40,10 +226,11 @@ async def delete_exercise_results(
     """Create an exercise_result for a particular user."""
     try:
         user = request.user
+        # Locked so that a concurrent edit can't change what's taken away below
         exercise_result = await db_session.scalar(
-            select(ExerciseResult).filter_by(
-                id=exercise_result_id, user_id=user.user_id
-            )
+            select(ExerciseResult)
+            .filter_by(id=exercise_result_id, user_id=user.user_id)
+            .with_for_update()
         )
 
         if not exercise_result:
@@ -53,6 +240,35 @@ async def delete_exercise_results(
             )
 
         await db_session.delete(exercise_result)
+        await db_session.flush()
+        if exercise_result.exercise_id is not None:
+            await remove_from_personal_records(
+                db_session,
+                user.user_id,
+                exercise_result.exercise_id,
+                Records.of_result(
+                    exercise_result.sets,
+                    exercise_result.reps,
+                    exercise_result.weight,
+                    exercise_result.rpe,
+                ),
+            )
+        await apply_to_weekly_rollups(
+            db_session,
+            [
+                -contribution
+                for contribution in _weekly_contributions(
+                    user.user_id,
+                    {
+                        "exercise_id": exercise_result.exercise_id,
+                        "date": exercise_result.date,
+                        "sets": exercise_result.sets,
+                        "reps": exercise_result.reps,
+                        "weight": exercise_result.weight,
+                    },
+                )
+            ],
+        )
         await db_session.commit()
         return Response(
             {
@@ -84,28 +300,79 @@ async def update_exercise_results(
         user = request.user
 
         if set(data.model_dump().values()) != {None}:
-            print(
-                {
-                    field: value
-                    for field, value in data.model_dump().items()
-                    if value is not None
-                }
-            )
+            changes = {
+                field: value
+                for field, value in data.model_dump().items()
+                if value is not None
+            }
+            # The row is locked until the commit, so that a concurrent edit waits and
+            # then takes away this edit's contribution rather than the same old one
+            previous = (
+                await db_session.execute(
+                    select(
+                        ExerciseResult.exercise_id,
+                        ExerciseResult.sets,
+                        ExerciseResult.reps,
+                        ExerciseResult.weight,
+                        ExerciseResult.rpe,
+                        ExerciseResult.date,
+                    )
+                    .where(
+                        ExerciseResult.id == exercise_result_id,
+                        ExerciseResult.user_id == user.user_id,
+                    )
+                    .with_for_update()
+                )
+            ).one_or_none()
             await db_session.execute(
                 update(ExerciseResult)
                 .where(
                     ExerciseResult.id == exercise_result_id,
                     ExerciseResult.user_id == user.user_id,
                 )
-                .values(
-                    **{
-                        field: value
-                        for field, value in data.model_dump().items()
-                        if value is not None
-                    }
-                )
+                .values(**changes)
             )
 
+            if previous:
+                # The result may have moved to another exercise or week, so its old
+                # records and rollup are updated as if it was removed, and its new
+                # ones as if it was added
+                previous_result = previous._asdict()
+                current_result = {**previous_result, **changes}
+                if previous.exercise_id is not None:
+                    await remove_from_personal_records(
+                        db_session,
+                        user.user_id,
+                        previous.exercise_id,
+                        Records.of_result(
+                            previous.sets, previous.reps, previous.weight, previous.rpe
+                        ),
+                    )
+                if current_result["exercise_id"] is not None:
+                    await add_to_personal_records(
+                        db_session,
+                        user.user_id,
+                        current_result["exercise_id"],
+                        Records.of_result(
+                            current_result["sets"],
+                            current_result["reps"],
+                            current_result["weight"],
+                            current_result["rpe"],
+                        ),
+                    )
+                await apply_to_weekly_rollups(
+                    db_session,
+                    [
+                        *(
+                            -contribution
+                            for contribution in _weekly_contributions(
+                                user.user_id, previous_result
+                            )
+                        ),
+                        *_weekly_contributions(user.user_id, current_result),
+                    ],
+                )
+
             await db_session.commit()
             return Response(
                 {
@@ -126,18 +393,140 @@ async def update_exercise_results(
         )
 
 
-@get(path="")
+@get(path="", return_dto=SQLAlchemyDTO[ExerciseResult])
 async def get_exercise_results(
-    db_session: AsyncSession, request: Request[User, AccessToken, State]
-) -> list[ExerciseResult]:
-    """Get exercise_results for a particular user."""
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    limit: int | None = Parameter(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    from_date: datetime | None = Parameter(query="from", default=None),
+    to_date: datetime | None = Parameter(query="to", default=None),
+) -> Response[list[ExerciseResult]]:
+    """
+    Get exercise_results for a particular user, most recent first.
+
+    Results can be restricted to dates in [from, to). When a limit is given and there
+    are more results, the cursor for the next page is returned in the x-next-cursor
+    header.
+    """
     user = request.user
-    exercise_results = list(
-        await db_session.scalars(
-            select(ExerciseResult).where(ExerciseResult.user_id == user.user_id)
+    query = (
+        select(ExerciseResult)
+        .where(ExerciseResult.user_id == user.user_id)
+        .order_by(ExerciseResult.date.desc(), ExerciseResult.id.desc())
+    )
+    if from_date:
+        query = query.where(ExerciseResult.date >= as_utc(from_date))
+    if to_date:
+        query = query.where(ExerciseResult.date < as_utc(to_date))
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor, length=2)
+        after_date = parse_cursor_datetime(cursor_date)
+        try:
+            after_id = UUID(cursor_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(
+            or_(
+                ExerciseResult.date < after_date,
+                and_(ExerciseResult.date == after_date, ExerciseResult.id < after_id),
+            )
         )
+    if limit:
+        # Fetch one extra row to find out whether there is another page
+        query = query.limit(limit + 1)
+
+    exercise_results = list(await db_session.scalars(query))
+
+    headers = {}
+    if limit and len(exercise_results) > limit:
+        exercise_results = exercise_results[:limit]
+        last = exercise_results[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last.date, last.id)
+
+    return Response(exercise_results, headers=headers)
+
+
+def weekly_stats_query(
+    user_id: str, from_date: datetime | None = None, to_date: datetime | None = None
+) -> Select:
+    """
+    Aggregate a user's results by exercise and ISO week.
+
+    Only columns are selected, so the results are aggregated by the DB from the
+    (user_id, date) index range rather than loaded as ORM objects.
+    """
+    week_start = iso_week_start(ExerciseResult.date)
+    volume: ColumnElement[float] = (
+        ExerciseResult.weight * ExerciseResult.sets * ExerciseResult.reps
+    )
+    query = (
+        select(
+            ExerciseResult.exercise_id,
+            week_start.label("week_start"),
+            func.sum(volume).label("volume"),
+            func.sum(ExerciseResult.sets).label("sets"),
+            func.max(ExerciseResult.weight).label("max_weight"),
+        )
+        .where(ExerciseResult.user_id == user_id)
+        .group_by(ExerciseResult.exercise_id, week_start)
+        .order_by(ExerciseResult.exercise_id, week_start)
+    )
+    if from_date:
+        query = query.where(ExerciseResult.date >= as_utc(from_date))
+    if to_date:
+        query = query.where(ExerciseResult.date < as_utc(to_date))
+    return query
+
+
+@get(path="/stats")
+async def get_exercise_result_stats(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    from_date: datetime | None = Parameter(query="from", default=None),
+    to_date: datetime | None = Parameter(query="to", default=None),
+) -> ExerciseResultStats:
+    """
+    Get a user's weekly volume, sets and heaviest weight for each exercise.
+
+    Results can be restricted to dates in [from, to). Weeks are ISO weeks, starting
+    on Mondays, of the results' UTC dates.
+    """
+    user = request.user
+    rows = await db_session.execute(
+        weekly_stats_query(user.user_id, from_date, to_date)
+    )
+
+    exercises: list[ExerciseWeeklyStats] = []
+    tonnage: dict[date, float] = {}
+    for row in rows:
+        if not exercises or exercises[-1].exercise_id != row.exercise_id:
+            exercises.append(
+                ExerciseWeeklyStats(
+                    exercise_id=row.exercise_id,
+                    week_starts=[],
+                    volume=[],
+                    sets=[],
+                    max_weight=[],
+                    best_weight=0.0,
+                    best_volume=0.0,
+                )
+            )
+        stats = exercises[-1]
+        stats.week_starts.append(row.week_start)
+        stats.volume.append(row.volume)
+        stats.sets.append(row.sets)
+        stats.max_weight.append(row.max_weight)
+        stats.best_weight = max(stats.best_weight, row.max_weight)
+        stats.best_volume = max(stats.best_volume, row.volume)
+        tonnage[row.week_start] = tonnage.get(row.week_start, 0.0) + row.volume
+
+    week_starts = sorted(tonnage)
+    return ExerciseResultStats(
+        exercises=exercises,
+        week_starts=week_starts,
+        tonnage=[tonnage[week_start] for week_start in week_starts],
     )
-    return exercise_results
 
 
 @get(path="/{exercise_result_id:str}")
@@ -163,9 +552,11 @@ exercise_result_router = Router(
     path="/api/exercise_results",
     route_handlers=[
         post_exercise_results,
+        post_exercise_results_batch,
         delete_exercise_results,
         update_exercise_results,
         get_exercise_results,
+        get_exercise_result_stats,
         get_exercise_result,
     ],
     tags=["exercise_results"],
@@ -1,55 +1,154 @@
-from litestar import Request, Response, Router, delete, get, post
+from litestar import MediaType, Request, Response, Router, delete, get, post
 from litestar.datastructures import State
-from sqlalchemy import select
+from sqlalchemy import Result, func, insert, select
 from sqlalchemy.exc import IntegrityError, NoResultFound, StatementError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.models import Exercise, ExercisesCreate
+from app.etags import etag_headers, is_not_modified, not_modified_response
+from app.exercise_catalogue import ExerciseCatalogue
+from app.models.models import (
+    Exercise,
+    ExerciseCreate,
+    ExerciseCreateResult,
+    ExercisesCreate,
+)
 from app.user_auth import AccessToken, User
 
 
 @get(path="")
 async def get_exercises(
     db_session: AsyncSession,
-) -> list[Exercise]:
+    request: Request[User, AccessToken, State],
+    exercise_catalogue: ExerciseCatalogue,
+) -> Response[bytes]:
     """Get all exercises"""
-    return list(await db_session.scalars(select(Exercise)))
+    catalogue = await exercise_catalogue.get(db_session)
+    if is_not_modified(request, catalogue.etag):
+        return not_modified_response(catalogue.etag)
+
+    return Response(
+        catalogue.response_body,
+        media_type=MediaType.JSON,
+        headers=etag_headers(catalogue.etag),
+    )
+
+
+DUPLICATE_NAME_ERROR = "An exercise with that name already exists"
+
+
+def _name_key(name: str) -> str:
+    """
+    Names are compared regardless of case, as MySQL's collation does. They are
+    lowercased rather than casefolded to match SQL's LOWER().
+    """
+    return name.lower()
+
+
+async def _insert_exercises(
+    db_session: AsyncSession, exercises: list[ExerciseCreate]
+) -> dict[str, int]:
+    """
+    Insert the exercises with one multi-row INSERT, returning their ids by name.
+
+    The ids come back from the INSERT where the dialect supports RETURNING for
+    multi-row inserts, and otherwise from a single follow-up SELECT.
+    """
+    rows = [
+        {"name": exercise.name, "video_link": exercise.video_link}
+        for exercise in exercises
+    ]
+    # Without render_nulls, the ORM would split the rows into a statement per
+    # combination of non-null columns
+    insert_exercises = insert(Exercise).execution_options(render_nulls=True)
+    result: Result[int, str]
+    if db_session.get_bind().dialect.insert_executemany_returning:
+        result = await db_session.execute(
+            insert_exercises.returning(Exercise.id, Exercise.name), rows
+        )
+    else:
+        await db_session.execute(insert_exercises, rows)
+        result = await db_session.execute(
+            select(Exercise.id, Exercise.name).where(
+                Exercise.name.in_([exercise.name for exercise in exercises])
+            )
+        )
+    return {name: id for id, name in result}
 
 
 @post(path="")
 async def post_exercise(
     db_session: AsyncSession,
     request: Request[User, AccessToken, State],
+    exercise_catalogue: ExerciseCatalogue,
     data: ExercisesCreate,
-) -> list[Exercise]:
-    """Post an exercise"""
+) -> list[ExerciseCreateResult]:
+    """
+    Post exercises
+
+    Exercises whose names are already taken, in any case, are skipped and reported
+    as errors, while the rest of them are created.
+    """
     user = request.user
     if not user.admin:
         raise Exception("User does not have admin status")
 
-    exercises = [
-        Exercise(
-            name=exercise.name,
-            video_link=exercise.video_link,
+    keys = {_name_key(exercise.name) for exercise in data.exercises}
+    existing_ids: dict[str, int] = {}
+    created_ids: dict[str, int] = {}
+    # Retry once in case another request creates one of the names at the same time
+    for attempt in range(2):
+        existing: Result[str, int] = await db_session.execute(
+            select(Exercise.name, Exercise.id).where(
+                func.lower(Exercise.name).in_(keys)
+            )
         )
-        for exercise in data.exercises
-    ]
-    try:
-        for exercise in exercises:
-            db_session.add(exercise)
-        await db_session.commit()
-    except IntegrityError:
-        raise Exception("An exercise with that name already exists")
+        existing_ids = {_name_key(name): id for name, id in existing}
+        new_exercises: dict[str, ExerciseCreate] = {}
+        for exercise in data.exercises:
+            key = _name_key(exercise.name)
+            if key not in existing_ids:
+                new_exercises.setdefault(key, exercise)
+
+        try:
+            inserted_ids = (
+                await _insert_exercises(db_session, list(new_exercises.values()))
+                if new_exercises
+                else {}
+            )
+            created_ids = {_name_key(name): id for name, id in inserted_ids.items()}
+            await db_session.commit()
+            break
+        except IntegrityError:
+            await db_session.rollback()
+            if attempt:
+                raise Exception(DUPLICATE_NAME_ERROR)
 
-    for exercise in exercises:
-        await db_session.refresh(exercise)
-    return exercises
+    if created_ids:
+        exercise_catalogue.invalidate()
+
+    ids = existing_ids | created_ids
+    results = []
+    for exercise in data.exercises:
+        key = _name_key(exercise.name)
+        # Only the first of several exercises with the same name is created
+        created = new_exercises.get(key) is exercise
+        results.append(
+            ExerciseCreateResult(
+                name=exercise.name,
+                video_link=exercise.video_link,
+                id=ids[key],
+                created=created,
+                error=None if created else DUPLICATE_NAME_ERROR,
+            )
+        )
+    return results
 
 
 @delete(path="/{exercise_id:int}", status_code=200)
 async def delete_exercise(
     db_session: AsyncSession,
     request: Request[User, AccessToken, State],
+    exercise_catalogue: ExerciseCatalogue,
     exercise_id: int,
 ) -> Response | None:
     """Delete an exercise for a particular user."""
@@ -66,6 +165,7 @@ async def delete_exercise(
 
         await db_session.delete(exercise)
         await db_session.commit()
+        exercise_catalogue.invalidate()
 
         return Response(
             {"message": f"Exercise with ID {exercise_id} has been deleted."},
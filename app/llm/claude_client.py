@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from functools import cache
+from typing import Any, AsyncIterator
+
+import anthropic
+from anthropic.lib.streaming import AsyncMessageStream
+from anthropic.types import Message, TextBlockParam
+from litestar.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of in-flight Claude requests per process
+ANTHROPIC_MAX_CONCURRENCY = int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", "4"))
+# Seconds to wait for a free slot before telling the client to retry later
+ANTHROPIC_QUEUE_TIMEOUT = float(os.getenv("ANTHROPIC_QUEUE_TIMEOUT", "10"))
+# Seconds before a single Claude request is abandoned
+ANTHROPIC_REQUEST_TIMEOUT = float(os.getenv("ANTHROPIC_REQUEST_TIMEOUT", "120"))
+ANTHROPIC_MAX_RETRIES = int(os.getenv("ANTHROPIC_MAX_RETRIES", "2"))
+
+_concurrency_limit = asyncio.Semaphore(ANTHROPIC_MAX_CONCURRENCY)
+
+
+@cache
+def _anthropic_client() -> anthropic.AsyncAnthropic:
+    # Created lazily so that the API key has been exported by the time we need it,
+    # and shared so that requests reuse the same connection pool.
+    return anthropic.AsyncAnthropic(
+        timeout=ANTHROPIC_REQUEST_TIMEOUT,
+        max_retries=ANTHROPIC_MAX_RETRIES,
+    )
+
+
+async def provide_anthropic_client() -> anthropic.AsyncAnthropic:
+    return _anthropic_client()
+
+
+def cached_system_prompt(system_prompt: str) -> list[TextBlockParam]:
+    """
+    Mark a system prompt for prompt caching, so that repeated requests with the
+    same prompt reuse it instead of paying to process it again.
+    """
+    return [
+        {
+            "type": "text",
+            "text": system_prompt,
+            "cache_control": {"type": "ephemeral"},
+        }
+    ]
+
+
+def _log_usage(message: Message, elapsed: float) -> None:
+    usage = getattr(message, "usage", None)
+    if usage is None:
+        return
+
+    logger.info(
+        "Claude %s took %.2fs: %s input tokens, %s cache read tokens, "
+        "%s cache creation tokens, %s output tokens",
+        message.model,
+        elapsed,
+        usage.input_tokens,
+        usage.cache_read_input_tokens or 0,
+        usage.cache_creation_input_tokens or 0,
+        usage.output_tokens,
+    )
+
+
+async def _acquire_slot() -> None:
+    try:
+        async with asyncio.timeout(ANTHROPIC_QUEUE_TIMEOUT):
+            await _concurrency_limit.acquire()
+    except TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many workout plans are being generated, please try again shortly",
+        )
+
+
+async def create_message(
+    anthropic_client: anthropic.AsyncAnthropic, **kwargs: Any
+) -> Message:
+    """
+    Send a message to Claude without blocking the event loop.
+
+    The number of concurrent requests is capped so that a burst of plan requests
+    can't exhaust the pod, and callers that can't get a slot in time get a 503.
+    """
+    await _acquire_slot()
+    try:
+        start = time.perf_counter()
+        message = await anthropic_client.messages.create(**kwargs)
+        _log_usage(message, time.perf_counter() - start)
+        return message
+    except anthropic.APITimeoutError:
+        raise HTTPException(
+            status_code=504, detail="Timed out waiting for the workout plan"
+        )
+    finally:
+        _concurrency_limit.release()
+
+
+@asynccontextmanager
+async def stream_message(
+    anthropic_client: anthropic.AsyncAnthropic, **kwargs: Any
+) -> AsyncIterator[AsyncMessageStream]:
+    """Stream a message from Claude, subject to the same limits as create_message."""
+    await _acquire_slot()
+    try:
+        start = time.perf_counter()
+        async with anthropic_client.messages.stream(**kwargs) as stream:
+            yield stream
+            _log_usage(await stream.get_final_message(), time.perf_counter() - start)
+    except anthropic.APITimeoutError:
+        raise HTTPException(
+            status_code=504, detail="Timed out waiting for the workout plan"
+        )
+    finally:
+        _concurrency_limit.release()
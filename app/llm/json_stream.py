@@ -0,0 +1,56 @@
+import json
+import re
+from typing import Any
+
+WHITESPACE_AND_COMMAS = " \t\r\n,"
+
+
+class JSONArrayStreamParser:
+    """
+    Incrementally extracts the objects in a JSON array from streamed text.
+
+    Text is fed in as it arrives, and each object in the array held by the given
+    key is returned as soon as it is complete, so that it can be used before the
+    rest of the document has been generated.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.text = ""
+        self._array_start = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+        self._position: int | None = None
+        self._finished = False
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: str) -> list[Any]:
+        self.text += chunk
+        if self._finished:
+            return []
+
+        if self._position is None:
+            match = self._array_start.search(self.text)
+            if not match:
+                return []
+            self._position = match.end()
+
+        elements = []
+        while True:
+            position = self._position
+            while position < len(self.text) and self.text[position] in (
+                WHITESPACE_AND_COMMAS
+            ):
+                position += 1
+
+            if position >= len(self.text):
+                break
+            if self.text[position] == "]":
+                self._finished = True
+                break
+
+            try:
+                element, self._position = self._decoder.raw_decode(self.text, position)
+            except json.JSONDecodeError:
+                # The element hasn't been fully generated yet
+                break
+            elements.append(element)
+
+        return elements
@@ -4,7 +4,7 @@ import os
 from firebase_admin import initialize_app
 
 from app.app import create_app
-from app.week_plans import provide_anthropic_client
+from app.llm.claude_client import provide_anthropic_client
 
 
 def decode_kubernetes_secret_file():
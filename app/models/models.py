@@ -1,12 +1,24 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from enum import Enum
+from uuid import UUID
 
 from advanced_alchemy.types import GUID, DateTimeUTC
 from litestar.contrib.sqlalchemy.base import BigIntBase, UUIDAuditBase, orm_registry
+from litestar.dto import dto_field
 from pydantic import BaseModel, Field, model_validator
-from sqlalchemy import BigInteger, Boolean, Column, Float, ForeignKey, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 # Database Models ------------------------------------------------------------
@@ -36,25 +48,53 @@ class ExerciseCreate(BaseModel):
     video_link: str | None = None
 
 
+class ExerciseCreateResult(BaseModel):
+    """The outcome of creating one of the exercises in a request."""
+
+    name: str
+    video_link: str | None = None
+    # The id of the existing exercise if this one wasn't created
+    id: int
+    created: bool
+    error: str | None = None
+
+
 class ExerciseResult(UUIDAuditBase):
     __tablename__ = "exercise_results"
+    __table_args__ = (
+        Index("ix_exercise_results_user_id_date", "user_id", "date", "id"),
+        Index(
+            "ix_exercise_results_user_id_idempotency_key",
+            "user_id",
+            "idempotency_key",
+            unique=True,
+        ),
+    )
 
-    user_id = Column("user_id", String(length=100), nullable=False)
+    user_id: Mapped[str] = mapped_column("user_id", String(length=100), nullable=False)
 
-    exercise_id = Column(BigInteger, ForeignKey("exercises.id"))
+    exercise_id: Mapped[int | None] = mapped_column(
+        BigInteger, ForeignKey("exercises.id")
+    )
     exercise: Mapped[Exercise] = relationship(
         back_populates="exercise_results", lazy="joined"
     )
 
-    sets = Column("sets", Integer, nullable=False)
-    reps = Column("reps", Integer, nullable=False)
-    weight = Column("weight", Float, nullable=False)
-    rpe = Column("rpe", Integer())
+    sets: Mapped[int] = mapped_column("sets", Integer, nullable=False)
+    reps: Mapped[int] = mapped_column("reps", Integer, nullable=False)
+    weight: Mapped[float] = mapped_column("weight", Float, nullable=False)
+    rpe: Mapped[int | None] = mapped_column("rpe", Integer())
 
     date: Mapped[datetime] = mapped_column(
         DateTimeUTC(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
 
+    # Chosen by clients syncing results that were logged offline, so that retrying
+    # a sync doesn't record the same result twice
+    idempotency_key = Column(
+        "idempotency_key", String(length=64), nullable=True, info=dto_field("private")
+    )
+
 
 class UserProfileORM(Base):
     __tablename__ = "user_profiles"
@@ -69,14 +109,82 @@ class UserProfileORM(Base):
     injury_description = Column("injury_description", String(length=1_000))
 
 
+class ScreeningVerdictORM(Base):
+    """The last profile of a user's that screening accepted."""
+
+    __tablename__ = "screening_verdicts"
+
+    user_id = Column("user_id", String(length=100), primary_key=True, nullable=False)
+    # A hash of the screening model, prompt and the profile's prompt text
+    prompt_hash = Column("prompt_hash", String(length=64), nullable=False)
+    screened_at: Mapped[datetime] = mapped_column(
+        DateTimeUTC(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class PersonalRecordORM(Base):
+    """A user's best results for an exercise, kept up to date as results change."""
+
+    __tablename__ = "personal_records"
+
+    user_id: Mapped[str] = mapped_column(
+        "user_id", String(length=100), primary_key=True, nullable=False
+    )
+    exercise_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("exercises.id"), primary_key=True, nullable=False
+    )
+    best_weight: Mapped[float] = mapped_column("best_weight", Float, nullable=False)
+    best_estimated_one_rep_max: Mapped[float] = mapped_column(
+        "best_estimated_one_rep_max", Float, nullable=False
+    )
+    # The most sets x reps x weight in one result
+    best_volume: Mapped[float] = mapped_column("best_volume", Float, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTimeUTC(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class WeeklyRollupORM(Base):
+    """
+    A user's totals for an exercise in an ISO week, kept up to date as results change.
+
+    Only totals are kept, rather than e.g. maximums, so that a result's contribution
+    can be taken away again when it's edited or deleted.
+    """
+
+    __tablename__ = "weekly_rollups"
+
+    user_id: Mapped[str] = mapped_column(
+        "user_id", String(length=100), primary_key=True, nullable=False
+    )
+    exercise_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("exercises.id"), primary_key=True, nullable=False
+    )
+    # The Monday starting the week, of the results' UTC dates
+    week_start: Mapped[date] = mapped_column(
+        "week_start", Date, primary_key=True, nullable=False
+    )
+    result_count: Mapped[int] = mapped_column("result_count", Integer, nullable=False)
+    sets: Mapped[int] = mapped_column("sets", Integer, nullable=False)
+    # The sum of sets x reps
+    reps: Mapped[int] = mapped_column("reps", Integer, nullable=False)
+    # The sum of sets x reps x weight
+    volume: Mapped[float] = mapped_column("volume", Float, nullable=False)
+
+
 class WeekPlanORM(UUIDAuditBase):
     __tablename__ = "week_plans"
+    __table_args__ = (
+        Index("ix_week_plans_user_id_created_at", "user_id", "created_at"),
+    )
 
     user_id = Column("user_id", String(length=100), nullable=False)
     summary = Column("summary", String(length=1_000), nullable=False)
     complete = Column("complete", Boolean, nullable=False, default=False)
+    # Each level of a plan is loaded with one query for all of its parents, rather
+    # than joined, so that loading several plans doesn't multiply their rows
     workout_plans: Mapped[list[WorkoutPlanORM]] = relationship(
-        back_populates="week_plan", lazy="joined"
+        back_populates="week_plan", lazy="selectin"
     )
 
 
@@ -91,10 +199,10 @@ class WorkoutPlanORM(UUIDAuditBase):
         back_populates="workout_plans", lazy="noload"
     )
     warm_ups: Mapped[list[WarmUpPlanORM]] = relationship(
-        back_populates="workout_plan", lazy="joined"
+        back_populates="workout_plan", lazy="selectin"
     )
     exercise_plans: Mapped[list[ExercisePlanORM]] = relationship(
-        back_populates="workout_plan", lazy="joined"
+        back_populates="workout_plan", lazy="selectin"
     )
 
 
@@ -126,8 +234,9 @@ class ExercisePlanORM(UUIDAuditBase):
     exercise_result_id = Column(
         GUID, ForeignKey("exercise_results.id"), nullable=True, default=None
     )
+    # Not part of the API's plans, so it must be loaded explicitly when needed
     exercise_result: Mapped[ExerciseResult | None] = relationship(
-        lazy="joined", foreign_keys=[exercise_result_id]
+        lazy="raise", foreign_keys=[exercise_result_id]
     )
     weight = Column("weight", Float, nullable=True)
     reps = Column("reps", Integer, nullable=True)
@@ -135,6 +244,41 @@ class ExercisePlanORM(UUIDAuditBase):
     rpe = Column("rpe", Integer, nullable=True)
 
 
+class WeekPlanJobORM(UUIDAuditBase):
+    __tablename__ = "week_plan_jobs"
+    __table_args__ = (
+        Index("ix_week_plan_jobs_status_available_at", "status", "available_at"),
+        Index("ix_week_plan_jobs_user_id_created_at", "user_id", "created_at"),
+        Index("ix_week_plan_jobs_active_user_id", "active_user_id", unique=True),
+    )
+
+    user_id: Mapped[str] = mapped_column("user_id", String(length=100), nullable=False)
+    status: Mapped[str] = mapped_column(
+        "status", String(length=16), nullable=False, default="pending"
+    )
+    stage: Mapped[str] = mapped_column(
+        "stage", String(length=32), nullable=False, default="queued"
+    )
+    error: Mapped[str | None] = mapped_column(
+        "error", String(length=1_000), nullable=True
+    )
+    attempts: Mapped[int] = mapped_column(
+        "attempts", Integer, nullable=False, default=0
+    )
+    # Pending jobs aren't picked up before this time, so that retries back off
+    available_at: Mapped[datetime] = mapped_column(
+        DateTimeUTC(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    week_plan_id: Mapped[UUID | None] = mapped_column(
+        GUID, ForeignKey("week_plans.id"), nullable=True, default=None
+    )
+    # The user's id while the job is pending or running, so that a user can't have
+    # more than one job in progress
+    active_user_id: Mapped[str | None] = mapped_column(
+        "active_user_id", String(length=100), nullable=True, default=None
+    )
+
+
 # App Data Models ------------------------------------------------------------
 
 
@@ -147,6 +291,85 @@ class ExerciseResultCreate(BaseModel):
     date: datetime | None = None
 
 
+class ExerciseResultBatchItem(ExerciseResultCreate):
+    idempotency_key: str | None = Field(default=None, max_length=64)
+
+
+class ExerciseResultsBatchCreate(BaseModel):
+    exercise_results: list[ExerciseResultBatchItem] = Field(
+        min_length=1, max_length=200
+    )
+
+
+class ExerciseResultBatchResult(BaseModel):
+    id: UUID
+    idempotency_key: str | None = None
+    # False if a result with the same idempotency key had already been recorded
+    created: bool
+
+
+class ExerciseWeeklyStats(BaseModel):
+    """Weekly series for one exercise, with one entry per week it was done in."""
+
+    exercise_id: int | None
+    week_starts: list[date]
+    # The sum of sets x reps x weight
+    volume: list[float]
+    sets: list[int]
+    max_weight: list[float]
+    best_weight: float
+    best_volume: float
+
+
+class ExerciseResultStats(BaseModel):
+    exercises: list[ExerciseWeeklyStats]
+    # The volume of all exercises, for each week any were done in
+    week_starts: list[date]
+    tonnage: list[float]
+
+
+class PersonalRecord(BaseModel):
+    exercise_id: int
+    best_weight: float
+    best_estimated_one_rep_max: float
+    best_volume: float
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class WeeklyRollup(BaseModel):
+    exercise_id: int
+    week_start: date
+    result_count: int
+    sets: int
+    reps: int
+    volume: float
+
+    model_config = {"from_attributes": True}
+
+
+class ProgressionReason(str, Enum):
+    # There's no result for the plan yet, so its targets stand
+    planned = "planned"
+    increase = "increase"
+    repeat = "repeat"
+    reduce = "reduce"
+    deload = "deload"
+
+
+class ProgressionSuggestion(BaseModel):
+    exercise_id: int
+    exercise_name: str
+    sets: int | None
+    reps: int | None
+    weight: float | None
+    rpe: int | None
+    reason: ProgressionReason
+    # The result that the suggestion progresses from, if any
+    exercise_result_id: UUID | None = None
+
+
 class ExerciseResultUpdate(BaseModel):
     exercise_id: int | None = None
     sets: int | None = None
@@ -160,6 +383,18 @@ class WeekPlansResponse(BaseModel):
     week_plans: list[WeekPlan]
 
 
+class WeekPlanSummary(BaseModel):
+    """A week plan without its workouts, which can be fetched by its id."""
+
+    id: UUID
+    summary: str
+    complete: bool
+    created_at: datetime
+    workout_count: int
+    completed_workout_count: int
+    exercise_count: int
+
+
 class WeekPlan(BaseModel):
     summary: str
     complete: bool = False
@@ -198,6 +433,32 @@ class ExercisePlan(BaseModel):
     model_config = {"from_attributes": True, "populate_by_name": True}
 
 
+class WeekPlanJobStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class WeekPlanJobStage(str, Enum):
+    queued = "queued"
+    screening = "screening"
+    generating = "generating"
+    done = "done"
+
+
+class WeekPlanJob(BaseModel):
+    id: UUID
+    status: WeekPlanJobStatus
+    stage: WeekPlanJobStage
+    error: str | None = None
+    week_plan_id: UUID | None = None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
 class ScreeningStatus(str, Enum):
     accepted = "accepted"
     rejected = "rejected"
@@ -229,6 +490,19 @@ class UserProfileCreate(BaseModel):
     injury_description: str | None = None
 
 
+class UserProfile(BaseModel):
+    user_id: str
+    age: int
+    gender: Gender
+    number_of_days: int
+    workout_duration: int
+    fitness_level: FitnessLevel
+    goal: str
+    injury_description: str | None = None
+
+    model_config = {"from_attributes": True}
+
+
 class UserProfileUpdate(BaseModel):
     age: int | None = None
     gender: Gender | None = None
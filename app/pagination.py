@@ -0,0 +1,45 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import Any
+
+from litestar.exceptions import HTTPException
+
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "x-next-cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row in a page as an opaque cursor."""
+    serialized = [
+        value.isoformat() if isinstance(value, datetime) else str(value)
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(serialized).encode()).decode()
+
+
+def decode_cursor(cursor: str, length: int) -> list[str]:
+    """Decode a cursor created by encode_cursor, rejecting anything malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != length:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def parse_cursor_datetime(value: str) -> datetime:
+    try:
+        return as_utc(datetime.fromisoformat(value))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes from query parameters as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
@@ -0,0 +1,294 @@
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from typing import Any, cast
+
+from attrs import define
+from litestar import Request, Router, get
+from litestar.datastructures import State
+from litestar.exceptions import HTTPException
+from sqlalchemy import CursorResult, Result, Row, case, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import ExerciseResult, PersonalRecord, PersonalRecordORM
+from app.user_auth import AccessToken, User
+
+# RPEs below this are too rough a guide to how many more reps could have been done
+MIN_RPE = 6
+
+
+def estimated_one_rep_max(weight: float, reps: int, rpe: int | None = None) -> float:
+    """
+    Estimate the most weight that could be lifted for one rep.
+
+    A set stopped short of failure counts for the reps left in reserve as well, i.e.
+    10 - RPE. Brzycki's formula is used up to 10 reps and Epley's beyond that, where
+    Brzycki's overestimates. The two agree at 10 reps.
+    """
+    reps_in_reserve = 10 - max(min(rpe, 10), MIN_RPE) if rpe is not None else 0
+    reps_to_failure = reps + reps_in_reserve
+    if reps_to_failure <= 1:
+        return weight
+    if reps_to_failure <= 10:
+        return weight * 36 / (37 - reps_to_failure)
+    return weight * (1 + reps_to_failure / 30)
+
+
+@define
+class Records:
+    best_weight: float
+    best_estimated_one_rep_max: float
+    best_volume: float
+
+    @classmethod
+    def of_result(
+        cls, sets: int, reps: int, weight: float, rpe: int | None = None
+    ) -> "Records":
+        return cls(
+            best_weight=weight,
+            best_estimated_one_rep_max=estimated_one_rep_max(weight, reps, rpe),
+            best_volume=sets * reps * weight,
+        )
+
+    def merge(self, other: "Records") -> "Records":
+        return Records(
+            best_weight=max(self.best_weight, other.best_weight),
+            best_estimated_one_rep_max=max(
+                self.best_estimated_one_rep_max, other.best_estimated_one_rep_max
+            ),
+            best_volume=max(self.best_volume, other.best_volume),
+        )
+
+    def sets_any_of(self, other: "Records") -> bool:
+        """Whether any of these records are at least as good as the other's."""
+        return (
+            self.best_weight >= other.best_weight
+            or self.best_estimated_one_rep_max >= other.best_estimated_one_rep_max
+            or self.best_volume >= other.best_volume
+        )
+
+
+def _records_of_results(
+    results: Iterable[Row[int, int, float, int | None]],
+) -> Records | None:
+    records = None
+    for sets, reps, weight, rpe in results:
+        result_records = Records.of_result(sets, reps, weight, rpe)
+        records = records.merge(result_records) if records else result_records
+    return records
+
+
+def _better(column, value: float):
+    return case((column < value, value), else_=column)
+
+
+async def add_to_personal_records(
+    db_session: AsyncSession, user_id: str, exercise_id: int, records: Records
+) -> None:
+    """
+    Raise a user's records for an exercise to include a new result's.
+
+    The records are compared and raised by the DB, so that concurrent results can't
+    overwrite each other's records.
+    """
+    await _upsert_personal_record(
+        db_session,
+        user_id,
+        exercise_id,
+        records,
+        best_weight=_better(PersonalRecordORM.best_weight, records.best_weight),
+        best_estimated_one_rep_max=_better(
+            PersonalRecordORM.best_estimated_one_rep_max,
+            records.best_estimated_one_rep_max,
+        ),
+        best_volume=_better(PersonalRecordORM.best_volume, records.best_volume),
+    )
+
+
+async def _upsert_personal_record(
+    db_session: AsyncSession,
+    user_id: str,
+    exercise_id: int,
+    records: Records,
+    **changes: Any,
+) -> None:
+    """Update a user's record for an exercise with changes, or create it as records."""
+    now = datetime.now(timezone.utc)
+    update_record = (
+        update(PersonalRecordORM)
+        .where(
+            PersonalRecordORM.user_id == user_id,
+            PersonalRecordORM.exercise_id == exercise_id,
+        )
+        .values(**changes, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    # Retry once in case a concurrent result creates the user's first record
+    for attempt in range(2):
+        result = cast(CursorResult, await db_session.execute(update_record))
+        if result.rowcount:
+            return
+        try:
+            async with db_session.begin_nested():
+                await db_session.execute(
+                    insert(PersonalRecordORM).values(
+                        user_id=user_id,
+                        exercise_id=exercise_id,
+                        best_weight=records.best_weight,
+                        best_estimated_one_rep_max=records.best_estimated_one_rep_max,
+                        best_volume=records.best_volume,
+                        updated_at=now,
+                    )
+                )
+            return
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+async def refresh_personal_record(
+    db_session: AsyncSession, user_id: str, exercise_id: int
+) -> None:
+    """
+    Recompute a user's records for an exercise from all of their results.
+
+    The record is created if it's missing, e.g. before records were first rebuilt,
+    and removed if there are no results left.
+    """
+    results: Result[int, int, float, int | None] = await db_session.execute(
+        select(
+            ExerciseResult.sets,
+            ExerciseResult.reps,
+            ExerciseResult.weight,
+            ExerciseResult.rpe,
+        ).where(
+            ExerciseResult.user_id == user_id,
+            ExerciseResult.exercise_id == exercise_id,
+        )
+    )
+    records = _records_of_results(results)
+    if records is None:
+        await db_session.execute(
+            delete(PersonalRecordORM).where(
+                PersonalRecordORM.user_id == user_id,
+                PersonalRecordORM.exercise_id == exercise_id,
+            )
+        )
+        return
+
+    await _upsert_personal_record(
+        db_session,
+        user_id,
+        exercise_id,
+        records,
+        best_weight=records.best_weight,
+        best_estimated_one_rep_max=records.best_estimated_one_rep_max,
+        best_volume=records.best_volume,
+    )
+
+
+async def remove_from_personal_records(
+    db_session: AsyncSession, user_id: str, exercise_id: int, records: Records
+) -> None:
+    """
+    Update a user's records for an exercise after one of their results is removed.
+
+    The records are only recomputed if the removed result set one of them, or if
+    there's no record yet, in which case it's created from the remaining results.
+    """
+    current: Row[float, float, float] | None = (
+        await db_session.execute(
+            select(
+                PersonalRecordORM.best_weight,
+                PersonalRecordORM.best_estimated_one_rep_max,
+                PersonalRecordORM.best_volume,
+            ).where(
+                PersonalRecordORM.user_id == user_id,
+                PersonalRecordORM.exercise_id == exercise_id,
+            )
+        )
+    ).one_or_none()
+    if current is None or records.sets_any_of(Records(*current)):
+        await refresh_personal_record(db_session, user_id, exercise_id)
+
+
+async def rebuild_personal_records(db_session: AsyncSession) -> int:
+    """Recompute every user's records from their results, returning how many."""
+    records: dict[tuple[str, int], Records] = {}
+    results = await db_session.stream(
+        select(
+            ExerciseResult.user_id,
+            ExerciseResult.exercise_id,
+            ExerciseResult.sets,
+            ExerciseResult.reps,
+            ExerciseResult.weight,
+            ExerciseResult.rpe,
+        )
+        .where(ExerciseResult.exercise_id.is_not(None))
+        .execution_options(yield_per=1_000)
+    )
+    async for user_id, exercise_id, sets, reps, weight, rpe in results:
+        result_records = Records.of_result(sets, reps, weight, rpe)
+        # Results without an exercise were filtered out
+        key = (user_id, cast(int, exercise_id))
+        records[key] = (
+            records[key].merge(result_records) if key in records else result_records
+        )
+
+    now = datetime.now(timezone.utc)
+    await db_session.execute(delete(PersonalRecordORM))
+    if records:
+        await db_session.execute(
+            insert(PersonalRecordORM),
+            [
+                {
+                    "user_id": user_id,
+                    "exercise_id": exercise_id,
+                    "best_weight": exercise_records.best_weight,
+                    "best_estimated_one_rep_max": (
+                        exercise_records.best_estimated_one_rep_max
+                    ),
+                    "best_volume": exercise_records.best_volume,
+                    "updated_at": now,
+                }
+                for (user_id, exercise_id), exercise_records in records.items()
+            ],
+        )
+    await db_session.commit()
+    return len(records)
+
+
+@get(path="")
+async def get_personal_records(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+) -> list[PersonalRecord]:
+    """Get a user's best weight, estimated 1RM and volume for each exercise"""
+    user = request.user
+    records = await db_session.scalars(
+        select(PersonalRecordORM)
+        .where(PersonalRecordORM.user_id == user.user_id)
+        .order_by(PersonalRecordORM.exercise_id)
+    )
+    return [PersonalRecord.model_validate(record) for record in records]
+
+
+@get(path="/{exercise_id:int}")
+async def get_personal_record(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    exercise_id: int,
+) -> PersonalRecord:
+    """Get a user's best weight, estimated 1RM and volume for an exercise"""
+    user = request.user
+    record = await db_session.get(PersonalRecordORM, (user.user_id, exercise_id))
+    if not record:
+        raise HTTPException(status_code=404, detail="Personal record not found")
+    return PersonalRecord.model_validate(record)
+
+
+personal_record_router = Router(
+    path="/api/personal_records",
+    route_handlers=[get_personal_records, get_personal_record],
+    tags=["personal_records"],
+)
@@ -0,0 +1,282 @@
+"""
+Suggest what to lift next for each exercise of a user's latest week plan.
+
+Suggestions follow fixed rules from the plan's targets and how the last session of
+each exercise went, so they need a couple of queries rather than an LLM call.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from attrs import define, evolve
+from litestar import Request, Router, get
+from litestar.datastructures import State
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.models import (
+    ExercisePlanORM,
+    ExerciseResult,
+    ProgressionReason,
+    ProgressionSuggestion,
+    WeekPlanORM,
+    WorkoutPlanORM,
+)
+from app.personal_records import estimated_one_rep_max
+from app.user_auth import AccessToken, User
+
+# The RPE that sets are aimed at when a plan doesn't give one
+TARGET_RPE = 8
+# Weights are rounded to what can be loaded with the smallest plates
+WEIGHT_STEP = 2.5
+# Each step of progression adds this fraction of the weight, or WEIGHT_STEP if more
+INCREASE = 0.025
+# For sets that were much harder than planned
+REDUCE = 0.05
+# A deload follows a missed target once this many results haven't made progress
+STALL_RESULTS = 3
+DELOAD = 0.1
+
+
+@define
+class Target:
+    sets: int | None
+    reps: int | None
+    weight: float | None
+    rpe: int | None
+
+
+@define
+class Outcome:
+    id: UUID
+    sets: int
+    reps: int
+    weight: float
+    rpe: int | None
+    date: datetime
+
+    @property
+    def estimated_one_rep_max(self) -> float:
+        return estimated_one_rep_max(self.weight, self.reps, self.rpe)
+
+
+def round_weight(weight: float, down: bool = False) -> float:
+    steps = weight / WEIGHT_STEP
+    return max((int(steps) if down else round(steps)) * WEIGHT_STEP, 0.0)
+
+
+def is_stalled(recent: list[Outcome]) -> bool:
+    """Whether none of the last STALL_RESULTS results, newest first, beat the oldest."""
+    if len(recent) < STALL_RESULTS:
+        return False
+    *newer, oldest = recent[:STALL_RESULTS]
+    return all(
+        outcome.estimated_one_rep_max <= oldest.estimated_one_rep_max
+        for outcome in newer
+    )
+
+
+def next_session(
+    target: Target, outcome: Outcome | None, stalled: bool = False
+) -> tuple[Target, ProgressionReason]:
+    """
+    Progress from a plan's targets and how the last session went.
+
+    Missing the target sets or reps repeats the weight, or deloads it if progress has
+    stalled. Otherwise the RPE decides: sets that felt easier than planned add weight,
+    in two steps if they were at least 2 RPE easier, and sets that were harder hold or
+    reduce it. Without a recorded RPE, the session is taken to have gone as planned.
+    Bodyweight exercises add reps rather than weight.
+    """
+    if outcome is None:
+        return target, ProgressionReason.planned
+
+    sets = target.sets or outcome.sets
+    reps = target.reps or outcome.reps
+    planned = Target(sets=sets, reps=reps, weight=outcome.weight, rpe=target.rpe)
+
+    if outcome.sets < sets or outcome.reps < reps:
+        if stalled:
+            deload_weight = round_weight(outcome.weight * (1 - DELOAD), down=True)
+            return evolve(planned, weight=deload_weight), ProgressionReason.deload
+        return planned, ProgressionReason.repeat
+
+    target_rpe = target.rpe if target.rpe is not None else TARGET_RPE
+    rpe = outcome.rpe if outcome.rpe is not None else target_rpe
+    effort_in_hand = target_rpe - rpe
+    if effort_in_hand <= -2:
+        reduced_weight = round_weight(outcome.weight * (1 - REDUCE), down=True)
+        return evolve(planned, weight=reduced_weight), ProgressionReason.reduce
+    if effort_in_hand == -1:
+        return planned, ProgressionReason.repeat
+
+    steps = 2 if effort_in_hand >= 2 else 1
+    if outcome.weight <= 0:
+        return (
+            evolve(planned, reps=max(reps, outcome.reps) + steps),
+            ProgressionReason.increase,
+        )
+    weight = outcome.weight
+    for _ in range(steps):
+        weight = max(round_weight(weight * (1 + INCREASE)), weight + WEIGHT_STEP)
+    return evolve(planned, weight=weight), ProgressionReason.increase
+
+
+async def suggest_progressions(
+    db_session: AsyncSession, user_id: str, exercise_id: int | None = None
+) -> list[ProgressionSuggestion]:
+    """
+    Suggest the next session of each exercise in a user's latest week plan.
+
+    An exercise plan's outcome is its linked result, or else the user's latest result
+    for the exercise since the week plan was made. Where an exercise is planned more
+    than once, the plan with the latest outcome is progressed from.
+    """
+    latest_week_plan_id = (
+        select(WeekPlanORM.id)
+        .where(WeekPlanORM.user_id == user_id)
+        .order_by(WeekPlanORM.created_at.desc(), WeekPlanORM.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    linked = aliased(ExerciseResult)
+    plans_query: Select[*tuple[Any, ...]] = (
+        select(
+            ExercisePlanORM.exercise_id,
+            ExercisePlanORM.exercise_name,
+            ExercisePlanORM.sets,
+            ExercisePlanORM.reps,
+            ExercisePlanORM.weight,
+            ExercisePlanORM.rpe,
+            WeekPlanORM.created_at.label("planned_at"),
+            linked.id.label("result_id"),
+            linked.sets.label("result_sets"),
+            linked.reps.label("result_reps"),
+            linked.weight.label("result_weight"),
+            linked.rpe.label("result_rpe"),
+            linked.date.label("result_date"),
+        )
+        .join(WorkoutPlanORM, WorkoutPlanORM.id == ExercisePlanORM.workout_plan_id)
+        .join(WeekPlanORM, WeekPlanORM.id == WorkoutPlanORM.week_plan_id)
+        .outerjoin(
+            linked,
+            (linked.id == ExercisePlanORM.exercise_result_id)
+            & (linked.user_id == user_id),
+        )
+        .where(
+            WeekPlanORM.id == latest_week_plan_id,
+            ExercisePlanORM.user_id == user_id,
+        )
+        .order_by(WorkoutPlanORM.created_at, ExercisePlanORM.created_at)
+    )
+    if exercise_id is not None:
+        plans_query = plans_query.where(ExercisePlanORM.exercise_id == exercise_id)
+    plans = (await db_session.execute(plans_query)).all()
+    if not plans:
+        return []
+
+    plans_by_exercise = defaultdict(list)
+    for plan in plans:
+        plans_by_exercise[plan.exercise_id].append(plan)
+
+    # The last few results of each exercise, to fall back on and to spot stalls
+    ranked = (
+        select(
+            ExerciseResult.id,
+            ExerciseResult.exercise_id,
+            ExerciseResult.sets,
+            ExerciseResult.reps,
+            ExerciseResult.weight,
+            ExerciseResult.rpe,
+            ExerciseResult.date,
+            func.row_number()
+            .over(
+                partition_by=ExerciseResult.exercise_id,
+                order_by=(ExerciseResult.date.desc(), ExerciseResult.id.desc()),
+            )
+            .label("rank"),
+        )
+        .where(
+            ExerciseResult.user_id == user_id,
+            ExerciseResult.exercise_id.in_(plans_by_exercise),
+        )
+        .subquery()
+    )
+    recent_results: dict[int, list[Outcome]] = defaultdict(list)
+    for row in await db_session.execute(
+        select(ranked)
+        .where(ranked.c.rank <= STALL_RESULTS)
+        .order_by(ranked.c.exercise_id, ranked.c.rank)
+    ):
+        recent_results[row.exercise_id].append(
+            Outcome(
+                id=row.id,
+                sets=row.sets,
+                reps=row.reps,
+                weight=row.weight,
+                rpe=row.rpe,
+                date=row.date,
+            )
+        )
+
+    suggestions = []
+    for exercise_plans in plans_by_exercise.values():
+        linked_plans = [plan for plan in exercise_plans if plan.result_id is not None]
+        recent = recent_results[exercise_plans[0].exercise_id]
+        if linked_plans:
+            plan = max(linked_plans, key=lambda plan: plan.result_date)
+            outcome: Outcome | None = Outcome(
+                id=plan.result_id,
+                sets=plan.result_sets,
+                reps=plan.result_reps,
+                weight=plan.result_weight,
+                rpe=plan.result_rpe,
+                date=plan.result_date,
+            )
+        else:
+            plan = exercise_plans[0]
+            outcome = (
+                recent[0] if recent and recent[0].date >= plan.planned_at else None
+            )
+
+        suggestion, reason = next_session(
+            Target(sets=plan.sets, reps=plan.reps, weight=plan.weight, rpe=plan.rpe),
+            outcome,
+            stalled=is_stalled(recent),
+        )
+        suggestions.append(
+            ProgressionSuggestion(
+                exercise_id=plan.exercise_id,
+                exercise_name=plan.exercise_name,
+                sets=suggestion.sets,
+                reps=suggestion.reps,
+                weight=suggestion.weight,
+                rpe=suggestion.rpe,
+                reason=reason,
+                exercise_result_id=outcome.id if outcome else None,
+            )
+        )
+    return suggestions
+
+
+@get(path="/suggestions")
+async def get_progression_suggestions(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    exercise_id: int | None = None,
+) -> list[ProgressionSuggestion]:
+    """
+    Suggest the sets, reps and weight of the next session of each exercise in the
+    user's latest week plan, progressing from how its last session went.
+    """
+    return await suggest_progressions(db_session, request.user.user_id, exercise_id)
+
+
+progression_router = Router(
+    path="/api/progression",
+    route_handlers=[get_progression_suggestions],
+    tags=["progression"],
+)
@@ -0,0 +1,133 @@
+import logging
+import os
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any
+
+from attrs import define, field
+from litestar.datastructures import MutableScopeHeaders
+from litestar.enums import ScopeType
+from litestar.middleware import AbstractMiddleware
+from litestar.types import Message, Receive, Scope, Send
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Queries taking longer than this many seconds are logged with the request
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.1"))
+# Maximum number of slow queries logged per request
+SLOW_QUERY_SAMPLES = int(os.getenv("SLOW_QUERY_SAMPLES", "5"))
+# Slow queries are truncated to this many characters when logged
+SLOW_QUERY_MAX_LENGTH = 500
+
+_START_TIME_ATTRIBUTE = "_query_instrumentation_start_time"
+
+
+@define
+class QueryStats:
+    """The queries a request has made so far."""
+
+    count: int = 0
+    total_seconds: float = 0.0
+    pool_wait_seconds: float = 0.0
+    slow_queries: list[tuple[float, str]] = field(factory=list)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        if (
+            seconds >= SLOW_QUERY_SECONDS
+            and len(self.slow_queries) < SLOW_QUERY_SAMPLES
+        ):
+            self.slow_queries.append((seconds, statement[:SLOW_QUERY_MAX_LENGTH]))
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            [
+                f'db;dur={self.total_seconds * 1000:.1f};desc="{self.count} queries"',
+                f"db-pool;dur={self.pool_wait_seconds * 1000:.1f}",
+            ]
+        )
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, *args: Any
+) -> None:
+    if _query_stats.get() is not None:
+        setattr(context, _START_TIME_ATTRIBUTE, perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, *args: Any
+) -> None:
+    stats = _query_stats.get()
+    start_time = getattr(context, _START_TIME_ATTRIBUTE, None)
+    if stats is not None and start_time is not None:
+        stats.record(statement, perf_counter() - start_time)
+
+
+def record_pool_wait(seconds: float) -> None:
+    """Count time spent waiting for a pooled connection against the current request."""
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+def install_query_listeners() -> None:
+    """Time the queries of every engine, for requests that are being instrumented."""
+    for name, listener in [
+        ("before_cursor_execute", _before_cursor_execute),
+        ("after_cursor_execute", _after_cursor_execute),
+    ]:
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+
+class QueryInstrumentationMiddleware(AbstractMiddleware):
+    """
+    Counts and times the DB queries made while handling each request.
+
+    The totals are returned in a Server-Timing header, and slow queries are logged,
+    so that N+1 query patterns and slow statements can be found without echoing
+    every statement.
+    """
+
+    scopes = {ScopeType.HTTP}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+
+        async def send_with_server_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableScopeHeaders.from_message(message)
+                headers.add("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            _query_stats.reset(token)
+            self._log(scope, stats)
+
+    @staticmethod
+    def _log(scope: Scope, stats: QueryStats) -> None:
+        request = f"{scope.get('method')} {scope['path']}"
+        logger.debug(
+            "%s made %s queries in %.1fms, waiting %.1fms for connections",
+            request,
+            stats.count,
+            stats.total_seconds * 1000,
+            stats.pool_wait_seconds * 1000,
+        )
+        for seconds, statement in stats.slow_queries:
+            logger.warning(
+                "Slow query during %s took %.1fms: %s",
+                request,
+                seconds * 1000,
+                statement,
+            )
@@ -0,0 +1,23 @@
+"""
+Recompute every user's personal records from their exercise results.
+
+Run with `python -m app.rebuild_personal_records` to backfill the records after
+`alembic upgrade head` first creates them, or to repair them. The records are kept
+up to date as results change, so this isn't needed on every deployment.
+"""
+
+import asyncio
+
+from app.personal_records import rebuild_personal_records
+from app.sqlalchemy_async import sqlalchemy_config
+
+
+async def main() -> None:
+    async with sqlalchemy_config.get_session() as session:
+        count = await rebuild_personal_records(session)
+    await sqlalchemy_config.get_engine().dispose()
+    print(f"Rebuilt {count} personal records")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,21 @@
+"""
+Add the default exercises to the DB if it has none.
+
+Run with `python -m app.seed` after `alembic upgrade head`. Running it again is a
+no-op, so it's safe to run on every deployment.
+"""
+
+import asyncio
+
+from app.sqlalchemy_async import seed_default_exercises, sqlalchemy_config
+
+
+async def main() -> None:
+    async with sqlalchemy_config.get_session() as session:
+        count = await seed_default_exercises(session)
+    await sqlalchemy_config.get_engine().dispose()
+    print(f"Added {count} default exercises")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
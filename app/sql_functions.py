@@ -0,0 +1,43 @@
+from typing import Any
+
+from sqlalchemy import Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class iso_week_start(FunctionElement):
+    """
+    The date of the Monday that starts the ISO week of a datetime.
+
+    Each DB has its own date functions, so this is compiled for each dialect.
+    """
+
+    type = Date()
+    name = "iso_week_start"
+    inherit_cache = True
+
+
+@compiles(iso_week_start)
+def _iso_week_start(element: iso_week_start, compiler: SQLCompiler, **kw: Any) -> str:
+    # date_trunc truncates to the start of the ISO week, as used by PostgreSQL
+    value = compiler.process(element.clauses, **kw)
+    return f"CAST(date_trunc('week', {value}) AS DATE)"
+
+
+@compiles(iso_week_start, "mysql")
+def _iso_week_start_mysql(
+    element: iso_week_start, compiler: SQLCompiler, **kw: Any
+) -> str:
+    # WEEKDAY is 0 for Mondays
+    value = compiler.process(element.clauses, **kw)
+    return f"DATE(DATE_SUB({value}, INTERVAL WEEKDAY({value}) DAY))"
+
+
+@compiles(iso_week_start, "sqlite")
+def _iso_week_start_sqlite(
+    element: iso_week_start, compiler: SQLCompiler, **kw: Any
+) -> str:
+    # Move forward to the Sunday ending the week, unless it is one, then back to Monday
+    value = compiler.process(element.clauses, **kw)
+    return f"date({value}, 'weekday 0', '-6 days')"
@@ -1,4 +1,6 @@
 import json
+import os
+from typing import cast
 
 from advanced_alchemy.extensions.litestar.plugins.init.config.engine import EngineConfig
 from litestar.contrib.sqlalchemy.base import UUIDBase
@@ -6,9 +8,18 @@ from litestar.contrib.sqlalchemy.plugins import (
     AsyncSessionConfig,
     SQLAlchemyAsyncConfig,
 )
-from sqlalchemy import func, select, text
-from sqlalchemy.ext.asyncio import create_async_engine
+from litestar.datastructures import State
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from app.db_pool import TimedAsyncAdaptedQueuePool
 from app.exercises import Exercise
 
 DB_NAME = "gymtrack"
@@ -33,19 +44,96 @@ except Exception as e:
     port = "3306"
 
 
+def _db_setting(name: str, default: str) -> str:
+    """Read a DB setting from the mounted DB secrets, falling back to the env."""
+    try:
+        with open(f"/mnt/db-secrets/{name}", "r") as f:
+            return f.read().strip()
+    except OSError:
+        return os.getenv(f"DB_{name.upper()}", default)
+
+
+# Connections kept open per process, and extra ones opened under load
+DB_POOL_SIZE = int(_db_setting("pool_size", "10"))
+DB_MAX_OVERFLOW = int(_db_setting("max_overflow", "10"))
+# Seconds to wait for a connection before failing the request
+DB_POOL_TIMEOUT = float(_db_setting("pool_timeout", "30"))
+# Seconds before a connection is replaced. This is below MySQL's default
+# wait_timeout, so that idle connections are replaced before the server drops them.
+DB_POOL_RECYCLE = int(_db_setting("pool_recycle", "1800"))
+# Test connections with a round-trip on every checkout. Recycling already replaces
+# connections before MySQL times them out, so this only guards against failovers.
+DB_POOL_PRE_PING = _db_setting("pool_pre_ping", "true").lower() == "true"
+
+# "bootstrap" creates the DB, its tables and the default exercises on start-up, for
+# local development. "verify" only checks that the migrations and seeding, which are
+# run by an init container when deployed, are up to date.
+DB_STARTUP_MODE = os.getenv("DB_STARTUP_MODE", "bootstrap")
+
 DATABASE_URL_WITHOUT_DB = f"mysql+aiomysql://{db_username}:{db_password}@{host}:{port}"
 DATABASE_URL = f"mysql+aiomysql://{db_username}:{db_password}@{host}:{port}/{DB_NAME}"
 session_config = AsyncSessionConfig(expire_on_commit=False)
 sqlalchemy_config = SQLAlchemyAsyncConfig(
     connection_string=DATABASE_URL,
     session_config=session_config,
-    engine_config=EngineConfig(echo=True, pool_pre_ping=True),
+    engine_config=EngineConfig(
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        # Typed as an int, though SQLAlchemy waits for fractions of a second too
+        pool_timeout=cast(int, DB_POOL_TIMEOUT),
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    ),
 )
 
 
-async def on_startup() -> None:
-    """Adds some dummy data if no data is present."""
+def get_session_maker(state: State) -> async_sessionmaker[AsyncSession]:
+    """Get the session maker that the SQLAlchemy plugin keeps in the app state."""
+    return state[sqlalchemy_config.session_maker_app_state_key]
+
+
+async def seed_default_exercises(session: AsyncSession) -> int:
+    """
+    Add the default exercises if there are no exercises yet, returning how many.
 
+    Exercises that admins have since deleted aren't added back.
+    """
+    count = await session.scalar(select(func.count()).select_from(Exercise))
+    if count:
+        return 0
+
+    with open("app/data/default_exercises.json") as f:
+        default_exercises = json.load(f)
+    await session.execute(
+        insert(Exercise),
+        [
+            {
+                "id": index,
+                "name": exercise["name"],
+                "video_link": exercise["video_link"],
+            }
+            for index, exercise in enumerate(default_exercises, start=1)
+        ],
+    )
+    await session.commit()
+    return len(default_exercises)
+
+
+async def verify_migrations(engine: AsyncEngine) -> None:
+    """Check the DB has been migrated to the latest alembic revision."""
+    expected = ScriptDirectory.from_config(Config("alembic.ini")).get_current_head()
+    async with engine.connect() as conn:
+        current = await conn.scalar(text("SELECT version_num FROM alembic_version"))
+    if current != expected:
+        raise RuntimeError(
+            f"The DB is at revision {current} rather than {expected}, "
+            "run `alembic upgrade head` first"
+        )
+
+
+async def bootstrap_db() -> None:
+    """Create the DB, its tables and the default exercises if they don't exist."""
     async with create_async_engine(DATABASE_URL_WITHOUT_DB, echo=False).begin() as conn:
         await conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}"))
 
@@ -53,13 +141,11 @@ async def on_startup() -> None:
         await conn.run_sync(UUIDBase.metadata.create_all)
 
     async with sqlalchemy_config.get_session() as session:
-        statement = select(func.count()).select_from(Exercise)
-        count = await session.execute(statement)
-        if not count.scalar():
-            with open("app/data/default_exercises.json") as f:
-                default_exercises = json.load(f)
-            for index, exercise in enumerate(default_exercises, start=1):
-                name, video_link = exercise.values()
-                session.add(Exercise(id=index, name=name, video_link=video_link))
-
-        await session.commit()
+        await seed_default_exercises(session)
+
+
+async def on_startup() -> None:
+    if DB_STARTUP_MODE == "verify":
+        await verify_migrations(sqlalchemy_config.get_engine())
+    else:
+        await bootstrap_db()
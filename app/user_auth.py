@@ -1,4 +1,9 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime
+from typing import Any
 
 import firebase_admin.auth  # imported like this to allow easy mocking
 from attrs import define
@@ -7,6 +12,12 @@ from litestar.connection import ASGIConnection
 from litestar.exceptions import NotAuthorizedException
 from litestar.middleware import AbstractAuthenticationMiddleware, AuthenticationResult
 
+# Maximum number of verified tokens held in memory
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "1024"))
+# Upper bound in seconds on how long a verified token is trusted without asking
+# Firebase again, so that revoked users and changed admin claims are picked up.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+
 
 @define
 class User:
@@ -23,6 +34,58 @@ class AccessToken:
     token: str
 
 
+class VerifiedTokenCache:
+    """An LRU cache of verified tokens, expiring at the earlier of their TTL and exp."""
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, User, AccessToken]] = OrderedDict()
+
+    def get(self, token: str) -> tuple[User, AccessToken] | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+
+        expires_at, user, access_token = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            return None
+
+        self._entries.move_to_end(token)
+        return user, access_token
+
+    def put(self, user: User, access_token: AccessToken) -> None:
+        expires_at = min(access_token.exp.timestamp(), time.time() + self.ttl)
+        self._entries[access_token.token] = (expires_at, user, access_token)
+        self._entries.move_to_end(access_token.token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+verified_token_cache = VerifiedTokenCache(
+    max_size=AUTH_CACHE_MAX_SIZE, ttl=AUTH_CACHE_TTL
+)
+
+
+def _verify_token(access_token: str) -> dict[str, Any]:
+    """Verify a token with Firebase. This blocks, so it should be run in a thread."""
+    user_raw = firebase_admin.auth.verify_id_token(access_token)
+
+    user_id = user_raw["uid"]
+    user = firebase_admin.auth.get_user(user_id)
+    if user.custom_claims:
+        user_raw["admin"] = user.custom_claims.get("admin", False)
+
+    return user_raw
+
+
 class MyAuthenticationMiddleware(AbstractAuthenticationMiddleware):
 
     async def authenticate_request(
@@ -32,12 +95,11 @@ class MyAuthenticationMiddleware(AbstractAuthenticationMiddleware):
             type, access_token = connection.headers["authorization"].split()
             assert type == "Bearer"
 
-            user_raw = firebase_admin.auth.verify_id_token(access_token)
+            cached = verified_token_cache.get(access_token)
+            if cached is not None:
+                return AuthenticationResult(*cached)
 
-            user_id = user_raw["uid"]
-            user = firebase_admin.auth.get_user(user_id)
-            if user.custom_claims:
-                user_raw["admin"] = user.custom_claims.get("admin", False)
+            user_raw = await asyncio.to_thread(_verify_token, access_token)
 
         except Exception:
             raise NotAuthorizedException()
@@ -48,4 +110,5 @@ class MyAuthenticationMiddleware(AbstractAuthenticationMiddleware):
             iat=datetime.fromtimestamp(user_raw["iat"]),
             token=access_token,
         )
+        verified_token_cache.put(user, token)
         return AuthenticationResult(user, token)
@@ -5,15 +5,32 @@ from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError, NoResultFound, StatementError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.models import UserProfileCreate, UserProfileORM, UserProfileUpdate
+from app.etags import etag_headers, is_not_modified, make_etag, not_modified_response
+from app.models.models import (
+    UserProfile,
+    UserProfileCreate,
+    UserProfileORM,
+    UserProfileUpdate,
+)
 from app.user_auth import AccessToken, User
+from app.week_plan_generation import forget_screening
+
+
+def _user_profile_etag(user_profile: UserProfileORM) -> str:
+    # The profile has no audit columns, so its ETag is derived from its content
+    return make_etag(
+        *(
+            getattr(user_profile, column.key)
+            for column in UserProfileORM.__table__.columns
+        )
+    )
 
 
 @get(path="")
 async def get_user_profile(
     db_session: AsyncSession,
     request: Request[User, AccessToken, State],
-) -> UserProfileORM:
+) -> Response[UserProfile]:
     """Get a user's profile"""
     user = request.user
     user_profile = await db_session.scalar(
@@ -23,7 +40,13 @@ async def get_user_profile(
     if not user_profile:
         raise HTTPException(status_code=404, detail="User profile not found")
 
-    return user_profile
+    etag = _user_profile_etag(user_profile)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    return Response(
+        UserProfile.model_validate(user_profile), headers=etag_headers(etag)
+    )
 
 
 @post(path="")
@@ -75,6 +98,7 @@ async def patch_user_profile(
     for field, value in data.model_dump().items():
         if value is not None:
             setattr(user_profile, field, value)
+    await forget_screening(db_session, user.user_id)
 
     await db_session.commit()
 
@@ -100,6 +124,7 @@ async def delete_user_profile(
             )
 
         await db_session.delete(user_profile)
+        await forget_screening(db_session, user.user_id)
         await db_session.commit()
 
         return Response(
@@ -0,0 +1,44 @@
+"""
+Check every weekly rollup against a recompute from the exercise results.
+
+Run with `python -m app.verify_weekly_rollups`, which lists any rollups that don't
+match and exits with an error if there are some. Add `--rebuild` to replace the
+rollups with the recompute instead, e.g. to fill them in after `alembic upgrade head`
+first creates them.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.sqlalchemy_async import sqlalchemy_config
+from app.weekly_rollups import rebuild_weekly_rollups, verify_weekly_rollups
+
+
+async def main(rebuild: bool) -> int:
+    async with sqlalchemy_config.get_session() as session:
+        if rebuild:
+            await rebuild_weekly_rollups(session)
+            print("Rebuilt the weekly rollups")
+            mismatches = []
+        else:
+            mismatches = await verify_weekly_rollups(session)
+    await sqlalchemy_config.get_engine().dispose()
+
+    for mismatch in mismatches:
+        print(mismatch.model_dump_json())
+    if mismatches:
+        print(f"{len(mismatches)} weekly rollups don't match their results")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Replace the rollups with a recompute rather than checking them",
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.rebuild)))
@@ -0,0 +1,261 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any
+from uuid import UUID, uuid4
+
+import anthropic
+from anthropic.types import Message, MessageParam, TextBlock
+from litestar.contrib.sqlalchemy.base import UUIDAuditBase
+from litestar.exceptions import HTTPException
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.exercise_catalogue import CatalogueSnapshot
+from app.llm.claude_client import cached_system_prompt, create_message
+from app.llm.claude_prompts import SCREENING_PROMPT
+from app.models.models import (
+    ExercisePlanORM,
+    ScreeningResult,
+    ScreeningStatus,
+    ScreeningVerdictORM,
+    UserProfileORM,
+    WarmUpPlanORM,
+    WeekPlan,
+    WeekPlanORM,
+    WorkoutPlanORM,
+)
+
+SCREENING_MODEL = "claude-3-5-haiku-20241022"
+WORKOUT_PLAN_MODEL = "claude-3-7-sonnet-20250219"
+
+
+def _create_prompt_from_user_profile(user_profile: UserProfileORM) -> str:
+    return f"""
+    My gender is {user_profile.gender}.
+    I am {user_profile.age} years old.
+    My fitness level is {user_profile.fitness_level}.
+    My goals are the following:
+    {user_profile.goal}
+    I would like a workout plan with {user_profile.number_of_days} days.
+    """ + (
+        f"I have the following injury description: {user_profile.injury_description}."
+        if str(user_profile.injury_description)
+        else ""
+    )
+
+
+def _user_messages(user_profile: UserProfileORM) -> list[MessageParam]:
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": _create_prompt_from_user_profile(user_profile),
+                }
+            ],
+        }
+    ]
+
+
+def _message_text(message: Message) -> str:
+    text_block = message.content[-1]
+    assert isinstance(text_block, TextBlock)
+    return text_block.text
+
+
+async def get_user_profile(db_session: AsyncSession, user_id: str) -> UserProfileORM:
+    user_profile = await db_session.scalar(
+        select(UserProfileORM).where(UserProfileORM.user_id == user_id)
+    )
+    if not user_profile:
+        raise HTTPException(status_code=412, detail="User profile not found")
+    return user_profile
+
+
+async def screen_user_profile(
+    anthropic_client: anthropic.AsyncAnthropic, user_profile: UserProfileORM
+) -> None:
+    """Check the profile is suitable for a workout plan, raising a 400 if not."""
+    screening_message = await create_message(
+        anthropic_client,
+        model=SCREENING_MODEL,
+        max_tokens=8_000,
+        temperature=1,
+        system=SCREENING_PROMPT,
+        messages=_user_messages(user_profile),
+    )
+    screening_result = ScreeningResult.model_validate(
+        json.loads(_message_text(screening_message))
+    )
+
+    if screening_result.status == ScreeningStatus.rejected and screening_result.reason:
+        raise HTTPException(
+            status_code=400,
+            detail=screening_result.reason,
+        )
+
+    assert screening_result.status == ScreeningStatus.accepted
+
+
+def _screening_hash(user_profile: UserProfileORM) -> str:
+    # Changing the screening model or prompt invalidates every verdict
+    return hashlib.sha256(
+        "\0".join(
+            [
+                SCREENING_MODEL,
+                SCREENING_PROMPT,
+                _create_prompt_from_user_profile(user_profile),
+            ]
+        ).encode()
+    ).hexdigest()
+
+
+async def is_screening_accepted(
+    db_session: AsyncSession, user_profile: UserProfileORM
+) -> bool:
+    """Whether screening has already accepted the profile as it is now."""
+    prompt_hash = await db_session.scalar(
+        select(ScreeningVerdictORM.prompt_hash).where(
+            ScreeningVerdictORM.user_id == user_profile.user_id
+        )
+    )
+    return prompt_hash == _screening_hash(user_profile)
+
+
+async def save_screening_accepted(
+    db_session: AsyncSession, user_profile: UserProfileORM
+) -> None:
+    """Remember that screening accepted the profile, to be committed by the caller."""
+    verdict = ScreeningVerdictORM(
+        user_id=user_profile.user_id,
+        prompt_hash=_screening_hash(user_profile),
+        screened_at=datetime.now(timezone.utc),
+    )
+    try:
+        async with db_session.begin_nested():
+            await db_session.merge(verdict)
+    except IntegrityError:
+        # Another request saved a verdict for the same user at the same time
+        pass
+
+
+async def forget_screening(db_session: AsyncSession, user_id: str) -> None:
+    """Make the user's profile be screened again, to be committed by the caller."""
+    await db_session.execute(
+        delete(ScreeningVerdictORM).where(ScreeningVerdictORM.user_id == user_id)
+    )
+
+
+async def screen_user_profile_once(
+    anthropic_client: anthropic.AsyncAnthropic,
+    db_session: AsyncSession,
+    user_profile: UserProfileORM,
+) -> None:
+    """
+    Screen the profile unless it has been accepted before, raising a 400 if not.
+
+    Only accepted verdicts are saved, so that a rejected profile is screened afresh.
+    """
+    if await is_screening_accepted(db_session, user_profile):
+        return
+    await screen_user_profile(anthropic_client, user_profile)
+    await save_screening_accepted(db_session, user_profile)
+
+
+def workout_plan_request(
+    catalogue: CatalogueSnapshot, user_profile: UserProfileORM
+) -> dict[str, Any]:
+    """The arguments for asking Claude for a workout plan."""
+    return {
+        "model": WORKOUT_PLAN_MODEL,
+        "max_tokens": 12_000,
+        "temperature": 1,
+        "system": cached_system_prompt(catalogue.workout_plan_system_prompt),
+        "messages": _user_messages(user_profile),
+    }
+
+
+async def generate_week_plan(
+    anthropic_client: anthropic.AsyncAnthropic,
+    catalogue: CatalogueSnapshot,
+    user_profile: UserProfileORM,
+) -> WeekPlan:
+    message = await create_message(
+        anthropic_client, **workout_plan_request(catalogue, user_profile)
+    )
+    return WeekPlan.model_validate(json.loads(_message_text(message)))
+
+
+async def insert_week_plan(
+    db_session: AsyncSession,
+    week_plan: WeekPlan,
+    user_id: str,
+    exercise_name_to_id: dict[str, int],
+) -> UUID:
+    """
+    Save a generated week plan, returning its id.
+
+    Ids are generated up front so that each table can be filled by one multi-row
+    INSERT, in the order of their foreign keys, rather than by the ORM flushing the
+    plan a row at a time.
+    """
+    week_plan_id = uuid4()
+    workout_plans: list[dict[str, Any]] = []
+    warm_ups: list[dict[str, Any]] = []
+    exercise_plans: list[dict[str, Any]] = []
+
+    for workout_plan in week_plan.workouts:
+        workout_plan_id = uuid4()
+        workout_plans.append(
+            {
+                "id": workout_plan_id,
+                "week_plan_id": week_plan_id,
+                "title": workout_plan.title,
+                "user_id": user_id,
+            }
+        )
+        warm_ups.extend(
+            {
+                "id": uuid4(),
+                "workout_plan_id": workout_plan_id,
+                "description": warm_up.description,
+                "user_id": user_id,
+            }
+            for warm_up in workout_plan.warm_ups
+        )
+        exercise_plans.extend(
+            {
+                "id": uuid4(),
+                "workout_plan_id": workout_plan_id,
+                "exercise_name": exercise.exercise,
+                "exercise_id": exercise_name_to_id[str(exercise.exercise)],
+                "weight": exercise.weight,
+                "reps": exercise.reps,
+                "sets": exercise.sets,
+                "rpe": exercise.rpe,
+                "user_id": user_id,
+            }
+            for exercise in workout_plan.exercises
+        )
+
+    await db_session.execute(
+        insert(WeekPlanORM),
+        {"id": week_plan_id, "summary": week_plan.summary, "user_id": user_id},
+    )
+    plan_rows: list[tuple[type[UUIDAuditBase], list[dict[str, Any]]]] = [
+        (WorkoutPlanORM, workout_plans),
+        (WarmUpPlanORM, warm_ups),
+        (ExercisePlanORM, exercise_plans),
+    ]
+    for model, rows in plan_rows:
+        if rows:
+            # Without render_nulls, e.g. exercises without a weight would be
+            # inserted by a separate statement
+            await db_session.execute(
+                insert(model).execution_options(render_nulls=True), rows
+            )
+
+    return week_plan_id
@@ -0,0 +1,371 @@
+import asyncio
+import logging
+import os
+from contextlib import contextmanager, suppress
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Awaitable, Callable, Iterator, cast
+from uuid import UUID
+
+import anthropic
+from litestar import Litestar
+from litestar.datastructures import State
+from litestar.exceptions import HTTPException
+from sqlalchemy import CursorResult, and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.exercise_catalogue import CatalogueSnapshot, ExerciseCatalogue
+from app.models.models import (
+    UserProfileORM,
+    WeekPlan,
+    WeekPlanJobORM,
+    WeekPlanJobStage,
+    WeekPlanJobStatus,
+)
+from app.sqlalchemy_async import get_session_maker
+from app.week_plan_generation import (
+    generate_week_plan,
+    get_user_profile,
+    insert_week_plan,
+    is_screening_accepted,
+    save_screening_accepted,
+    screen_user_profile,
+)
+
+logger = logging.getLogger(__name__)
+
+# Number of week plans generated concurrently by each process
+WEEK_PLAN_WORKERS = int(os.getenv("WEEK_PLAN_WORKERS", "2"))
+# Seconds between checks for jobs queued by other replicas
+WEEK_PLAN_JOB_POLL_SECONDS = float(os.getenv("WEEK_PLAN_JOB_POLL_SECONDS", "5"))
+# Seconds after which a running job that hasn't made progress is assumed to have
+# been abandoned, e.g. because its pod was rolled, and is picked up again
+WEEK_PLAN_JOB_LEASE_SECONDS = float(os.getenv("WEEK_PLAN_JOB_LEASE_SECONDS", "600"))
+WEEK_PLAN_JOB_MAX_ATTEMPTS = int(os.getenv("WEEK_PLAN_JOB_MAX_ATTEMPTS", "3"))
+# Seconds before a failed attempt is retried, multiplied by the number of attempts
+WEEK_PLAN_JOB_RETRY_SECONDS = float(os.getenv("WEEK_PLAN_JOB_RETRY_SECONDS", "30"))
+# Generate plans while their profile is being screened, instead of afterwards
+WEEK_PLAN_SPECULATIVE_GENERATION = (
+    os.getenv("WEEK_PLAN_SPECULATIVE_GENERATION", "false").lower() == "true"
+)
+
+AnthropicClientProvider = Callable[[], Awaitable[anthropic.AsyncAnthropic]]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class StageTimings:
+    """Wall-clock seconds spent in each stage of generating a week plan."""
+
+    def __init__(self) -> None:
+        self.started = perf_counter()
+        self.durations: dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[stage] = perf_counter() - start
+
+    def __str__(self) -> str:
+        stages = [
+            f"{stage} {seconds:.2f}s" for stage, seconds in self.durations.items()
+        ]
+        return ", ".join(stages + [f"total {perf_counter() - self.started:.2f}s"])
+
+
+class WeekPlanJobWorkers:
+    """
+    A pool of workers that generate week plans for jobs queued in the DB.
+
+    Jobs are claimed with a conditional update so that several replicas can share
+    the queue, and a job whose worker stops making progress is picked up again once
+    its lease expires, so queued plans survive restarts.
+    """
+
+    def __init__(
+        self,
+        anthropic_client_provider: AnthropicClientProvider,
+        exercise_catalogue: ExerciseCatalogue,
+        workers: int = WEEK_PLAN_WORKERS,
+        poll_interval: float = WEEK_PLAN_JOB_POLL_SECONDS,
+        speculative: bool = WEEK_PLAN_SPECULATIVE_GENERATION,
+    ) -> None:
+        self.anthropic_client_provider = anthropic_client_provider
+        self.exercise_catalogue = exercise_catalogue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.speculative = speculative
+        self._wake_up = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self, app: Litestar) -> None:
+        self._wake_up = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work(app.state)) for _ in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake the workers up to pick up a newly queued job."""
+        self._wake_up.set()
+
+    async def enqueue(self, db_session: AsyncSession, user_id: str) -> WeekPlanJobORM:
+        """
+        Queue a week plan for a user, reusing any job that is already in progress.
+
+        A job holds its user's id in `active_user_id` until it finishes, which is
+        unique, so if concurrent requests both find no job only one can queue one.
+        """
+        active_job = select(WeekPlanJobORM).where(
+            WeekPlanJobORM.active_user_id == user_id
+        )
+        job = await db_session.scalar(active_job)
+        if job is not None:
+            return job
+
+        job = WeekPlanJobORM(
+            user_id=user_id,
+            status=WeekPlanJobStatus.pending,
+            stage=WeekPlanJobStage.queued,
+            attempts=0,
+            available_at=_utcnow(),
+            active_user_id=user_id,
+        )
+        db_session.add(job)
+        try:
+            await db_session.commit()
+        except IntegrityError:
+            # Another request queued a job since it was looked up, which is only
+            # visible to a new transaction
+            await db_session.rollback()
+            return (await db_session.execute(active_job)).scalar_one()
+        self.notify()
+        return job
+
+    async def run_pending(self, session_maker: async_sessionmaker[AsyncSession]) -> int:
+        """Run jobs until none are ready, returning how many were run."""
+        count = 0
+        while (job_id := await self._claim(session_maker)) is not None:
+            await self._run(session_maker, job_id)
+            count += 1
+        return count
+
+    async def _work(self, state: State) -> None:
+        while True:
+            self._wake_up.clear()
+            try:
+                await self.run_pending(get_session_maker(state))
+            except Exception:
+                logger.exception("Failed to run week plan jobs")
+
+            with suppress(TimeoutError):
+                async with asyncio.timeout(self.poll_interval):
+                    await self._wake_up.wait()
+
+    @staticmethod
+    def _claimable(now: datetime) -> ColumnElement[bool]:
+        lease_expired_at = now - timedelta(seconds=WEEK_PLAN_JOB_LEASE_SECONDS)
+        return and_(
+            WeekPlanJobORM.attempts < WEEK_PLAN_JOB_MAX_ATTEMPTS,
+            or_(
+                and_(
+                    WeekPlanJobORM.status == WeekPlanJobStatus.pending,
+                    WeekPlanJobORM.available_at <= now,
+                ),
+                and_(
+                    WeekPlanJobORM.status == WeekPlanJobStatus.running,
+                    WeekPlanJobORM.updated_at < lease_expired_at,
+                ),
+            ),
+        )
+
+    async def _claim(
+        self, session_maker: async_sessionmaker[AsyncSession]
+    ) -> UUID | None:
+        async with session_maker() as session:
+            now = _utcnow()
+            lease_expired_at = now - timedelta(seconds=WEEK_PLAN_JOB_LEASE_SECONDS)
+            await session.execute(
+                update(WeekPlanJobORM)
+                .where(
+                    WeekPlanJobORM.status == WeekPlanJobStatus.running,
+                    WeekPlanJobORM.updated_at < lease_expired_at,
+                    WeekPlanJobORM.attempts >= WEEK_PLAN_JOB_MAX_ATTEMPTS,
+                )
+                .values(
+                    status=WeekPlanJobStatus.failed,
+                    error="Timed out generating a workout plan",
+                    active_user_id=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+            while True:
+                job_id = await session.scalar(
+                    select(WeekPlanJobORM.id)
+                    .where(self._claimable(now))
+                    .order_by(WeekPlanJobORM.created_at)
+                    .limit(1)
+                )
+                if job_id is None:
+                    await session.commit()
+                    return None
+
+                # Only one worker's update will match if several race for this job
+                result = cast(
+                    CursorResult,
+                    await session.execute(
+                        update(WeekPlanJobORM)
+                        .where(WeekPlanJobORM.id == job_id, self._claimable(now))
+                        .values(
+                            status=WeekPlanJobStatus.running,
+                            attempts=WeekPlanJobORM.attempts + 1,
+                        )
+                        .execution_options(synchronize_session=False)
+                    ),
+                )
+                await session.commit()
+                if result.rowcount == 1:
+                    return job_id
+
+    async def _run(
+        self, session_maker: async_sessionmaker[AsyncSession], job_id: UUID
+    ) -> None:
+        async with session_maker() as session:
+            job = await session.get_one(WeekPlanJobORM, job_id)
+            try:
+                await self._generate(session, job)
+            except Exception as e:
+                await session.rollback()
+                job = await session.get_one(
+                    WeekPlanJobORM, job_id, populate_existing=True
+                )
+                self._record_failure(job, e)
+                await session.commit()
+
+    async def _generate(self, session: AsyncSession, job: WeekPlanJobORM) -> None:
+        timings = StageTimings()
+        job.stage = WeekPlanJobStage.screening
+        await session.commit()
+        with timings.measure("profile"):
+            user_profile = await get_user_profile(session, str(job.user_id))
+            screened = await is_screening_accepted(session, user_profile)
+        anthropic_client = await self.anthropic_client_provider()
+
+        if self.speculative and not screened:
+            catalogue, week_plan = await self._screen_and_generate_speculatively(
+                session, job, anthropic_client, user_profile, timings
+            )
+        else:
+            if not screened:
+                with timings.measure("screening"):
+                    await screen_user_profile(anthropic_client, user_profile)
+                await save_screening_accepted(session, user_profile)
+            job.stage = WeekPlanJobStage.generating
+            await session.commit()
+            with timings.measure("catalogue"):
+                catalogue = await self.exercise_catalogue.get(session)
+            with timings.measure("generation"):
+                week_plan = await generate_week_plan(
+                    anthropic_client, catalogue, user_profile
+                )
+
+        with timings.measure("saving"):
+            job.week_plan_id = await insert_week_plan(
+                session, week_plan, str(job.user_id), catalogue.name_to_id
+            )
+            job.status = WeekPlanJobStatus.succeeded
+            job.stage = WeekPlanJobStage.done
+            job.error = None
+            job.active_user_id = None
+            await session.commit()
+
+        logger.info(
+            "Generated week plan for job %s (%s): %s",
+            job.id,
+            "speculative" if self.speculative else "sequential",
+            timings,
+        )
+
+    async def _screen_and_generate_speculatively(
+        self,
+        session: AsyncSession,
+        job: WeekPlanJobORM,
+        anthropic_client: anthropic.AsyncAnthropic,
+        user_profile: UserProfileORM,
+        timings: StageTimings,
+    ) -> tuple[CatalogueSnapshot, WeekPlan]:
+        """
+        Generate the plan while the profile is still being screened.
+
+        Most profiles are accepted, so rather than waiting for the screening verdict
+        the plan is generated alongside it, and thrown away if the profile is
+        rejected. This costs a second Claude slot per job.
+        """
+
+        async def screen() -> None:
+            with timings.measure("screening"):
+                await screen_user_profile(anthropic_client, user_profile)
+
+        async def generate(catalogue: CatalogueSnapshot) -> WeekPlan:
+            with timings.measure("generation"):
+                return await generate_week_plan(
+                    anthropic_client, catalogue, user_profile
+                )
+
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                screening = task_group.create_task(screen())
+                # The session is only used here, so it isn't shared between tasks
+                with timings.measure("catalogue"):
+                    catalogue = await self.exercise_catalogue.get(session)
+                generation = task_group.create_task(generate(catalogue))
+
+                # If screening rejects the profile, the task group cancels generation
+                await screening
+                await save_screening_accepted(session, user_profile)
+                job.stage = WeekPlanJobStage.generating
+                await session.commit()
+        except ExceptionGroup as e:
+            # Surface the original error, e.g. the rejection, rather than the group
+            raise e.exceptions[0]
+
+        return catalogue, generation.result()
+
+    @staticmethod
+    def _record_failure(job: WeekPlanJobORM, e: Exception) -> None:
+        if isinstance(e, HTTPException):
+            error = e.detail
+            # Client errors, such as a rejected profile, won't succeed on a retry
+            retry = e.status_code >= 500
+        else:
+            logger.exception("Failed to generate a week plan for job %s", job.id)
+            error = "Failed to generate a workout plan"
+            retry = True
+
+        job.error = error
+        if retry and job.attempts < WEEK_PLAN_JOB_MAX_ATTEMPTS:
+            job.status = WeekPlanJobStatus.pending
+            job.stage = WeekPlanJobStage.queued
+            job.available_at = _utcnow() + timedelta(
+                seconds=WEEK_PLAN_JOB_RETRY_SECONDS * job.attempts
+            )
+        else:
+            job.status = WeekPlanJobStatus.failed
+            job.active_user_id = None
+
+
+def provide_week_plan_job_workers(state: State) -> WeekPlanJobWorkers:
+    return state.week_plan_job_workers
@@ -1,163 +1,167 @@
 import json
+import logging
+from contextlib import AsyncExitStack
+from datetime import datetime
+from typing import AsyncGenerator, cast
 from uuid import UUID
 
 import anthropic
-from anthropic.types import TextBlock
-from litestar import Request, Router, get, patch, post
+from litestar import Request, Response, Router, get, patch, post
 from litestar.datastructures import State
 from litestar.exceptions import HTTPException
+from litestar.params import Parameter
+from litestar.response import ServerSentEvent, ServerSentEventMessage
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import CursorResult, Row, Select, and_, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from app.llm.claude_prompts import SCREENING_PROMPT, workout_plan_system_prompt
+from app.etags import etag_headers, is_not_modified, make_etag, not_modified_response
+from app.exercise_catalogue import ExerciseCatalogue
+from app.llm.claude_client import stream_message
+from app.llm.json_stream import JSONArrayStreamParser
 from app.models.models import (
-    Exercise,
     ExercisePlanORM,
-    ScreeningResult,
-    ScreeningStatus,
-    UserProfileORM,
-    WarmUpPlanORM,
     WeekPlan,
+    WeekPlanJob,
+    WeekPlanJobORM,
     WeekPlanORM,
     WeekPlansResponse,
+    WeekPlanSummary,
     WeekPlanUpdate,
+    WorkoutPlan,
     WorkoutPlanORM,
 )
+from app.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    parse_cursor_datetime,
+)
+from app.sqlalchemy_async import get_session_maker
 from app.user_auth import AccessToken, User
+from app.week_plan_generation import (
+    get_user_profile,
+    insert_week_plan,
+    screen_user_profile_once,
+    workout_plan_request,
+)
+from app.week_plan_jobs import WeekPlanJobWorkers
 
-
-async def provide_anthropic_client() -> anthropic.Anthropic:
-    return anthropic.Anthropic()
+logger = logging.getLogger(__name__)
 
 
 class UserPrompt(BaseModel):
     user_prompt: str
 
 
-def _create_prompt_from_user_profile(user_profile: UserProfileORM) -> str:
-    return f"""
-    My gender is {user_profile.gender}.
-    I am {user_profile.age} years old.
-    My fitness level is {user_profile.fitness_level}.
-    My goals are the following:
-    {user_profile.goal}
-    I would like a workout plan with {user_profile.number_of_days} days.
-    """ + (
-        f"I have the following injury description: {user_profile.injury_description}."
-        if str(user_profile.injury_description)
-        else ""
-    )
-
-
-@post(path="")
+@post(path="", status_code=202)
 async def post_week_plan(
     db_session: AsyncSession,
     request: Request[User, AccessToken, State],
-    anthropic_client: anthropic.Anthropic,
-) -> WeekPlan:
-    """Create a workout plan"""
+    week_plan_job_workers: WeekPlanJobWorkers,
+) -> WeekPlanJob:
+    """
+    Queue a workout plan to be created.
+
+    The plan is screened and generated in the background, and its progress can be
+    followed with the returned job's id.
+    """
+    user = request.user
+    # Fail fast rather than queueing a job that can't succeed
+    await get_user_profile(db_session, user.user_id)
+
+    job = await week_plan_job_workers.enqueue(db_session, user.user_id)
+    return WeekPlanJob.model_validate(job)
 
+
+@get(path="/jobs/{job_id:uuid}")
+async def get_week_plan_job(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    job_id: UUID,
+) -> WeekPlanJob:
+    """Get the progress of a queued workout plan"""
     user = request.user
-    user_profile = await db_session.scalar(
-        select(UserProfileORM).where(UserProfileORM.user_id == request.user.user_id)
-    )
-    if not user_profile:
-        raise HTTPException(status_code=412, detail="User profile not found")
-
-    screening_message = anthropic_client.messages.create(
-        model="claude-3-5-haiku-20241022",
-        max_tokens=8_000,
-        temperature=1,
-        system=SCREENING_PROMPT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": _create_prompt_from_user_profile(user_profile),
-                    }
-                ],
-            }
-        ],
+    job = await db_session.scalar(
+        select(WeekPlanJobORM).where(
+            WeekPlanJobORM.id == job_id, WeekPlanJobORM.user_id == user.user_id
+        )
     )
-    screening_text_block = screening_message.content[-1]
-    assert isinstance(screening_text_block, TextBlock)
-    screening_content = screening_text_block.text
-    screening_result = ScreeningResult.model_validate(json.loads(screening_content))
 
-    if screening_result.status == ScreeningStatus.rejected and screening_result.reason:
-        raise HTTPException(
-            status_code=400,
-            detail=screening_result.reason,
-        )
+    if not job:
+        raise HTTPException(status_code=404, detail="Week plan job not found")
+
+    return WeekPlanJob.model_validate(job)
+
 
-    assert screening_result.status == ScreeningStatus.accepted
-
-    exercises = await db_session.scalars(select(Exercise))
-    exercise_name_to_id = {str(exercise.name): exercise.id for exercise in exercises}
-    exercise_names = list(exercise_name_to_id.keys())
-
-    message = anthropic_client.messages.create(
-        model="claude-3-7-sonnet-20250219",
-        max_tokens=12_000,
-        temperature=1,
-        system=workout_plan_system_prompt(exercise_names),
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": _create_prompt_from_user_profile(user_profile),
-                    }
-                ],
-            }
-        ],
+@post(path="/stream")
+async def post_week_plan_stream(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    anthropic_client: anthropic.AsyncAnthropic,
+    exercise_catalogue: ExerciseCatalogue,
+) -> ServerSentEvent:
+    """
+    Create a workout plan, streaming each workout as soon as it has been generated.
+
+    Emits a "workout" event for each workout, then a "week_plan" event with the whole
+    plan once it has been saved, or an "error" event if generation fails part way.
+    Failing to get a Claude slot or to start the stream is a 503 or 504 as usual.
+    """
+    user = request.user
+    user_profile = await get_user_profile(db_session, user.user_id)
+    await screen_user_profile_once(anthropic_client, db_session, user_profile)
+    await db_session.commit()
+    catalogue = await exercise_catalogue.get(db_session)
+
+    # Opened while errors can still be HTTP errors, and closed once the events are
+    # done
+    exit_stack = AsyncExitStack()
+    stream = await exit_stack.enter_async_context(
+        stream_message(
+            anthropic_client, **workout_plan_request(catalogue, user_profile)
+        )
     )
-    text_block = message.content[-1]
-    assert isinstance(text_block, TextBlock)
-    content = text_block.text
-
-    week_plan_response = WeekPlan.model_validate(json.loads(content))
-
-    week_plan_orm = WeekPlanORM(
-        workout_plans=[
-            WorkoutPlanORM(
-                title=workout_plan.title,
-                user_id=user.user_id,
-                warm_ups=[
-                    WarmUpPlanORM(
-                        description=warm_up.description,
-                        user_id=user.user_id,
-                    )
-                    for warm_up in workout_plan.warm_ups
-                ],
-                exercise_plans=[
-                    ExercisePlanORM(
-                        exercise_name=exercise.exercise,
-                        exercise_id=exercise_name_to_id[str(exercise.exercise)],
-                        weight=exercise.weight,
-                        reps=exercise.reps,
-                        sets=exercise.sets,
-                        rpe=exercise.rpe,
-                        user_id=user.user_id,
-                    )
-                    for exercise in workout_plan.exercises
-                ],
+
+    # The request's session is closed once the response starts, so the plan is
+    # saved with a session of its own.
+    session_maker = get_session_maker(request.app.state)
+
+    async def week_plan_events() -> AsyncGenerator[ServerSentEventMessage, None]:
+        parser = JSONArrayStreamParser("workouts")
+        try:
+            async with exit_stack:
+                async for text in stream.text_stream:
+                    for workout in parser.feed(text):
+                        yield ServerSentEventMessage(
+                            event="workout",
+                            data=WorkoutPlan.model_validate(workout).model_dump_json(),
+                        )
+
+            week_plan = WeekPlan.model_validate(json.loads(parser.text))
+            async with session_maker() as session:
+                await insert_week_plan(
+                    session, week_plan, user.user_id, catalogue.name_to_id
+                )
+                await session.commit()
+        except Exception as e:
+            logger.exception("Failed to stream a week plan")
+            yield ServerSentEventMessage(
+                event="error",
+                data=(
+                    e.detail
+                    if isinstance(e, HTTPException)
+                    else "Failed to generate a workout plan"
+                ),
             )
-            for workout_plan in week_plan_response.workouts
-        ],
-        user_id=user.user_id,
-        summary=week_plan_response.summary,
-    )
-    db_session.add(week_plan_orm)
+            return
 
-    await db_session.commit()
+        yield ServerSentEventMessage(
+            event="week_plan", data=week_plan.model_dump_json()
+        )
 
-    return week_plan_response
+    return ServerSentEvent(week_plan_events())
 
 
 @get(path="")
@@ -168,18 +172,7 @@ async def get_week_plans(
     """Get all workout plans"""
     user = request.user
 
-    query = (
-        select(WeekPlanORM)
-        .options(
-            selectinload(WeekPlanORM.workout_plans).selectinload(
-                WorkoutPlanORM.warm_ups
-            ),
-            selectinload(WeekPlanORM.workout_plans).selectinload(
-                WorkoutPlanORM.exercise_plans
-            ),
-        )
-        .where(WeekPlanORM.user_id == user.user_id)
-    )
+    query = select(WeekPlanORM).where(WeekPlanORM.user_id == user.user_id)
     week_plans = list(await db_session.scalars(query))
 
     if not week_plans:
@@ -192,34 +185,159 @@ async def get_week_plans(
     )
 
 
-@get(path="/latest")
-async def get_latest_week_plan(
+@get(path="/summaries")
+async def get_week_plan_summaries(
     db_session: AsyncSession,
     request: Request[User, AccessToken, State],
-) -> WeekPlan:
-    """Get a workout plan"""
+    limit: int | None = Parameter(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+) -> Response[list[WeekPlanSummary]]:
+    """
+    Get summaries of a user's week plans, most recent first.
+
+    Only the plans' own columns and the number of workouts and exercises in each are
+    read, and the full plans can be fetched by id. When a limit is given and there
+    are more plans, the cursor for the next page is returned in the x-next-cursor
+    header.
+    """
     user = request.user
-
+    workout_count = (
+        select(func.count(WorkoutPlanORM.id))
+        .where(WorkoutPlanORM.week_plan_id == WeekPlanORM.id)
+        .scalar_subquery()
+    )
+    completed_workout_count = (
+        select(func.count(WorkoutPlanORM.id))
+        .where(
+            WorkoutPlanORM.week_plan_id == WeekPlanORM.id,
+            WorkoutPlanORM.complete.is_(True),
+        )
+        .scalar_subquery()
+    )
+    exercise_count = (
+        select(func.count(ExercisePlanORM.id))
+        .join(WorkoutPlanORM, ExercisePlanORM.workout_plan_id == WorkoutPlanORM.id)
+        .where(WorkoutPlanORM.week_plan_id == WeekPlanORM.id)
+        .scalar_subquery()
+    )
     query = (
-        select(WeekPlanORM)
-        .options(
-            selectinload(WeekPlanORM.workout_plans).selectinload(
-                WorkoutPlanORM.warm_ups
-            ),
-            selectinload(WeekPlanORM.workout_plans).selectinload(
-                WorkoutPlanORM.exercise_plans
-            ),
+        select(
+            WeekPlanORM.id,
+            WeekPlanORM.summary,
+            WeekPlanORM.complete,
+            WeekPlanORM.created_at,
+            workout_count.label("workout_count"),
+            completed_workout_count.label("completed_workout_count"),
+            exercise_count.label("exercise_count"),
         )
         .where(WeekPlanORM.user_id == user.user_id)
-        .order_by(WeekPlanORM.created_at.desc())
-        .limit(1)
+        .order_by(WeekPlanORM.created_at.desc(), WeekPlanORM.id.desc())
     )
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor, length=2)
+        after_created_at = parse_cursor_datetime(cursor_created_at)
+        try:
+            after_id = UUID(cursor_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(
+            or_(
+                WeekPlanORM.created_at < after_created_at,
+                and_(
+                    WeekPlanORM.created_at == after_created_at,
+                    WeekPlanORM.id < after_id,
+                ),
+            )
+        )
+    if limit:
+        # Fetch one extra row to find out whether there is another page
+        query = query.limit(limit + 1)
+
+    summaries = [
+        WeekPlanSummary.model_validate(row._mapping)
+        for row in await db_session.execute(query)
+    ]
+
+    headers = {}
+    if limit and len(summaries) > limit:
+        summaries = summaries[:limit]
+        last = summaries[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+
+    return Response(summaries, headers=headers)
+
+
+async def _week_plan_response(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    version_query: Select,
+) -> Response[WeekPlan]:
+    """
+    Respond with a week plan, or with a 304 if the client has its current version.
+
+    The version of the plan is read first, so that clients polling for an unchanged
+    plan can be answered without loading the whole plan. Workouts and exercises are
+    only ever updated together with their week plan.
+    """
+    version: Row[UUID, datetime, bool] | None = (
+        await db_session.execute(
+            version_query.with_only_columns(
+                WeekPlanORM.id, WeekPlanORM.updated_at, WeekPlanORM.complete
+            )
+        )
+    ).one_or_none()
+
+    if not version:
+        raise HTTPException(status_code=404, detail="Week plan not found")
+
+    etag = make_etag(*version)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    query = select(WeekPlanORM).where(WeekPlanORM.id == version.id)
     week_plan_orm = await db_session.scalar(query)
 
     if not week_plan_orm:
         raise HTTPException(status_code=404, detail="Week plan not found")
 
-    return WeekPlan.model_validate(week_plan_orm, strict=False)
+    return Response(
+        WeekPlan.model_validate(week_plan_orm, strict=False),
+        headers=etag_headers(etag),
+    )
+
+
+@get(path="/latest")
+async def get_latest_week_plan(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+) -> Response[WeekPlan]:
+    """Get a workout plan"""
+    user = request.user
+    return await _week_plan_response(
+        db_session,
+        request,
+        select(WeekPlanORM)
+        .where(WeekPlanORM.user_id == user.user_id)
+        .order_by(WeekPlanORM.created_at.desc())
+        .limit(1),
+    )
+
+
+@get(path="/{week_plan_id:uuid}")
+async def get_week_plan(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    week_plan_id: UUID,
+) -> Response[WeekPlan]:
+    """Get one of a user's workout plans by its id"""
+    user = request.user
+    return await _week_plan_response(
+        db_session,
+        request,
+        select(WeekPlanORM).where(
+            WeekPlanORM.user_id == user.user_id, WeekPlanORM.id == week_plan_id
+        ),
+    )
 
 
 @patch(path="/{week_plan_id:uuid}")
@@ -229,7 +347,7 @@ async def patch_week_plan(
     week_plan_id: UUID,
     data: WeekPlanUpdate,
 ) -> WeekPlan:
-    """Get a workout plan"""
+    """Mark a workout plan, and all of its workouts and exercises, as complete"""
 
     if data.complete is False:
         raise HTTPException(
@@ -237,30 +355,44 @@ async def patch_week_plan(
         )
 
     user = request.user
-    query = (
-        select(WeekPlanORM)
-        .options(
-            selectinload(WeekPlanORM.workout_plans).selectinload(
-                WorkoutPlanORM.warm_ups
-            ),
-            selectinload(WeekPlanORM.workout_plans).selectinload(
-                WorkoutPlanORM.exercise_plans
-            ),
-        )
-        .where(WeekPlanORM.user_id == user.user_id, WeekPlanORM.id == week_plan_id)
+    # Each table is updated with one statement whatever the size of the plan, and
+    # updated_at is set by its onupdate default
+    result = cast(
+        CursorResult,
+        await db_session.execute(
+            update(WeekPlanORM)
+            .where(WeekPlanORM.user_id == user.user_id, WeekPlanORM.id == week_plan_id)
+            .values(complete=data.complete)
+            .execution_options(synchronize_session=False)
+        ),
     )
-    week_plan_orm = await db_session.scalar(query)
-
-    if not week_plan_orm:
+    if result.rowcount != 1:
+        await db_session.rollback()
         raise HTTPException(status_code=404, detail="Week plan not found")
 
-    setattr(week_plan_orm, "complete", data.complete)
-    for workout_plan in week_plan_orm.workout_plans:
-        setattr(workout_plan, "complete", data.complete)
-        for exercise_plan in workout_plan.exercise_plans:
-            setattr(exercise_plan, "complete", data.complete)
-
+    await db_session.execute(
+        update(WorkoutPlanORM)
+        .where(WorkoutPlanORM.week_plan_id == week_plan_id)
+        .values(complete=data.complete)
+        .execution_options(synchronize_session=False)
+    )
+    await db_session.execute(
+        update(ExercisePlanORM)
+        .where(
+            ExercisePlanORM.workout_plan_id.in_(
+                select(WorkoutPlanORM.id).where(
+                    WorkoutPlanORM.week_plan_id == week_plan_id
+                )
+            )
+        )
+        .values(complete=data.complete)
+        .execution_options(synchronize_session=False)
+    )
     await db_session.commit()
+
+    week_plan_orm = await db_session.scalar(
+        select(WeekPlanORM).where(WeekPlanORM.id == week_plan_id)
+    )
     return WeekPlan.model_validate(week_plan_orm, strict=False)
 
 
@@ -268,8 +400,12 @@ week_plan_router = Router(
     path="/api/week_plans",
     route_handlers=[
         post_week_plan,
+        post_week_plan_stream,
+        get_week_plan_job,
         get_week_plans,
+        get_week_plan_summaries,
         get_latest_week_plan,
+        get_week_plan,
         patch_week_plan,
     ],
     tags=["week_plans"],
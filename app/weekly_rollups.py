@@ -0,0 +1,284 @@
+import math
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta, timezone
+from typing import cast
+
+from attrs import define, evolve
+from litestar import Request, Router, get
+from litestar.datastructures import State
+from litestar.params import Parameter
+from pydantic import BaseModel
+from sqlalchemy import CursorResult, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import ExerciseResult, WeeklyRollup, WeeklyRollupORM
+from app.pagination import as_utc
+from app.sql_functions import iso_week_start
+from app.user_auth import AccessToken, User
+
+
+def week_start_of(value: datetime) -> date:
+    """The Monday starting the ISO week of a datetime's UTC date, as in SQL."""
+    day = as_utc(value).astimezone(timezone.utc).date()
+    return day - timedelta(days=day.weekday())
+
+
+@define(frozen=True)
+class Contribution:
+    """What one or more results add to a week's rollup."""
+
+    user_id: str
+    exercise_id: int
+    week_start: date
+    result_count: int
+    sets: int
+    reps: int
+    volume: float
+
+    @classmethod
+    def of_result(
+        cls,
+        user_id: str,
+        exercise_id: int,
+        date: datetime,
+        sets: int,
+        reps: int,
+        weight: float,
+    ) -> "Contribution":
+        return cls(
+            user_id=user_id,
+            exercise_id=exercise_id,
+            week_start=week_start_of(date),
+            result_count=1,
+            sets=sets,
+            reps=sets * reps,
+            volume=sets * reps * weight,
+        )
+
+    @property
+    def key(self) -> tuple[str, int, date]:
+        return (self.user_id, self.exercise_id, self.week_start)
+
+    @property
+    def is_empty(self) -> bool:
+        return (self.result_count, self.sets, self.reps, self.volume) == (0, 0, 0, 0)
+
+    def __add__(self, other: "Contribution") -> "Contribution":
+        return evolve(
+            self,
+            result_count=self.result_count + other.result_count,
+            sets=self.sets + other.sets,
+            reps=self.reps + other.reps,
+            volume=self.volume + other.volume,
+        )
+
+    def __neg__(self) -> "Contribution":
+        return evolve(
+            self,
+            result_count=-self.result_count,
+            sets=-self.sets,
+            reps=-self.reps,
+            volume=-self.volume,
+        )
+
+
+async def apply_to_weekly_rollups(
+    db_session: AsyncSession, contributions: Iterable[Contribution]
+) -> None:
+    """
+    Add results' contributions to, or with negative ones take them from, the rollups.
+
+    The totals are changed by the DB, so that concurrent results can't overwrite
+    each other's contributions. Weeks left without any results are removed.
+    """
+    combined: dict[tuple[str, int, date], Contribution] = {}
+    for contribution in contributions:
+        key = contribution.key
+        combined[key] = (
+            combined[key] + contribution if key in combined else contribution
+        )
+
+    for contribution in combined.values():
+        # e.g. a result was edited without changing what it contributes
+        if not contribution.is_empty:
+            await _apply_contribution(db_session, contribution)
+
+
+async def _apply_contribution(
+    db_session: AsyncSession, contribution: Contribution
+) -> None:
+    where = (
+        WeeklyRollupORM.user_id == contribution.user_id,
+        WeeklyRollupORM.exercise_id == contribution.exercise_id,
+        WeeklyRollupORM.week_start == contribution.week_start,
+    )
+    change_totals = (
+        update(WeeklyRollupORM)
+        .where(*where)
+        .values(
+            result_count=WeeklyRollupORM.result_count + contribution.result_count,
+            sets=WeeklyRollupORM.sets + contribution.sets,
+            reps=WeeklyRollupORM.reps + contribution.reps,
+            volume=WeeklyRollupORM.volume + contribution.volume,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    # Retry once in case a concurrent result starts the same week
+    for attempt in range(2):
+        result = cast(CursorResult, await db_session.execute(change_totals))
+        if result.rowcount:
+            break
+        if contribution.result_count <= 0:
+            # There's nothing to take the contribution from
+            return
+        try:
+            async with db_session.begin_nested():
+                await db_session.execute(
+                    insert(WeeklyRollupORM).values(
+                        user_id=contribution.user_id,
+                        exercise_id=contribution.exercise_id,
+                        week_start=contribution.week_start,
+                        result_count=contribution.result_count,
+                        sets=contribution.sets,
+                        reps=contribution.reps,
+                        volume=contribution.volume,
+                    )
+                )
+            return
+        except IntegrityError:
+            if attempt:
+                raise
+
+    if contribution.result_count < 0:
+        await db_session.execute(
+            delete(WeeklyRollupORM).where(*where, WeeklyRollupORM.result_count <= 0)
+        )
+
+
+def _recomputed_rollups_query():
+    """Aggregate every result into its week's rollup, as the rollups should be."""
+    week_start = iso_week_start(ExerciseResult.date)
+    return (
+        select(
+            ExerciseResult.user_id,
+            ExerciseResult.exercise_id,
+            week_start.label("week_start"),
+            func.count().label("result_count"),
+            func.sum(ExerciseResult.sets).label("sets"),
+            func.sum(ExerciseResult.sets * ExerciseResult.reps).label("reps"),
+            func.sum(
+                ExerciseResult.sets * ExerciseResult.reps * ExerciseResult.weight
+            ).label("volume"),
+        )
+        .where(ExerciseResult.exercise_id.is_not(None))
+        .group_by(ExerciseResult.user_id, ExerciseResult.exercise_id, week_start)
+    )
+
+
+class RollupMismatch(BaseModel):
+    user_id: str
+    exercise_id: int
+    week_start: date
+    # Either is None if there's no such rollup
+    expected: WeeklyRollup | None
+    actual: WeeklyRollup | None
+
+
+def _same_totals(expected: WeeklyRollup, actual: WeeklyRollup) -> bool:
+    return (
+        expected.result_count == actual.result_count
+        and expected.sets == actual.sets
+        and expected.reps == actual.reps
+        # Adding and taking away volumes in a different order may round differently
+        and math.isclose(expected.volume, actual.volume, rel_tol=1e-9, abs_tol=1e-6)
+    )
+
+
+async def verify_weekly_rollups(db_session: AsyncSession) -> list[RollupMismatch]:
+    """Compare every rollup with a recompute from the results, returning mismatches."""
+    expected = {
+        (row.user_id, row.exercise_id, row.week_start): WeeklyRollup.model_validate(
+            row._mapping
+        )
+        for row in await db_session.execute(_recomputed_rollups_query())
+    }
+    actual = {
+        (rollup.user_id, rollup.exercise_id, rollup.week_start): (
+            WeeklyRollup.model_validate(rollup)
+        )
+        for rollup in await db_session.scalars(select(WeeklyRollupORM))
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys()):
+        expected_rollup = expected.get(key)
+        actual_rollup = actual.get(key)
+        if (
+            expected_rollup
+            and actual_rollup
+            and _same_totals(expected_rollup, actual_rollup)
+        ):
+            continue
+        user_id, exercise_id, week_start = key
+        mismatches.append(
+            RollupMismatch(
+                user_id=user_id,
+                exercise_id=exercise_id,
+                week_start=week_start,
+                expected=expected_rollup,
+                actual=actual_rollup,
+            )
+        )
+    return mismatches
+
+
+async def rebuild_weekly_rollups(db_session: AsyncSession) -> None:
+    """Replace every rollup with a recompute from the results."""
+    query = _recomputed_rollups_query()
+    await db_session.execute(delete(WeeklyRollupORM))
+    await db_session.execute(
+        insert(WeeklyRollupORM).from_select(
+            [column.name for column in query.selected_columns], query
+        )
+    )
+    await db_session.commit()
+
+
+@get(path="")
+async def get_weekly_rollups(
+    db_session: AsyncSession,
+    request: Request[User, AccessToken, State],
+    exercise_id: int | None = None,
+    from_date: date | None = Parameter(query="from", default=None),
+    to_date: date | None = Parameter(query="to", default=None),
+) -> list[WeeklyRollup]:
+    """
+    Get a user's weekly totals for each exercise, for progress charts.
+
+    Weeks can be restricted to those starting in [from, to).
+    """
+    user = request.user
+    query = (
+        select(WeeklyRollupORM)
+        .where(WeeklyRollupORM.user_id == user.user_id)
+        .order_by(WeeklyRollupORM.exercise_id, WeeklyRollupORM.week_start)
+    )
+    if exercise_id is not None:
+        query = query.where(WeeklyRollupORM.exercise_id == exercise_id)
+    if from_date:
+        query = query.where(WeeklyRollupORM.week_start >= from_date)
+    if to_date:
+        query = query.where(WeeklyRollupORM.week_start < to_date)
+
+    return [
+        WeeklyRollup.model_validate(rollup)
+        for rollup in await db_session.scalars(query)
+    ]
+
+
+weekly_rollup_router = Router(
+    path="/api/weekly_rollups",
+    route_handlers=[get_weekly_rollups],
+    tags=["weekly_rollups"],
+)
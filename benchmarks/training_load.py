@@ -0,0 +1,205 @@
+"""
+Compare computing training load with NumPy against looping over results in Python.
+
+The NumPy version is app.analytics, which computes every metric from one array per
+column of the results. The reference computes the same metrics by looping over
+ExerciseResult objects, as they'd be loaded through the ORM.
+
+Run with
+
+    python benchmarks/training_load.py
+
+A synthetic 5 year history is used, of 5 sessions a week of 6 exercises each. The
+NumPy version is timed both from rows, as loaded from the DB, and from columns that
+have already been built, which is what's left once the rows have been fetched.
+"""
+
+import argparse
+import random
+import statistics
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from time import perf_counter
+from typing import Callable
+
+from app.analytics import (
+    ACUTE_DAYS,
+    CHRONIC_DAYS,
+    DEFAULT_RPE,
+    MUSCLE_GROUPS,
+    OTHER_MUSCLE_GROUP,
+    ResultColumns,
+    TrainingLoad,
+    compute_training_load,
+)
+from app.models.models import ExerciseResult
+
+USER_ID = "benchmark_user_id"
+YEARS = 5
+SESSIONS_PER_WEEK = 5
+EXERCISES_PER_SESSION = 6
+
+EXERCISE_NAMES = dict(enumerate(MUSCLE_GROUPS, start=1))
+
+
+def synthetic_history(end: date, seed: int = 0) -> list[ExerciseResult]:
+    rng = random.Random(seed)
+    results = []
+    day = end - timedelta(days=YEARS * 365)
+    while day < end:
+        for weekday in rng.sample(range(7), SESSIONS_PER_WEEK):
+            session_day = day + timedelta(days=weekday)
+            for exercise_id in rng.sample(
+                sorted(EXERCISE_NAMES), EXERCISES_PER_SESSION
+            ):
+                results.append(
+                    ExerciseResult(
+                        user_id=USER_ID,
+                        exercise_id=exercise_id,
+                        sets=rng.randint(2, 5),
+                        reps=rng.randint(3, 12),
+                        weight=rng.uniform(10, 150),
+                        rpe=rng.choice([None, 6, 7, 8, 9, 10]),
+                        date=datetime.combine(
+                            session_day, time(rng.randint(6, 20)), timezone.utc
+                        ),
+                    )
+                )
+        day += timedelta(days=7)
+    return results
+
+
+def training_load_reference(
+    results: list[ExerciseResult],
+    from_date: date,
+    to_date: date,
+    exercise_names: dict[int, str],
+) -> TrainingLoad:
+    first_day = from_date - timedelta(days=CHRONIC_DAYS - 1)
+    days = [first_day + timedelta(days=n) for n in range((to_date - first_day).days)]
+    daily_tonnage: dict[date, float] = defaultdict(float)
+    daily_load: dict[date, float] = defaultdict(float)
+    muscle_group_volume: dict[str, float] = defaultdict(float)
+    for result in results:
+        day = result.date.astimezone(timezone.utc).date()
+        if not first_day <= day < to_date:
+            continue
+        tonnage = result.sets * result.reps * result.weight
+        rpe = result.rpe if result.rpe is not None else DEFAULT_RPE
+        daily_tonnage[day] += tonnage
+        daily_load[day] += tonnage * rpe / 10
+        if day >= from_date and result.exercise_id is not None:
+            name = exercise_names.get(result.exercise_id, "")
+            for muscle_group in MUSCLE_GROUPS.get(name, [OTHER_MUSCLE_GROUP]):
+                muscle_group_volume[muscle_group] += tonnage
+
+    def rolling(values: dict[date, float], day: date, window: int) -> float:
+        return sum(values[day - timedelta(days=n)] for n in range(window))
+
+    shown = [day for day in days if day >= from_date]
+    ratios: list[float | None] = []
+    for day in shown:
+        chronic = rolling(daily_load, day, CHRONIC_DAYS) / CHRONIC_DAYS
+        acute = rolling(daily_load, day, ACUTE_DAYS) / ACUTE_DAYS
+        ratios.append(acute / chronic if chronic > 0 else None)
+    return TrainingLoad(
+        from_date=from_date,
+        tonnage=[daily_tonnage[day] for day in shown],
+        rpe_weighted_load=[daily_load[day] for day in shown],
+        tonnage_7_day=[rolling(daily_tonnage, day, ACUTE_DAYS) for day in shown],
+        tonnage_28_day=[rolling(daily_tonnage, day, CHRONIC_DAYS) for day in shown],
+        acute_chronic_ratio=ratios,
+        muscle_group_volume=dict(sorted(muscle_group_volume.items())),
+    )
+
+
+def assert_close(actual: TrainingLoad, expected: TrainingLoad) -> None:
+    for field in TrainingLoad.model_fields:
+        actual_value, expected_value = getattr(actual, field), getattr(expected, field)
+        if isinstance(expected_value, list):
+            assert len(actual_value) == len(expected_value), field
+            for a, b in zip(actual_value, expected_value):
+                assert (a is None and b is None) or abs(a - b) <= 1e-6 * max(
+                    1, abs(b)
+                ), field
+        elif isinstance(expected_value, dict):
+            assert actual_value.keys() == expected_value.keys(), field
+            for key in expected_value:
+                assert abs(actual_value[key] - expected_value[key]) <= 1e-6 * max(
+                    1, abs(expected_value[key])
+                ), field
+        else:
+            assert actual_value == expected_value, field
+
+
+def time_it(run: Callable[[], TrainingLoad], iterations: int) -> list[float]:
+    durations = []
+    for _ in range(iterations):
+        start = perf_counter()
+        run()
+        durations.append(perf_counter() - start)
+    return durations
+
+
+def main(iterations: int, days: int) -> None:
+    to_date = date(2025, 1, 1)
+    from_date = to_date - timedelta(days=days)
+    results = synthetic_history(to_date)
+    rows = [
+        (
+            result.date,
+            result.sets,
+            result.reps,
+            result.weight,
+            result.rpe,
+            result.exercise_id,
+        )
+        for result in results
+    ]
+    columns = ResultColumns.from_rows(rows)
+
+    assert_close(
+        compute_training_load(columns, from_date, to_date, EXERCISE_NAMES),
+        training_load_reference(results, from_date, to_date, EXERCISE_NAMES),
+    )
+
+    print(
+        f"Computing {days} days of training load from {len(results)} results, "
+        f"{iterations} times"
+    )
+    for name, run in [
+        (
+            "Python loops",
+            lambda: training_load_reference(
+                results, from_date, to_date, EXERCISE_NAMES
+            ),
+        ),
+        (
+            "NumPy from rows",
+            lambda: compute_training_load(
+                ResultColumns.from_rows(rows), from_date, to_date, EXERCISE_NAMES
+            ),
+        ),
+        (
+            "NumPy from columns",
+            lambda: compute_training_load(columns, from_date, to_date, EXERCISE_NAMES),
+        ),
+    ]:
+        durations = time_it(run, iterations)
+        print(
+            f"{name:>18}: mean {statistics.mean(durations) * 1000:.2f}ms, "
+            f"median {statistics.median(durations) * 1000:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=YEARS * 365 - CHRONIC_DAYS,
+        help="Days of training load to compute, up to the end of the history",
+    )
+    args = parser.parse_args()
+    main(args.iterations, args.days)
@@ -11,8 +11,8 @@ import pytest_asyncio
 from advanced_alchemy.extensions.litestar.plugins import (
     SQLAlchemyAsyncConfig as AdvancedAlchemyConfig,
 )
-from anthropic import Anthropic
-from anthropic.types import Message, TextBlock
+from anthropic import AsyncAnthropic
+from anthropic.types import Message, TextBlock, Usage
 from attrs import define
 from litestar import Litestar
 from litestar.contrib.sqlalchemy.base import UUIDBase
@@ -30,9 +30,13 @@ from sqlalchemy.ext.asyncio import (
 from app.app import create_app
 from app.llm.claude_prompts import SCREENING_PROMPT
 from app.models.models import Exercise, ScreeningResult, ScreeningStatus
+from app.user_auth import verified_token_cache
 
 sqlite3.register_adapter(uuid.UUID, lambda u: str(u))
 sqlite3.register_converter("UUID", lambda s: uuid.UUID(s.decode()) if s else None)
+# SQLAlchemy parses dates itself, so they shouldn't be parsed by sqlite3's default
+# converter first
+sqlite3.register_converter("DATE", lambda s: s.decode())
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -89,15 +93,41 @@ async def db_session(sqlalchemy_config) -> AsyncGenerator[AsyncSession, None]:
 class MockMessage(BaseModel):
     role: str
     content: list[TextBlock]
+    model: str = "mock-model"
+    usage: Usage = Usage(input_tokens=0, output_tokens=0)
+
+
+class MockMessageStream:
+    """Streams a message's text in small chunks, like the Anthropic client does."""
+
+    def __init__(self, message: MockMessage, chunk_size: int = 40):
+        self.message = message
+        self.chunk_size = chunk_size
+
+    async def __aenter__(self) -> "MockMessageStream":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    @property
+    async def text_stream(self) -> AsyncGenerator[str, None]:
+        text = self.message.content[-1].text
+        for start in range(0, len(text), self.chunk_size):
+            end = start + self.chunk_size
+            yield text[start:end]
+
+    async def get_final_message(self) -> MockMessage:
+        return self.message
 
 
 @pytest.fixture(scope="function")
 def mock_anthropic_client():
-    client = AsyncMock(spec=Anthropic)
+    client = AsyncMock(spec=AsyncAnthropic)
 
     messages = AsyncMock(spec=Message)
 
-    def create(system: str, *args, **kwargs):
+    def message(system: str | list[dict[str, Any]]) -> MockMessage:
         content = Mock(spec=TextBlock)
 
         if system == SCREENING_PROMPT:
@@ -112,7 +142,14 @@ def mock_anthropic_client():
             content=[content],
         )
 
+    async def create(system: str | list[dict[str, Any]], *args, **kwargs):
+        return message(system)
+
+    def stream(system: str | list[dict[str, Any]], *args, **kwargs):
+        return MockMessageStream(message(system))
+
     messages.create = create
+    messages.stream = stream
     client.configure_mock(messages=messages)
     return client
 
@@ -184,6 +221,7 @@ def mock_firebase_auth(mock_user, mock_admin_user):
     Fixture that mocks firebase_admin.auth with just the
     verify_id_token and get_user methods.
     """
+    verified_token_cache.clear()
     with patch("firebase_admin.auth") as mock_auth:
         # Create a users database for our mock
         users = {
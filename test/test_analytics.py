@@ -0,0 +1,124 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from conftest import MockUser
+from litestar.testing import AsyncTestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.analytics import (
+    CHRONIC_DAYS,
+    MUSCLE_GROUPS,
+    ResultColumns,
+    compute_training_load,
+)
+from app.models.models import Exercise, ExerciseResult
+
+
+def test_muscle_groups_cover_the_default_exercises(mock_exercises: list[Exercise]):
+    assert {str(exercise.name) for exercise in mock_exercises} == MUSCLE_GROUPS.keys()
+
+
+def test_compute_training_load():
+    columns = ResultColumns.from_rows(
+        [
+            # Before the first day, so only in the rolling series
+            (datetime(2025, 1, 5, tzinfo=timezone.utc), 1, 10, 100.0, None, 7),
+            (datetime(2025, 1, 10, 9, tzinfo=timezone.utc), 3, 5, 100.0, 10, 7),
+            (datetime(2025, 1, 10, 18, tzinfo=timezone.utc), 2, 10, 20.0, 5, 13),
+            (datetime(2025, 1, 12, tzinfo=timezone.utc), 1, 1, 50.0, None, None),
+            # After the last day
+            (datetime(2025, 1, 13, tzinfo=timezone.utc), 1, 1, 1000.0, None, 7),
+        ]
+    )
+    load = compute_training_load(
+        columns,
+        date(2025, 1, 10),
+        date(2025, 1, 13),
+        exercise_names={7: "Back Squat", 13: "Bench Press"},
+    )
+
+    assert load.tonnage == [1900.0, 0.0, 50.0]
+    assert load.rpe_weighted_load == [1500.0 + 200.0, 0.0, 35.0]
+    # The 5th drops out of the last 7 days on the 12th
+    assert load.tonnage_7_day == [2900.0, 2900.0, 1950.0]
+    assert load.tonnage_28_day == [2900.0, 2900.0, 2950.0]
+    chronic = (700.0 + 1700.0) / CHRONIC_DAYS
+    assert load.acute_chronic_ratio == pytest.approx(
+        [
+            (700.0 + 1700.0) / 7 / chronic,
+            (700.0 + 1700.0) / 7 / chronic,
+            (1700.0 + 35.0) / 7 / ((700.0 + 1700.0 + 35.0) / CHRONIC_DAYS),
+        ]
+    )
+    assert load.muscle_group_volume == {
+        "chest": 400.0,
+        "glutes": 1500.0,
+        "quads": 1500.0,
+        "shoulders": 400.0,
+        "triceps": 400.0,
+    }
+
+
+def test_compute_training_load_without_results():
+    load = compute_training_load(
+        ResultColumns.from_rows([]),
+        date(2025, 1, 10),
+        date(2025, 1, 12),
+        exercise_names={},
+    )
+    assert load.tonnage == [0.0, 0.0]
+    assert load.acute_chronic_ratio == [None, None]
+    assert load.muscle_group_volume == {}
+
+
+@pytest.mark.asyncio
+async def test_get_training_load(
+    test_client: AsyncTestClient,
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_admin_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    back_squat = next(
+        exercise for exercise in mock_exercises if exercise.name == "Back Squat"
+    )
+    db_session.add_all(
+        [
+            ExerciseResult(
+                user_id=user.user_id,
+                exercise_id=back_squat.id,
+                sets=3,
+                reps=5,
+                weight=100.0,
+                rpe=8,
+                date=datetime(2025, 1, day, 12, tzinfo=timezone.utc),
+            )
+            for user, day in [(mock_user, 1), (mock_user, 3), (mock_admin_user, 3)]
+        ]
+    )
+    await db_session.commit()
+
+    response = await test_client.get(
+        "/api/analytics/training_load",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        params={"from": "2025-01-02", "to": "2025-01-04"},
+    )
+    assert response.status_code == 200
+    load = response.json()
+    assert load["from_date"] == "2025-01-02"
+    assert load["tonnage"] == [0.0, 1500.0]
+    assert load["tonnage_7_day"] == [1500.0, 3000.0]
+    assert load["muscle_group_volume"] == {"glutes": 1500.0, "quads": 1500.0}
+
+
+@pytest.mark.asyncio
+async def test_get_training_load_invalid_range(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+):
+    response = await test_client.get(
+        "/api/analytics/training_load",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        params={"from": "2025-01-04", "to": "2025-01-04"},
+    )
+    assert response.status_code == 400
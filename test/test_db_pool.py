@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import pytest
+from conftest import MockUser
+from litestar.testing import AsyncTestClient
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db_pool import TimedAsyncAdaptedQueuePool, pool_stats
+
+
+@pytest.mark.asyncio
+async def test_pool_records_checkout_waits(tmp_path: Path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/test.db",
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            stats = pool_stats(engine.pool)
+            assert stats.size == 1
+            assert stats.checked_out == 1
+
+            # The only connection is in use, so this waits and then gives up
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        stats = pool_stats(engine.pool)
+        assert stats.checked_out == 0
+        assert stats.checkouts == 2
+        assert stats.timeouts == 1
+        assert stats.max_wait_seconds is not None
+        assert stats.total_wait_seconds is not None
+        assert stats.max_wait_seconds >= 0.05
+        assert stats.total_wait_seconds >= stats.max_wait_seconds
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_db_pool(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_admin_user: MockUser,
+):
+    response = await test_client.get(
+        "/api/admin/db_pool",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert response.status_code == 401
+
+    response = await test_client.get(
+        "/api/admin/db_pool",
+        headers={"Authorization": f"Bearer {mock_admin_user.user_id}"},
+    )
+    assert response.status_code == 200
+    # The test DB doesn't use a queue pool
+    assert response.json()["pool_class"] == "StaticPool"
+    assert response.json()["checked_out"] is None
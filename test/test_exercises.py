@@ -1,6 +1,11 @@
+from unittest.mock import patch
+
 import pytest
 from conftest import MockUser
+from litestar import Litestar
 from litestar.testing import AsyncTestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
 from app.models.models import Exercise
 
@@ -80,3 +85,176 @@ async def test_delete_exercise(
     )
     assert get_response.status_code == 200
     assert mock_exercise.id not in [exercise["id"] for exercise in get_response.json()]
+
+
+@pytest.mark.asyncio
+async def test_get_exercises_is_cached(
+    test_client: AsyncTestClient,
+    db_engine: AsyncEngine,
+    mock_exercises: list[Exercise],
+    mock_user: MockUser,
+):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    response = await test_client.get(
+        "/api/exercises", headers={"Authorization": f"Bearer {mock_user.user_id}"}
+    )
+    assert response.status_code == 200
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        cached_response = await test_client.get(
+            "/api/exercises", headers={"Authorization": f"Bearer {mock_user.user_id}"}
+        )
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert cached_response.json() == response.json()
+    assert not [statement for statement in statements if "exercises" in statement]
+
+
+@pytest.mark.asyncio
+async def test_get_exercises_revalidates_changes_from_other_replicas(
+    test_app: Litestar,
+    test_client: AsyncTestClient,
+    db_session: AsyncSession,
+    mock_exercises: list[Exercise],
+    mock_user: MockUser,
+):
+    exercise_catalogue = test_app.state.exercise_catalogue
+    response = await test_client.get(
+        "/api/exercises", headers={"Authorization": f"Bearer {mock_user.user_id}"}
+    )
+    assert len(response.json()) == len(mock_exercises)
+    version = exercise_catalogue._snapshot.version
+
+    # Simulate another replica adding an exercise behind this one's back
+    db_session.add(Exercise(name="Another Exercise"))
+    await db_session.commit()
+    exercise_catalogue.revalidate_after = 0
+
+    response = await test_client.get(
+        "/api/exercises", headers={"Authorization": f"Bearer {mock_user.user_id}"}
+    )
+    assert len(response.json()) == len(mock_exercises) + 1
+    assert exercise_catalogue._snapshot.version != version
+
+
+@pytest.mark.asyncio
+async def test_get_exercises_not_modified(
+    test_client: AsyncTestClient,
+    mock_exercises: list[Exercise],
+    mock_user: MockUser,
+    mock_admin_user: MockUser,
+):
+    response = await test_client.get(
+        "/api/exercises", headers={"Authorization": f"Bearer {mock_user.user_id}"}
+    )
+    etag = response.headers["etag"]
+
+    not_modified_response = await test_client.get(
+        "/api/exercises",
+        headers={
+            "Authorization": f"Bearer {mock_user.user_id}",
+            "If-None-Match": etag,
+        },
+    )
+    assert not_modified_response.status_code == 304
+    assert not_modified_response.content == b""
+
+    await test_client.post(
+        "/api/exercises",
+        headers={"Authorization": f"Bearer {mock_admin_user.user_id}"},
+        json={"exercises": [{"name": "New Exercise"}]},
+    )
+    modified_response = await test_client.get(
+        "/api/exercises",
+        headers={
+            "Authorization": f"Bearer {mock_user.user_id}",
+            "If-None-Match": etag,
+        },
+    )
+    assert modified_response.status_code == 200
+    assert modified_response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("returning", [True, False])
+async def test_post_exercises_reports_duplicates(
+    test_client: AsyncTestClient,
+    db_engine: AsyncEngine,
+    mock_admin_user: MockUser,
+    mock_exercises: list[Exercise],
+    returning: bool,
+):
+    existing = mock_exercises[0]
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        with patch.object(db_engine.dialect, "insert_executemany_returning", returning):
+            post_response = await test_client.post(
+                "/api/exercises",
+                headers={"Authorization": f"Bearer {mock_admin_user.user_id}"},
+                json={
+                    "exercises": [
+                        {"name": "Bear Crawl"},
+                        {"name": existing.name},
+                        {"name": "Sled Push", "video_link": "https://example.com"},
+                        {"name": "Bear Crawl"},
+                    ]
+                },
+            )
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert post_response.status_code == 201
+    results = post_response.json()
+    assert [result["created"] for result in results] == [True, False, True, False]
+    assert [result["error"] for result in results] == [
+        None,
+        "An exercise with that name already exists",
+        None,
+        "An exercise with that name already exists",
+    ]
+    assert results[1]["id"] == existing.id
+    assert results[3]["id"] == results[0]["id"]
+    assert results[2]["video_link"] == "https://example.com"
+
+    # All the new exercises are added by one statement, without refreshing each
+    inserts = [s for s in statements if s.startswith("INSERT INTO exercises")]
+    assert len(inserts) == 1
+    selects = [s for s in statements if s.startswith("SELECT")]
+    assert len(selects) == (1 if returning else 2)
+
+
+@pytest.mark.asyncio
+async def test_post_exercises_reports_duplicates_in_any_case(
+    test_client: AsyncTestClient,
+    mock_admin_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    existing = mock_exercises[0]
+    post_response = await test_client.post(
+        "/api/exercises",
+        headers={"Authorization": f"Bearer {mock_admin_user.user_id}"},
+        json={
+            "exercises": [
+                {"name": existing.name.lower()},
+                {"name": "Bear Crawl"},
+                {"name": "BEAR CRAWL"},
+            ]
+        },
+    )
+
+    assert post_response.status_code == 201
+    results = post_response.json()
+    assert [result["created"] for result in results] == [False, True, False]
+    assert results[0]["id"] == existing.id
+    assert results[2]["id"] == results[1]["id"]
@@ -0,0 +1,34 @@
+import json
+
+from app.llm.json_stream import JSONArrayStreamParser
+
+
+def test_objects_are_returned_once_complete():
+    document = json.dumps(
+        {
+            "summary": 'A plan with "workouts": [ in the summary',
+            "workouts": [{"title": "Day 1", "tags": ["}", "]"]}, {"title": "Day 2"}],
+        }
+    )
+    parser = JSONArrayStreamParser("workouts")
+
+    objects = []
+    for character in document:
+        for obj in parser.feed(character):
+            objects.append((obj, len(parser.text)))
+
+    assert [obj for obj, _ in objects] == [
+        {"title": "Day 1", "tags": ["}", "]"]},
+        {"title": "Day 2"},
+    ]
+    # Each object is returned as soon as its closing brace arrives
+    assert [length for _, length in objects] == [
+        document.index("}, {") + 1,
+        document.index("}]") + 1,
+    ]
+    assert json.loads(parser.text) == json.loads(document)
+
+
+def test_nothing_is_returned_without_the_key():
+    parser = JSONArrayStreamParser("workouts")
+    assert parser.feed('{"summary": "Nothing here"}') == []
@@ -1,5 +1,13 @@
+import logging
+import re
+from typing import Any
+from unittest.mock import patch
+
 import pytest
-from sqlalchemy import inspect
+from conftest import MockUser
+from litestar.testing import AsyncTestClient
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine
 
 
 @pytest.mark.asyncio
@@ -14,8 +22,96 @@ async def test_db_setup(db_engine):
         "exercises",
         "exercise_results",
         "user_profiles",
+        "screening_verdicts",
+        "personal_records",
+        "weekly_rollups",
         "week_plans",
         "workout_plans",
         "warm_up_plans",
         "exercise_plans",
+        "week_plan_jobs",
     }
+
+
+async def explain_query_plans(
+    db_engine: AsyncEngine, statements: list[tuple[str, Any]]
+) -> list[str]:
+    """Return SQLite's query plan for each of the given statements."""
+    plans = []
+    async with db_engine.connect() as conn:
+        for statement, parameters in statements:
+            rows = await conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            plans.append(" ".join(row.detail for row in rows))
+    return plans
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path,table_name,index_name",
+    [
+        (
+            "/api/exercise_results",
+            "exercise_results",
+            "ix_exercise_results_user_id_date",
+        ),
+        (
+            "/api/week_plans/latest",
+            "week_plans",
+            "ix_week_plans_user_id_created_at",
+        ),
+    ],
+)
+async def test_user_queries_use_indexes(
+    db_engine: AsyncEngine,
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    path: str,
+    table_name: str,
+    index_name: str,
+):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and f"FROM {table_name}" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await test_client.get(
+            path, headers={"Authorization": f"Bearer {mock_user.user_id}"}
+        )
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert statements
+    for plan in await explain_query_plans(db_engine, statements):
+        assert f"USING INDEX {index_name}" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.asyncio
+async def test_requests_report_their_queries(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_exercises,
+    caplog: pytest.LogCaptureFixture,
+):
+    with (
+        patch("app.query_instrumentation.SLOW_QUERY_SECONDS", 0),
+        caplog.at_level(logging.WARNING, logger="app.query_instrumentation"),
+    ):
+        response = await test_client.get(
+            "/api/exercise_results",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        )
+
+    assert response.status_code == 200
+    match = re.fullmatch(
+        r'db;dur=[0-9.]+;desc="(\d+) queries", db-pool;dur=[0-9.]+',
+        response.headers["server-timing"],
+    )
+    assert match and int(match.group(1)) == 1
+    assert "Slow query during GET /api/exercise_results took" in caplog.text
+    assert "FROM exercise_results" in caplog.text
@@ -0,0 +1,276 @@
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+from conftest import MockUser
+from litestar.testing import AsyncTestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Exercise, ExerciseResult, PersonalRecordORM
+from app.personal_records import estimated_one_rep_max, rebuild_personal_records
+
+
+@pytest.mark.parametrize(
+    "weight, reps, rpe, expected",
+    [
+        (100.0, 1, None, 100.0),
+        # Brzycki
+        (100.0, 5, None, 112.5),
+        (100.0, 10, None, 100.0 * 36 / 27),
+        # Epley
+        (60.0, 12, None, 84.0),
+        # Two reps in reserve count as if the set went to failure
+        (100.0, 3, 8, 112.5),
+        (100.0, 5, 10, 112.5),
+        # RPEs below 6 are treated as 6
+        (100.0, 1, 3, 112.5),
+    ],
+)
+def test_estimated_one_rep_max(
+    weight: float, reps: int, rpe: int | None, expected: float
+):
+    assert estimated_one_rep_max(weight, reps, rpe) == pytest.approx(expected)
+
+
+async def post_result(
+    test_client: AsyncTestClient, user: MockUser, **result: Any
+) -> str:
+    response = await test_client.post(
+        "/api/exercise_results",
+        headers={"Authorization": f"Bearer {user.user_id}"},
+        json=result,
+    )
+    assert response.status_code == 201
+    return response.text
+
+
+async def get_record(
+    test_client: AsyncTestClient, user: MockUser, exercise_id: int
+) -> dict[str, Any] | None:
+    response = await test_client.get(
+        f"/api/personal_records/{exercise_id}",
+        headers={"Authorization": f"Bearer {user.user_id}"},
+    )
+    if response.status_code == 404:
+        return None
+    assert response.status_code == 200
+    record = response.json()
+    return {
+        key: record[key]
+        for key in ("best_weight", "best_estimated_one_rep_max", "best_volume")
+    }
+
+
+@pytest.mark.asyncio
+async def test_personal_records_are_raised_by_new_results(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    squat = mock_exercises[0]
+    assert await get_record(test_client, mock_user, squat.id) is None
+
+    await post_result(
+        test_client, mock_user, exercise_id=squat.id, sets=3, reps=5, weight=100.0
+    )
+    # Heavier, but less volume and a lower estimated 1RM
+    await post_result(
+        test_client, mock_user, exercise_id=squat.id, sets=1, reps=1, weight=110.0
+    )
+
+    assert await get_record(test_client, mock_user, squat.id) == {
+        "best_weight": 110.0,
+        "best_estimated_one_rep_max": 112.5,
+        "best_volume": 1500.0,
+    }
+
+    response = await test_client.get(
+        "/api/personal_records",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert [record["exercise_id"] for record in response.json()] == [squat.id]
+
+
+@pytest.mark.asyncio
+async def test_personal_records_after_results_are_removed(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    squat, bench = mock_exercises[:2]
+    lighter_id = await post_result(
+        test_client, mock_user, exercise_id=squat.id, sets=3, reps=5, weight=100.0
+    )
+    heavier_id = await post_result(
+        test_client, mock_user, exercise_id=squat.id, sets=1, reps=1, weight=110.0
+    )
+
+    await test_client.delete(
+        f"/api/exercise_results/{heavier_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert await get_record(test_client, mock_user, squat.id) == {
+        "best_weight": 100.0,
+        "best_estimated_one_rep_max": 112.5,
+        "best_volume": 1500.0,
+    }
+
+    # Moving the last result to another exercise moves its records too
+    await test_client.patch(
+        f"/api/exercise_results/{lighter_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json={"exercise_id": bench.id, "weight": 80.0},
+    )
+    assert await get_record(test_client, mock_user, squat.id) is None
+    assert await get_record(test_client, mock_user, bench.id) == {
+        "best_weight": 80.0,
+        "best_estimated_one_rep_max": 90.0,
+        "best_volume": 1200.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_personal_record_is_created_when_missing_on_removal(
+    test_client: AsyncTestClient,
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    squat = mock_exercises[0]
+    # Results recorded before records were kept, so without a record
+    db_session.add_all(
+        [
+            ExerciseResult(
+                user_id=mock_user.user_id,
+                exercise_id=squat.id,
+                sets=3,
+                reps=5,
+                weight=weight,
+            )
+            for weight in (100.0, 110.0)
+        ]
+    )
+    await db_session.commit()
+    heavier_id = await db_session.scalar(
+        select(ExerciseResult.id).where(ExerciseResult.weight == 110.0)
+    )
+
+    await test_client.delete(
+        f"/api/exercise_results/{heavier_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert await get_record(test_client, mock_user, squat.id) == {
+        "best_weight": 100.0,
+        "best_estimated_one_rep_max": 112.5,
+        "best_volume": 1500.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_personal_records_from_a_batch(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    squat = mock_exercises[0]
+    await post_result(
+        test_client, mock_user, exercise_id=squat.id, sets=5, reps=5, weight=90.0
+    )
+
+    response = await test_client.post(
+        "/api/exercise_results/batch",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json={
+            "exercise_results": [
+                {"exercise_id": squat.id, "sets": 1, "reps": 1, "weight": 120.0},
+                {"exercise_id": squat.id, "sets": 3, "reps": 8, "weight": 80.0},
+            ]
+        },
+    )
+    assert response.status_code == 201
+
+    assert await get_record(test_client, mock_user, squat.id) == {
+        "best_weight": 120.0,
+        "best_estimated_one_rep_max": 120.0,
+        "best_volume": 2250.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_personal_record_is_one_query(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    squat = mock_exercises[0]
+    for weight in (60.0, 70.0, 80.0):
+        await post_result(
+            test_client, mock_user, exercise_id=squat.id, sets=3, reps=5, weight=weight
+        )
+
+    response = await test_client.get(
+        f"/api/personal_records/{squat.id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert response.status_code == 200
+    assert 'desc="1 queries"' in response.headers["server-timing"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_personal_records(
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_admin_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    squat, bench = mock_exercises[:2]
+    date = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    db_session.add_all(
+        [
+            ExerciseResult(
+                user_id=user.user_id,
+                exercise_id=exercise_id,
+                sets=3,
+                reps=reps,
+                weight=weight,
+                rpe=rpe,
+                date=date,
+            )
+            for user, exercise_id, reps, weight, rpe in [
+                (mock_user, squat.id, 5, 100.0, None),
+                (mock_user, squat.id, 2, 110.0, 8),
+                (mock_user, bench.id, 10, 50.0, None),
+                (mock_admin_user, squat.id, 5, 200.0, None),
+                (mock_user, None, 5, 300.0, None),
+            ]
+        ]
+    )
+    # A stale record that the rebuild should replace
+    db_session.add(
+        PersonalRecordORM(
+            user_id=mock_user.user_id,
+            exercise_id=squat.id,
+            best_weight=500.0,
+            best_estimated_one_rep_max=500.0,
+            best_volume=500.0,
+        )
+    )
+    await db_session.commit()
+
+    assert await rebuild_personal_records(db_session) == 3
+
+    records = await db_session.execute(
+        select(
+            PersonalRecordORM.user_id,
+            PersonalRecordORM.exercise_id,
+            PersonalRecordORM.best_weight,
+            PersonalRecordORM.best_estimated_one_rep_max,
+            PersonalRecordORM.best_volume,
+        ).order_by(PersonalRecordORM.user_id, PersonalRecordORM.exercise_id)
+    )
+    assert [tuple(record) for record in records] == [
+        (mock_admin_user.user_id, squat.id, 200.0, 225.0, 3000.0),
+        (mock_user.user_id, squat.id, 110.0, pytest.approx(120.0), 1500.0),
+        (mock_user.user_id, bench.id, 50.0, pytest.approx(50.0 * 36 / 27), 1500.0),
+    ]
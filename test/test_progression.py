@@ -0,0 +1,306 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from conftest import MockUser
+from litestar.testing import AsyncTestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import (
+    Exercise,
+    ExercisePlanORM,
+    ExerciseResult,
+    ProgressionReason,
+    WeekPlanORM,
+    WorkoutPlanORM,
+)
+from app.progression import Outcome, Target, is_stalled, next_session
+
+TARGET = Target(sets=3, reps=5, weight=100.0, rpe=8)
+
+
+def outcome(
+    sets: int = 3, reps: int = 5, weight: float = 100.0, rpe: int | None = 8
+) -> Outcome:
+    return Outcome(
+        id=uuid4(),
+        sets=sets,
+        reps=reps,
+        weight=weight,
+        rpe=rpe,
+        date=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+@pytest.mark.parametrize(
+    "target, last_session, stalled, expected",
+    [
+        (TARGET, None, False, (TARGET, ProgressionReason.planned)),
+        # As planned
+        (
+            TARGET,
+            outcome(),
+            False,
+            (Target(3, 5, 102.5, 8), ProgressionReason.increase),
+        ),
+        # Without an RPE, the session is taken to have gone as planned
+        (
+            TARGET,
+            outcome(rpe=None),
+            False,
+            (Target(3, 5, 102.5, 8), ProgressionReason.increase),
+        ),
+        # Easier than planned, from a heavier weight than planned
+        (
+            TARGET,
+            outcome(weight=200.0, rpe=6),
+            False,
+            (Target(3, 5, 210.0, 8), ProgressionReason.increase),
+        ),
+        (
+            TARGET,
+            outcome(rpe=9),
+            False,
+            (Target(3, 5, 100.0, 8), ProgressionReason.repeat),
+        ),
+        (
+            TARGET,
+            outcome(rpe=10),
+            False,
+            (Target(3, 5, 95.0, 8), ProgressionReason.reduce),
+        ),
+        (
+            TARGET,
+            outcome(reps=4, rpe=10),
+            False,
+            (Target(3, 5, 100.0, 8), ProgressionReason.repeat),
+        ),
+        (
+            TARGET,
+            outcome(sets=2, rpe=10),
+            True,
+            (Target(3, 5, 90.0, 8), ProgressionReason.deload),
+        ),
+        # Bodyweight exercises add reps
+        (
+            Target(sets=3, reps=8, weight=None, rpe=None),
+            outcome(reps=10, weight=0.0, rpe=6),
+            False,
+            (Target(3, 12, 0.0, None), ProgressionReason.increase),
+        ),
+        # Targets missing from the plan are taken from the last session
+        (
+            Target(sets=None, reps=None, weight=None, rpe=None),
+            outcome(sets=4, reps=6, weight=51.0, rpe=None),
+            False,
+            (Target(4, 6, 53.5, None), ProgressionReason.increase),
+        ),
+    ],
+)
+def test_next_session(
+    target: Target,
+    last_session: Outcome | None,
+    stalled: bool,
+    expected: tuple[Target, ProgressionReason],
+):
+    assert next_session(target, last_session, stalled) == expected
+
+
+def test_is_stalled():
+    assert not is_stalled([outcome(), outcome()])
+    assert is_stalled([outcome(reps=4), outcome(), outcome()])
+    assert not is_stalled([outcome(reps=4), outcome(reps=6), outcome()])
+    # Only the last few results count
+    assert is_stalled([outcome(), outcome(), outcome(), outcome(weight=50.0)])
+
+
+def exercise_plan(user: MockUser, exercise: Exercise, **targets) -> ExercisePlanORM:
+    return ExercisePlanORM(
+        user_id=user.user_id,
+        exercise_name=exercise.name,
+        exercise_id=exercise.id,
+        **targets,
+    )
+
+
+def week_plan(
+    user: MockUser,
+    created_at: datetime,
+    workouts: list[list[ExercisePlanORM]],
+) -> WeekPlanORM:
+    return WeekPlanORM(
+        user_id=user.user_id,
+        summary="A week of training",
+        created_at=created_at,
+        workout_plans=[
+            WorkoutPlanORM(
+                user_id=user.user_id,
+                title=f"Day {day}",
+                created_at=created_at,
+                exercise_plans=exercise_plans,
+            )
+            for day, exercise_plans in enumerate(workouts, start=1)
+        ],
+    )
+
+
+def on(year: int, month: int, day: int) -> datetime:
+    return datetime(year, month, day, 12, tzinfo=timezone.utc)
+
+
+def result(
+    user: MockUser,
+    exercise: Exercise,
+    date: datetime,
+    sets: int,
+    reps: int,
+    weight: float,
+    rpe: int | None,
+) -> ExerciseResult:
+    return ExerciseResult(
+        id=uuid4(),
+        user_id=user.user_id,
+        exercise_id=exercise.id,
+        sets=sets,
+        reps=reps,
+        weight=weight,
+        rpe=rpe,
+        date=date,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_progression_suggestions(
+    test_client: AsyncTestClient,
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_admin_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    exercises = {str(exercise.name): exercise for exercise in mock_exercises}
+    squat = exercises["Back Squat"]
+    bench = exercises["Bench Press"]
+    deadlift = exercises["Deadlift"]
+    strict_press = exercises["Strict Press"]
+    front_squat = exercises["Front Squat"]
+
+    linked_deadlift = result(mock_user, deadlift, on(2025, 1, 2), 3, 5, 140.0, 9)
+    db_session.add_all(
+        [
+            # Before the plan was made, so not an outcome of it
+            result(mock_user, squat, on(2024, 12, 21), 3, 5, 97.5, 8),
+            result(mock_user, squat, on(2025, 1, 3), 3, 5, 100.0, 6),
+            # Reps have dropped off over the last 3 sessions
+            result(mock_user, bench, on(2024, 12, 27), 3, 8, 60.0, 8),
+            result(mock_user, bench, on(2025, 1, 2), 3, 7, 60.0, 9),
+            result(mock_user, bench, on(2025, 1, 4), 3, 6, 60.0, 10),
+            linked_deadlift,
+            # Later, but not what the plan is linked to
+            result(mock_user, deadlift, on(2025, 1, 5), 1, 1, 180.0, 10),
+            # Another user's results aren't used
+            result(mock_admin_user, strict_press, on(2025, 1, 3), 5, 5, 40.0, 5),
+        ]
+    )
+    db_session.add_all(
+        [
+            week_plan(
+                mock_user,
+                datetime(2024, 12, 1, tzinfo=timezone.utc),
+                [[exercise_plan(mock_user, front_squat, sets=3, reps=5, weight=80.0)]],
+            ),
+            week_plan(
+                mock_user,
+                datetime(2025, 1, 1, tzinfo=timezone.utc),
+                [
+                    [
+                        exercise_plan(
+                            mock_user, squat, sets=3, reps=5, weight=100.0, rpe=8
+                        ),
+                        exercise_plan(mock_user, bench, sets=3, reps=8, weight=60.0),
+                        exercise_plan(
+                            mock_user,
+                            deadlift,
+                            sets=3,
+                            reps=5,
+                            weight=140.0,
+                            rpe=8,
+                            exercise_result_id=linked_deadlift.id,
+                        ),
+                    ],
+                    [
+                        exercise_plan(
+                            mock_user,
+                            strict_press,
+                            sets=4,
+                            reps=6,
+                            weight=40.0,
+                            rpe=7,
+                        ),
+                        exercise_plan(
+                            mock_user, deadlift, sets=2, reps=3, weight=150.0, rpe=8
+                        ),
+                    ],
+                ],
+            ),
+            week_plan(
+                mock_admin_user,
+                datetime(2025, 1, 2, tzinfo=timezone.utc),
+                [[exercise_plan(mock_admin_user, front_squat, sets=5, reps=5)]],
+            ),
+        ]
+    )
+    await db_session.commit()
+
+    response = await test_client.get(
+        "/api/progression/suggestions",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert response.status_code == 200
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+    suggestions = {
+        suggestion["exercise_name"]: (
+            suggestion["sets"],
+            suggestion["reps"],
+            suggestion["weight"],
+            suggestion["rpe"],
+            suggestion["reason"],
+        )
+        for suggestion in response.json()
+    }
+    assert suggestions == {
+        # 2 RPE easier than planned
+        "Back Squat": (3, 5, 105.0, 8, "increase"),
+        "Bench Press": (3, 8, 52.5, None, "deload"),
+        # From the linked result, 1 RPE harder than planned
+        "Deadlift": (3, 5, 140.0, 8, "repeat"),
+        "Strict Press": (4, 6, 40.0, 7, "planned"),
+    }
+    deadlift_suggestion = next(
+        suggestion
+        for suggestion in response.json()
+        if suggestion["exercise_id"] == deadlift.id
+    )
+    assert deadlift_suggestion["exercise_result_id"] == str(linked_deadlift.id)
+
+    response = await test_client.get(
+        "/api/progression/suggestions",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        params={"exercise_id": squat.id},
+    )
+    assert [suggestion["exercise_name"] for suggestion in response.json()] == [
+        "Back Squat"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_progression_suggestions_without_week_plan(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+):
+    response = await test_client.get(
+        "/api/progression/suggestions",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert response.status_code == 200
+    assert response.json() == []
+    assert 'desc="1 queries"' in response.headers["server-timing"]
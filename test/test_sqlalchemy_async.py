@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from app.models.models import Exercise
+from app.sqlalchemy_async import seed_default_exercises, verify_migrations
+
+
+@pytest.mark.asyncio
+async def test_seed_default_exercises(db_session: AsyncSession):
+    with open(
+        f"{Path(__file__).parent.parent}/app/data/default_exercises.json", "r"
+    ) as f:
+        default_exercises = json.load(f)
+
+    assert await seed_default_exercises(db_session) == len(default_exercises)
+    # Seeding again doesn't add anything
+    assert await seed_default_exercises(db_session) == 0
+
+    count = await db_session.scalar(select(func.count()).select_from(Exercise))
+    assert count == len(default_exercises)
+
+
+@pytest.mark.asyncio
+async def test_seed_default_exercises_keeps_existing_exercises(
+    db_session: AsyncSession,
+):
+    db_session.add(Exercise(name="Bear Crawl"))
+    await db_session.commit()
+
+    assert await seed_default_exercises(db_session) == 0
+
+
+@pytest.mark.asyncio
+async def test_verify_migrations(db_engine: AsyncEngine):
+    head = ScriptDirectory.from_config(Config("alembic.ini")).get_current_head()
+    async with db_engine.begin() as conn:
+        await conn.execute(
+            text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)")
+        )
+        await conn.execute(
+            text("INSERT INTO alembic_version VALUES (:head)"), {"head": head}
+        )
+
+    await verify_migrations(db_engine)
+
+    async with db_engine.begin() as conn:
+        await conn.execute(text("UPDATE alembic_version SET version_num = 'old'"))
+
+    with pytest.raises(RuntimeError, match="alembic upgrade head"):
+        await verify_migrations(db_engine)
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from conftest import MockUser
+from litestar.testing import AsyncTestClient
+
+from app.user_auth import AccessToken, User, VerifiedTokenCache
+
+
+def make_token(token: str, expires_in: timedelta) -> AccessToken:
+    now = datetime.now()
+    return AccessToken(exp=now + expires_in, iat=now, token=token)
+
+
+def make_user(user_id: str) -> User:
+    return User(name=user_id, user_id=user_id, picture="")
+
+
+@pytest.mark.asyncio
+async def test_verified_tokens_are_cached(
+    test_client: AsyncTestClient,
+    mock_firebase_auth: Mock,
+    mock_user: MockUser,
+):
+    verify_id_token = Mock(side_effect=mock_firebase_auth.verify_id_token)
+    mock_firebase_auth.verify_id_token = verify_id_token
+
+    for _ in range(3):
+        response = await test_client.get(
+            "/api/exercises",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        )
+        assert response.status_code == 200
+
+    assert verify_id_token.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_invalid_tokens_are_not_cached(
+    test_client: AsyncTestClient,
+    mock_firebase_auth: Mock,
+):
+    verify_id_token = Mock(side_effect=mock_firebase_auth.verify_id_token)
+    mock_firebase_auth.verify_id_token = verify_id_token
+
+    for _ in range(2):
+        response = await test_client.get(
+            "/api/exercises", headers={"Authorization": "Bearer invalid"}
+        )
+        assert response.status_code == 401
+
+    assert verify_id_token.call_count == 2
+
+
+def test_cache_respects_token_expiry():
+    cache = VerifiedTokenCache(max_size=10, ttl=300)
+    cache.put(make_user("expired"), make_token("expired", timedelta(seconds=-1)))
+    cache.put(make_user("valid"), make_token("valid", timedelta(hours=1)))
+
+    assert cache.get("expired") is None
+    cached = cache.get("valid")
+    assert cached is not None
+    assert cached[0].user_id == "valid"
+
+
+def test_cache_evicts_least_recently_used():
+    cache = VerifiedTokenCache(max_size=2, ttl=300)
+    for token in ["a", "b"]:
+        cache.put(make_user(token), make_token(token, timedelta(hours=1)))
+
+    cache.get("a")
+    cache.put(make_user("c"), make_token("c", timedelta(hours=1)))
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
@@ -136,3 +136,35 @@ async def test_delete_user_profile(
         headers={"Authorization": f"Bearer {mock_user.user_id}"},
     )
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_user_profile_not_modified(
+    test_client: AsyncTestClient,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+):
+    response = await test_client.get(
+        "/api/user_profile",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    etag = response.headers["etag"]
+
+    response = await test_client.get(
+        "/api/user_profile",
+        headers={"Authorization": f"Bearer {mock_user.user_id}", "If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
+    await test_client.patch(
+        "/api/user_profile",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json={"age": 21},
+    )
+    response = await test_client.get(
+        "/api/user_profile",
+        headers={"Authorization": f"Bearer {mock_user.user_id}", "If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.json()["age"] == 21
+    assert response.headers["etag"] != etag
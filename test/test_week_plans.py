@@ -1,22 +1,39 @@
+import asyncio
 import json
+import logging
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncGenerator
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import UUID
 
 import pytest
 import pytest_asyncio
-from conftest import MockUser
+from anthropic import APITimeoutError
+from anthropic.types import TextBlock, Usage
+from conftest import MockMessage, MockMessageStream, MockUser
+from httpx import Request
+from litestar import Litestar
 from litestar.testing import AsyncTestClient
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
+from app.llm.claude_prompts import SCREENING_PROMPT
 from app.models.models import (
     Exercise,
     ExercisePlanORM,
+    ScreeningResult,
+    ScreeningStatus,
     UserProfileORM,
     WarmUpPlanORM,
     WeekPlan,
+    WeekPlanJobORM,
+    WeekPlanJobStatus,
     WeekPlanORM,
     WorkoutPlanORM,
 )
+from app.week_plan_generation import insert_week_plan, save_screening_accepted
+from app.week_plan_jobs import WEEK_PLAN_JOB_LEASE_SECONDS
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -95,6 +112,18 @@ def mock_week_plan_response_json() -> dict[str, Any]:
         return json.load(f)
 
 
+@pytest.fixture(scope="function")
+def run_week_plan_jobs(test_app: Litestar, sqlalchemy_config):
+    """Run the queued week plan jobs, as the app's background workers would."""
+
+    async def run() -> int:
+        return await test_app.state.week_plan_job_workers.run_pending(
+            sqlalchemy_config.session_maker
+        )
+
+    return run
+
+
 @pytest_asyncio.fixture(scope="function")
 async def mock_week_plan_id(
     mock_week_plan: WeekPlanORM,
@@ -122,14 +151,30 @@ async def test_post_week_plan(
     mock_exercises: list[Exercise],
     db_session: AsyncSession,
     mock_week_plan_response_json: dict[str, Any],
+    run_week_plan_jobs,
 ):
-
     post_response = await test_client.post(
         "/api/week_plans",
         headers={"Authorization": f"Bearer {mock_user.user_id}"},
     )
-    assert post_response.status_code == 201
-    assert post_response.json() == mock_week_plan_response_json["week_plans"][0]
+    assert post_response.status_code == 202
+    job = post_response.json()
+    assert job["status"] == "pending"
+    assert job["stage"] == "queued"
+    assert job["week_plan_id"] is None
+
+    assert await run_week_plan_jobs() == 1
+
+    job_response = await test_client.get(
+        f"/api/week_plans/jobs/{job['id']}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert job_response.status_code == 200
+    job = job_response.json()
+    assert job["status"] == "succeeded"
+    assert job["stage"] == "done"
+    assert job["error"] is None
+    assert job["week_plan_id"] is not None
 
     get_response = await test_client.get(
         "/api/week_plans",
@@ -213,3 +258,882 @@ async def test_get_week_plans_not_found(
         headers={"Authorization": f"Bearer {mock_user.user_id}"},
     )
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_post_week_plan_when_llm_is_busy(
+    test_client: AsyncTestClient,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    run_week_plan_jobs,
+):
+    post_response = await test_client.post(
+        "/api/week_plans",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    job_id = post_response.json()["id"]
+
+    # No free slots, so the job should give up instead of queueing forever
+    with (
+        patch("app.llm.claude_client._concurrency_limit", asyncio.Semaphore(0)),
+        patch("app.llm.claude_client.ANTHROPIC_QUEUE_TIMEOUT", 0.01),
+    ):
+        assert await run_week_plan_jobs() == 1
+
+    job_response = await test_client.get(
+        f"/api/week_plans/jobs/{job_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    job = job_response.json()
+    # The LLM being busy is temporary, so the job is retried later
+    assert job["status"] == "pending"
+    assert job["stage"] == "queued"
+    assert job["error"] == (
+        "Too many workout plans are being generated, please try again shortly"
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_latest_week_plan_not_modified(
+    test_client: AsyncTestClient,
+    db_engine: AsyncEngine,
+    mock_user: MockUser,
+    mock_week_plan_id: str,
+):
+    response = await test_client.get(
+        "/api/week_plans/latest",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    etag = response.headers["etag"]
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        response = await test_client.get(
+            "/api/week_plans/latest",
+            headers={
+                "Authorization": f"Bearer {mock_user.user_id}",
+                "If-None-Match": etag,
+            },
+        )
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+    assert response.status_code == 304
+    # Only the version of the latest plan is read, not the plan itself
+    assert len(statements) == 1
+
+    await test_client.patch(
+        f"/api/week_plans/{mock_week_plan_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json={"complete": True},
+    )
+    response = await test_client.get(
+        "/api/week_plans/latest",
+        headers={"Authorization": f"Bearer {mock_user.user_id}", "If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.json()["complete"] is True
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_post_week_plan_caches_system_prompt(
+    test_client: AsyncTestClient,
+    mock_anthropic_client: AsyncMock,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    caplog: pytest.LogCaptureFixture,
+    run_week_plan_jobs,
+):
+    create = mock_anthropic_client.messages.create
+    system_prompts = []
+
+    async def create_and_capture(system, *args, **kwargs):
+        system_prompts.append(system)
+        message = await create(system, *args, **kwargs)
+        message.usage = Usage(
+            input_tokens=20,
+            output_tokens=500,
+            cache_read_input_tokens=1_500,
+            cache_creation_input_tokens=0,
+        )
+        return message
+
+    mock_anthropic_client.messages.create = create_and_capture
+
+    with caplog.at_level(logging.INFO, logger="app.llm.claude_client"):
+        for _ in range(2):
+            post_response = await test_client.post(
+                "/api/week_plans",
+                headers={"Authorization": f"Bearer {mock_user.user_id}"},
+            )
+            assert post_response.status_code == 202
+            assert await run_week_plan_jobs() == 1
+
+    workout_plan_prompts = [
+        system for system in system_prompts if system != SCREENING_PROMPT
+    ]
+    assert len(workout_plan_prompts) == 2
+    # The prompt is identical between requests and marked for caching
+    assert workout_plan_prompts[0] == workout_plan_prompts[1]
+    assert workout_plan_prompts[0][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "1500 cache read tokens" in caplog.text
+
+
+def parse_server_sent_events(text: str) -> list[tuple[str, str]]:
+    events = []
+    for raw_event in text.strip().split("\r\n\r\n"):
+        fields = dict(
+            line.split(": ", 1) for line in raw_event.splitlines() if ": " in line
+        )
+        events.append((fields["event"], fields["data"]))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_post_week_plan_stream(
+    test_client: AsyncTestClient,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    mock_week_plan_response_json: dict[str, Any],
+):
+    expected_week_plan = mock_week_plan_response_json["week_plans"][0]
+
+    response = await test_client.post(
+        "/api/week_plans/stream",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert response.status_code == 201
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_server_sent_events(response.text)
+    assert [event for event, _ in events] == ["workout", "workout", "week_plan"]
+    assert [json.loads(data) for _, data in events[:2]] == expected_week_plan[
+        "workouts"
+    ]
+    assert json.loads(events[-1][1]) == expected_week_plan
+
+    # The plan is saved once it has been streamed
+    get_latest_response = await test_client.get(
+        "/api/week_plans/latest",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert get_latest_response.json() == expected_week_plan
+
+
+@pytest.mark.asyncio
+async def test_post_week_plan_stream_when_llm_is_busy(
+    test_client: AsyncTestClient,
+    db_session: AsyncSession,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    await save_screening_accepted(db_session, mock_user_profile)
+    await db_session.commit()
+
+    with (
+        patch("app.llm.claude_client._concurrency_limit", asyncio.Semaphore(0)),
+        patch("app.llm.claude_client.ANTHROPIC_QUEUE_TIMEOUT", 0.01),
+    ):
+        response = await test_client.post(
+            "/api/week_plans/stream",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        )
+    # Rather than an error event after the stream has started
+    assert response.status_code == 503
+    assert response.json()["detail"] == (
+        "Too many workout plans are being generated, please try again shortly"
+    )
+
+
+@pytest.mark.asyncio
+async def test_post_week_plan_stream_timed_out_part_way(
+    test_client: AsyncTestClient,
+    mock_anthropic_client: AsyncMock,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    class TimedOutMessageStream(MockMessageStream):
+        @property
+        async def text_stream(self) -> AsyncGenerator[str, None]:
+            yield '{"summary": "A week of training", '
+            raise APITimeoutError(request=Request("POST", "https://example.com"))
+
+    message = MockMessage(role="assistant", content=[])
+    mock_anthropic_client.messages.stream = Mock(
+        return_value=TimedOutMessageStream(message)
+    )
+    slot = asyncio.Semaphore(1)
+
+    with patch("app.llm.claude_client._concurrency_limit", slot):
+        response = await test_client.post(
+            "/api/week_plans/stream",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        )
+    assert response.status_code == 201
+    assert parse_server_sent_events(response.text) == [
+        ("error", "Timed out waiting for the workout plan")
+    ]
+    # The slot is released once the stream has ended
+    assert not slot.locked()
+
+
+@pytest.mark.asyncio
+async def test_post_week_plan_stream_without_user_profile(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+):
+    response = await test_client.post(
+        "/api/week_plans/stream",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert response.status_code == 412
+
+
+@pytest.mark.asyncio
+async def test_post_week_plan_reuses_job_in_progress(
+    test_client: AsyncTestClient,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    run_week_plan_jobs,
+):
+    responses = [
+        await test_client.post(
+            "/api/week_plans",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        )
+        for _ in range(2)
+    ]
+    assert responses[0].json()["id"] == responses[1].json()["id"]
+    assert await run_week_plan_jobs() == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_enqueues_share_one_job(
+    test_app: Litestar,
+    sqlalchemy_config,
+    db_session: AsyncSession,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    run_week_plan_jobs,
+):
+    workers = test_app.state.week_plan_job_workers
+
+    async def enqueue() -> UUID:
+        async with sqlalchemy_config.session_maker() as session:
+            job = await workers.enqueue(session, mock_user.user_id)
+            return job.id
+
+    job_ids = await asyncio.gather(*(enqueue() for _ in range(3)))
+    assert len(set(job_ids)) == 1
+    jobs = (await db_session.scalars(select(WeekPlanJobORM))).all()
+    assert [job.id for job in jobs] == job_ids[:1]
+
+    # Once the job has finished, the next one is queued separately
+    assert await run_week_plan_jobs() == 1
+    assert await enqueue() != job_ids[0]
+
+
+@pytest.mark.asyncio
+async def test_week_plan_job_rejected_by_screening(
+    test_client: AsyncTestClient,
+    mock_anthropic_client: AsyncMock,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    run_week_plan_jobs,
+):
+    rejection = ScreeningResult(
+        status=ScreeningStatus.rejected, reason="Please see a doctor first"
+    )
+
+    async def create(system, *args, **kwargs):
+        content = Mock(spec=TextBlock)
+        content.text = rejection.model_dump_json()
+        return MockMessage(role="assistant", content=[content])
+
+    mock_anthropic_client.messages.create = create
+
+    post_response = await test_client.post(
+        "/api/week_plans",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    job_id = post_response.json()["id"]
+    assert await run_week_plan_jobs() == 1
+
+    job_response = await test_client.get(
+        f"/api/week_plans/jobs/{job_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    job = job_response.json()
+    # Retrying won't change the verdict, so the job fails straight away
+    assert job["status"] == "failed"
+    assert job["error"] == "Please see a doctor first"
+    assert job["week_plan_id"] is None
+
+
+@pytest.mark.asyncio
+async def test_abandoned_week_plan_job_is_picked_up_again(
+    test_client: AsyncTestClient,
+    db_session: AsyncSession,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    run_week_plan_jobs,
+):
+    post_response = await test_client.post(
+        "/api/week_plans",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    job_id = UUID(post_response.json()["id"])
+
+    # As if a worker claimed the job and then its pod was rolled
+    await db_session.execute(
+        update(WeekPlanJobORM)
+        .where(WeekPlanJobORM.id == job_id)
+        .values(
+            status=WeekPlanJobStatus.running,
+            attempts=1,
+            updated_at=datetime.now(timezone.utc)
+            - timedelta(seconds=WEEK_PLAN_JOB_LEASE_SECONDS + 1),
+        )
+    )
+    await db_session.commit()
+
+    assert await run_week_plan_jobs() == 1
+
+    job_response = await test_client.get(
+        f"/api/week_plans/jobs/{job_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert job_response.json()["status"] == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_get_week_plan_job_of_another_user(
+    test_client: AsyncTestClient,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_admin_user: MockUser,
+):
+    post_response = await test_client.post(
+        "/api/week_plans",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    job_response = await test_client.get(
+        f"/api/week_plans/jobs/{post_response.json()['id']}",
+        headers={"Authorization": f"Bearer {mock_admin_user.user_id}"},
+    )
+    assert job_response.status_code == 404
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("speculative", [False, True])
+async def test_week_plan_job_records_stage_timings(
+    test_app: Litestar,
+    test_client: AsyncTestClient,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    mock_week_plan_response_json: dict[str, Any],
+    run_week_plan_jobs,
+    caplog: pytest.LogCaptureFixture,
+    speculative: bool,
+):
+    test_app.state.week_plan_job_workers.speculative = speculative
+
+    await test_client.post(
+        "/api/week_plans",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    with caplog.at_level(logging.INFO, logger="app.week_plan_jobs"):
+        assert await run_week_plan_jobs() == 1
+
+    mode = "speculative" if speculative else "sequential"
+    assert f"({mode}): profile" in caplog.text
+    for stage in ["screening", "catalogue", "generation", "saving", "total"]:
+        assert f"{stage} " in caplog.text
+
+    get_latest_response = await test_client.get(
+        "/api/week_plans/latest",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert get_latest_response.json() == mock_week_plan_response_json["week_plans"][0]
+
+
+@pytest.mark.asyncio
+async def test_speculative_generation_is_cancelled_by_screening_rejection(
+    test_app: Litestar,
+    test_client: AsyncTestClient,
+    mock_anthropic_client: AsyncMock,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    run_week_plan_jobs,
+):
+    test_app.state.week_plan_job_workers.speculative = True
+    generation_started = asyncio.Event()
+    generation_cancelled = asyncio.Event()
+
+    async def create(system, *args, **kwargs):
+        if system != SCREENING_PROMPT:
+            generation_started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                generation_cancelled.set()
+                raise
+
+        # Only reject once the plan is being generated alongside screening
+        await generation_started.wait()
+        content = Mock(spec=TextBlock)
+        content.text = ScreeningResult(
+            status=ScreeningStatus.rejected, reason="Please see a doctor first"
+        ).model_dump_json()
+        return MockMessage(role="assistant", content=[content])
+
+    mock_anthropic_client.messages.create = create
+
+    post_response = await test_client.post(
+        "/api/week_plans",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert await run_week_plan_jobs() == 1
+    assert generation_cancelled.is_set()
+
+    job_response = await test_client.get(
+        f"/api/week_plans/jobs/{post_response.json()['id']}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    job = job_response.json()
+    assert job["status"] == "failed"
+    assert job["error"] == "Please see a doctor first"
+    assert job["week_plan_id"] is None
+
+
+@pytest.mark.asyncio
+async def test_screening_is_skipped_for_unchanged_profile(
+    test_client: AsyncTestClient,
+    mock_anthropic_client: AsyncMock,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    run_week_plan_jobs,
+):
+    create = mock_anthropic_client.messages.create
+    screenings = 0
+
+    async def create_and_count(system, *args, **kwargs):
+        nonlocal screenings
+        if system == SCREENING_PROMPT:
+            screenings += 1
+        return await create(system, *args, **kwargs)
+
+    mock_anthropic_client.messages.create = create_and_count
+
+    async def generate_week_plan():
+        await test_client.post(
+            "/api/week_plans",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        )
+        assert await run_week_plan_jobs() == 1
+
+    await generate_week_plan()
+    await generate_week_plan()
+    assert screenings == 1
+
+    # Changing the profile means it has to be screened again
+    patch_response = await test_client.patch(
+        "/api/user_profile",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json={"goal": "build muscle"},
+    )
+    assert patch_response.status_code == 200
+    await generate_week_plan()
+    assert screenings == 2
+
+
+@pytest.mark.asyncio
+async def test_rejected_screening_is_not_remembered(
+    test_client: AsyncTestClient,
+    mock_anthropic_client: AsyncMock,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    run_week_plan_jobs,
+):
+    create = mock_anthropic_client.messages.create
+    screenings = 0
+
+    async def reject_once(system, *args, **kwargs):
+        nonlocal screenings
+        if system == SCREENING_PROMPT:
+            screenings += 1
+            if screenings == 1:
+                content = Mock(spec=TextBlock)
+                content.text = ScreeningResult(
+                    status=ScreeningStatus.rejected, reason="Please see a doctor first"
+                ).model_dump_json()
+                return MockMessage(role="assistant", content=[content])
+        return await create(system, *args, **kwargs)
+
+    mock_anthropic_client.messages.create = reject_once
+
+    for expected_status in ["failed", "succeeded"]:
+        post_response = await test_client.post(
+            "/api/week_plans",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        )
+        assert await run_week_plan_jobs() == 1
+        job_response = await test_client.get(
+            f"/api/week_plans/jobs/{post_response.json()['id']}",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        )
+        assert job_response.json()["status"] == expected_status
+    assert screenings == 2
+
+
+@pytest.mark.asyncio
+async def test_week_plan_is_saved_with_one_insert_per_table(
+    test_client: AsyncTestClient,
+    db_engine: AsyncEngine,
+    mock_user_profile: UserProfileORM,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+    mock_week_plan_response_json: dict[str, Any],
+    run_week_plan_jobs,
+):
+    await test_client.post(
+        "/api/week_plans",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+
+    inserts = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            inserts.append(statement.split()[2])
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        assert await run_week_plan_jobs() == 1
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert inserts == [
+        "screening_verdicts",
+        "week_plans",
+        "workout_plans",
+        "warm_up_plans",
+        "exercise_plans",
+    ]
+
+    get_latest_response = await test_client.get(
+        "/api/week_plans/latest",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert get_latest_response.json() == mock_week_plan_response_json["week_plans"][0]
+
+
+@pytest.mark.asyncio
+async def test_get_week_plans_loads_each_table_once(
+    test_client: AsyncTestClient,
+    db_engine: AsyncEngine,
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    with open(f"{Path(__file__).parent}/data/two_day_plan.json", "r") as f:
+        week_plan = WeekPlan.model_validate(json.load(f))
+    exercise_name_to_id = {
+        str(exercise.name): exercise.id for exercise in mock_exercises
+    }
+    weeks = 12
+    for _ in range(weeks):
+        await insert_week_plan(
+            db_session, week_plan, mock_user.user_id, exercise_name_to_id
+        )
+    await db_session.commit()
+
+    selects = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT"):
+            selects.append((statement, parameters))
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        response = await test_client.get(
+            "/api/week_plans",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        )
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert response.status_code == 200
+    assert len(response.json()["week_plans"]) == weeks
+    assert 'desc="4 queries"' in response.headers["server-timing"]
+
+    # Each table should be read once, fetching one row per object rather than a row
+    # per combination of a workout's warm-ups and exercises
+    rows = {}
+    async with db_engine.connect() as conn:
+        for statement, parameters in selects:
+            table = statement.split("FROM")[1].split()[0]
+            result = await conn.exec_driver_sql(statement, parameters)
+            rows[table] = len(result.all())
+    assert len(rows) == len(selects)
+    assert rows == {
+        "week_plans": weeks,
+        "workout_plans": weeks * len(week_plan.workouts),
+        "warm_up_plans": weeks
+        * sum(len(workout.warm_ups) for workout in week_plan.workouts),
+        "exercise_plans": weeks
+        * sum(len(workout.exercises) for workout in week_plan.workouts),
+    }
+
+
+@pytest_asyncio.fixture(scope="function")
+async def mock_week_plan_history(
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+) -> list[WeekPlanORM]:
+    """Three weeks of plans, the oldest of which is complete, most recent first."""
+    with open(f"{Path(__file__).parent}/data/two_day_plan.json", "r") as f:
+        week_plan = WeekPlan.model_validate(json.load(f))
+    exercise_name_to_id = {
+        str(exercise.name): exercise.id for exercise in mock_exercises
+    }
+    now = datetime.now(timezone.utc)
+    for weeks_ago in range(3):
+        week_plan_id = await insert_week_plan(
+            db_session, week_plan, mock_user.user_id, exercise_name_to_id
+        )
+        await db_session.execute(
+            update(WeekPlanORM)
+            .where(WeekPlanORM.id == week_plan_id)
+            .values(created_at=now - timedelta(weeks=weeks_ago), complete=weeks_ago > 1)
+        )
+        await db_session.execute(
+            update(WorkoutPlanORM)
+            .where(WorkoutPlanORM.week_plan_id == week_plan_id)
+            .values(complete=weeks_ago > 1)
+        )
+    await db_session.commit()
+
+    week_plans = await db_session.scalars(
+        select(WeekPlanORM)
+        .where(WeekPlanORM.user_id == mock_user.user_id)
+        .order_by(WeekPlanORM.created_at.desc())
+    )
+    return list(week_plans)
+
+
+@pytest.mark.asyncio
+async def test_get_week_plan_summaries(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_week_plan_history: list[WeekPlanORM],
+):
+    pages = []
+    params: dict[str, Any] = {"limit": 2}
+    while True:
+        response = await test_client.get(
+            "/api/week_plans/summaries",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+            params=params,
+        )
+        assert response.status_code == 200
+        pages.append(response.json())
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+
+    assert [len(page) for page in pages] == [2, 1]
+    summaries: list[dict[str, Any]] = sum(pages, [])
+    assert [summary["id"] for summary in summaries] == [
+        str(week_plan.id) for week_plan in mock_week_plan_history
+    ]
+    assert {
+        key: value
+        for key, value in summaries[-1].items()
+        if key not in ("id", "created_at")
+    } == {
+        "summary": mock_week_plan_history[-1].summary,
+        "complete": True,
+        "workout_count": 2,
+        "completed_workout_count": 2,
+        "exercise_count": 10,
+    }
+    assert summaries[0]["complete"] is False
+    assert summaries[0]["completed_workout_count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_get_week_plan_summaries_reads_only_week_plans(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_week_plan_history: list[WeekPlanORM],
+):
+    response = await test_client.get(
+        "/api/week_plans/summaries",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert 'desc="1 queries"' in response.headers["server-timing"]
+
+
+@pytest.mark.asyncio
+async def test_get_week_plan_summaries_invalid_cursor(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+):
+    response = await test_client.get(
+        "/api/week_plans/summaries",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        params={"limit": 2, "cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_week_plan_by_id(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_admin_user: MockUser,
+    mock_week_plan_id: UUID,
+    mock_week_plan_response_json: dict[str, Any],
+):
+    response = await test_client.get(
+        f"/api/week_plans/{mock_week_plan_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert response.status_code == 200
+    assert response.json() == mock_week_plan_response_json["week_plans"][0]
+
+    response = await test_client.get(
+        f"/api/week_plans/{mock_week_plan_id}",
+        headers={
+            "Authorization": f"Bearer {mock_user.user_id}",
+            "If-None-Match": response.headers["etag"],
+        },
+    )
+    assert response.status_code == 304
+
+    response = await test_client.get(
+        f"/api/week_plans/{mock_week_plan_id}",
+        headers={"Authorization": f"Bearer {mock_admin_user.user_id}"},
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_patch_week_plan_statements_do_not_grow_with_plan_size(
+    test_client: AsyncTestClient,
+    db_engine: AsyncEngine,
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    with open(f"{Path(__file__).parent}/data/two_day_plan.json", "r") as f:
+        week_plan = WeekPlan.model_validate(json.load(f))
+    exercise_name_to_id = {
+        str(exercise.name): exercise.id for exercise in mock_exercises
+    }
+
+    statements = {}
+    for days in (2, 6):
+        plan = week_plan.model_copy(
+            update={"workouts": (week_plan.workouts * days)[:days]}
+        )
+        week_plan_id = await insert_week_plan(
+            db_session, plan, mock_user.user_id, exercise_name_to_id
+        )
+        await db_session.commit()
+
+        executed = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            executed.append(statement.split()[0])
+
+        event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            response = await test_client.patch(
+                f"/api/week_plans/{week_plan_id}",
+                headers={"Authorization": f"Bearer {mock_user.user_id}"},
+                json={"complete": True},
+            )
+        finally:
+            event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+
+        assert response.status_code == 200
+        assert response.json()["complete"] is True
+        assert len(response.json()["workouts"]) == days
+        for workout in response.json()["workouts"]:
+            assert workout["complete"] is True
+            assert all(exercise["complete"] for exercise in workout["exercises"])
+        statements[days] = executed
+
+    # One UPDATE per table, then the plan is read back with one SELECT per table
+    assert statements[2] == statements[6] == ["UPDATE"] * 3 + ["SELECT"] * 4
+
+
+@pytest.mark.asyncio
+async def test_patch_week_plan_changes_its_etag(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_week_plan_id: UUID,
+):
+    response = await test_client.get(
+        f"/api/week_plans/{mock_week_plan_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    etag = response.headers["etag"]
+
+    await test_client.patch(
+        f"/api/week_plans/{mock_week_plan_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json={"complete": True},
+    )
+
+    response = await test_client.get(
+        f"/api/week_plans/{mock_week_plan_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}", "If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_patch_week_plan_of_another_user(
+    test_client: AsyncTestClient,
+    db_session: AsyncSession,
+    mock_admin_user: MockUser,
+    mock_week_plan_id: UUID,
+):
+    response = await test_client.patch(
+        f"/api/week_plans/{mock_week_plan_id}",
+        headers={"Authorization": f"Bearer {mock_admin_user.user_id}"},
+        json={"complete": True},
+    )
+    assert response.status_code == 404
+
+    complete = await db_session.scalar(
+        select(WorkoutPlanORM.complete).where(
+            WorkoutPlanORM.week_plan_id == mock_week_plan_id
+        )
+    )
+    assert complete is False
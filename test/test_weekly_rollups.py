@@ -0,0 +1,217 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from conftest import MockUser
+from litestar.testing import AsyncTestClient
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Exercise, ExerciseResult, WeeklyRollupORM
+from app.weekly_rollups import (
+    rebuild_weekly_rollups,
+    verify_weekly_rollups,
+    week_start_of,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (datetime(2025, 1, 6, 0, 0, tzinfo=timezone.utc), date(2025, 1, 6)),
+        (datetime(2025, 1, 12, 23, 59, tzinfo=timezone.utc), date(2025, 1, 6)),
+        # Monday morning in UTC+2 is still Sunday in UTC
+        (
+            datetime(2025, 1, 13, 1, 0, tzinfo=timezone(timedelta(hours=2))),
+            date(2025, 1, 6),
+        ),
+        # Naive datetimes are taken to be in UTC
+        (datetime(2025, 1, 13, 1, 0), date(2025, 1, 13)),
+    ],
+)
+def test_week_start_of(value: datetime, expected: date):
+    assert week_start_of(value) == expected
+
+
+async def post_result(
+    test_client: AsyncTestClient, user: MockUser, **result: Any
+) -> str:
+    response = await test_client.post(
+        "/api/exercise_results",
+        headers={"Authorization": f"Bearer {user.user_id}"},
+        json=result,
+    )
+    assert response.status_code == 201
+    return response.text
+
+
+async def get_rollups(
+    test_client: AsyncTestClient, user: MockUser, **params: Any
+) -> list[tuple]:
+    response = await test_client.get(
+        "/api/weekly_rollups",
+        headers={"Authorization": f"Bearer {user.user_id}"},
+        params=params,
+    )
+    assert response.status_code == 200
+    return [
+        (
+            rollup["exercise_id"],
+            rollup["week_start"],
+            rollup["result_count"],
+            rollup["sets"],
+            rollup["reps"],
+            rollup["volume"],
+        )
+        for rollup in response.json()
+    ]
+
+
+@pytest.mark.asyncio
+async def test_weekly_rollups_follow_result_changes(
+    test_client: AsyncTestClient,
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    squat, bench = mock_exercises[:2]
+    sunday = "2025-01-12T23:30:00Z"
+    monday = "2025-01-13T08:00:00Z"
+
+    first_id = await post_result(
+        test_client,
+        mock_user,
+        exercise_id=squat.id,
+        sets=3,
+        reps=5,
+        weight=100.0,
+        date=sunday,
+    )
+    await post_result(
+        test_client,
+        mock_user,
+        exercise_id=squat.id,
+        sets=2,
+        reps=5,
+        weight=110.0,
+        date=sunday,
+    )
+    response = await test_client.post(
+        "/api/exercise_results/batch",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json={
+            "exercise_results": [
+                {
+                    "exercise_id": squat.id,
+                    "sets": 5,
+                    "reps": 5,
+                    "weight": 80.0,
+                    "date": monday,
+                },
+                {
+                    "exercise_id": bench.id,
+                    "sets": 3,
+                    "reps": 10,
+                    "weight": 40.0,
+                    "date": monday,
+                },
+                # Results without an exercise aren't rolled up
+                {"sets": 3, "reps": 10, "weight": 40.0, "date": monday},
+            ]
+        },
+    )
+    assert response.status_code == 201
+    bench_id = response.json()[1]["id"]
+
+    assert await get_rollups(test_client, mock_user) == [
+        (squat.id, "2025-01-06", 2, 5, 25, 2600.0),
+        (squat.id, "2025-01-13", 1, 5, 25, 2000.0),
+        (bench.id, "2025-01-13", 1, 3, 30, 1200.0),
+    ]
+
+    # Moving a result to the next week moves its contribution with it
+    await test_client.patch(
+        f"/api/exercise_results/{first_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json={"date": monday, "reps": 4},
+    )
+    # As does moving a result to another exercise
+    await test_client.patch(
+        f"/api/exercise_results/{bench_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json={"exercise_id": squat.id},
+    )
+    assert await get_rollups(test_client, mock_user) == [
+        (squat.id, "2025-01-06", 1, 2, 10, 1100.0),
+        (squat.id, "2025-01-13", 3, 11, 67, 4400.0),
+    ]
+
+    await test_client.delete(
+        f"/api/exercise_results/{bench_id}",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert await get_rollups(test_client, mock_user, **{"from": "2025-01-13"}) == [
+        (squat.id, "2025-01-13", 2, 8, 37, 3200.0),
+    ]
+
+    assert await verify_weekly_rollups(db_session) == []
+
+
+@pytest.mark.asyncio
+async def test_verify_and_rebuild_weekly_rollups(
+    test_client: AsyncTestClient,
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_exercises: list[Exercise],
+):
+    squat, bench = mock_exercises[:2]
+    for exercise, day in [(squat, 6), (squat, 13), (bench, 13)]:
+        await post_result(
+            test_client,
+            mock_user,
+            exercise_id=exercise.id,
+            sets=3,
+            reps=5,
+            weight=100.0,
+            date=f"2025-01-{day:02}T12:00:00Z",
+        )
+
+    # A result added without its rollup, a rollup changed, and one removed
+    db_session.add(
+        ExerciseResult(
+            user_id=mock_user.user_id,
+            exercise_id=bench.id,
+            sets=1,
+            reps=1,
+            weight=50.0,
+            date=datetime(2025, 1, 20, tzinfo=timezone.utc),
+        )
+    )
+    await db_session.execute(
+        update(WeeklyRollupORM)
+        .where(WeeklyRollupORM.week_start == date(2025, 1, 6))
+        .values(sets=4)
+    )
+    await db_session.execute(
+        delete(WeeklyRollupORM).where(WeeklyRollupORM.exercise_id == bench.id)
+    )
+    await db_session.commit()
+
+    mismatches = await verify_weekly_rollups(db_session)
+    assert [
+        (
+            mismatch.exercise_id,
+            mismatch.week_start,
+            mismatch.expected.sets if mismatch.expected else None,
+            mismatch.actual.sets if mismatch.actual else None,
+        )
+        for mismatch in mismatches
+    ] == [
+        (squat.id, date(2025, 1, 6), 3, 4),
+        (bench.id, date(2025, 1, 13), 3, None),
+        (bench.id, date(2025, 1, 20), 1, None),
+    ]
+
+    await rebuild_weekly_rollups(db_session)
+    assert await verify_weekly_rollups(db_session) == []
+    assert len(await get_rollups(test_client, mock_user)) == 4
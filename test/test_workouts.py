@@ -4,9 +4,13 @@ import pytest
 import pytest_asyncio
 from conftest import MockUser
 from litestar.testing import AsyncTestClient
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
+from app.exercise_results import weekly_stats_query
 from app.models.models import Exercise, ExerciseResult
+from app.sql_functions import iso_week_start
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -111,3 +115,301 @@ async def test_post_and_get_exercise_result(
         "updated_at": updated_at,
         "created_at": created_at,
     }
+
+
+@pytest_asyncio.fixture(scope="function")
+async def mock_exercise_result_history(
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_exercise: Exercise,
+) -> list[ExerciseResult]:
+    # Two results share a date so that pages have to be split on id as well
+    dates = [datetime(2025, 1, day, tzinfo=timezone.utc) for day in [1, 2, 2, 3, 4]]
+    exercise_results = [
+        ExerciseResult(
+            exercise_id=mock_exercise.id,
+            sets=3,
+            reps=5,
+            weight=60.0 + index,
+            user_id=mock_user.user_id,
+            date=date,
+        )
+        for index, date in enumerate(dates)
+    ]
+    db_session.add_all(exercise_results)
+    await db_session.commit()
+    return exercise_results
+
+
+@pytest.mark.asyncio
+async def test_get_exercise_results_pages(
+    test_client: AsyncTestClient,
+    mock_exercise_result_history: list[ExerciseResult],
+    mock_user: MockUser,
+):
+    pages = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        response = await test_client.get(
+            "/api/exercise_results",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+            params=params,
+        )
+        assert response.status_code == 200
+        pages.append([result["id"] for result in response.json()])
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+
+    expected_ids = [
+        str(result.id)
+        for result in sorted(
+            mock_exercise_result_history,
+            key=lambda result: (result.date, result.id),
+            reverse=True,
+        )
+    ]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == expected_ids
+
+
+@pytest.mark.asyncio
+async def test_get_exercise_results_between_dates(
+    test_client: AsyncTestClient,
+    mock_exercise_result_history: list[ExerciseResult],
+    mock_user: MockUser,
+):
+    response = await test_client.get(
+        "/api/exercise_results",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        params={"from": "2025-01-02T00:00:00Z", "to": "2025-01-04T00:00:00Z"},
+    )
+    assert response.status_code == 200
+    assert [result["date"][:10] for result in response.json()] == [
+        "2025-01-03",
+        "2025-01-02",
+        "2025-01-02",
+    ]
+    assert "x-next-cursor" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_get_exercise_results_invalid_cursor(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+):
+    response = await test_client.get(
+        "/api/exercise_results",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        params={"limit": 2, "cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_post_exercise_results_batch(
+    test_client: AsyncTestClient,
+    db_engine: AsyncEngine,
+    mock_user: MockUser,
+    mock_exercise: Exercise,
+):
+    batch = {
+        "exercise_results": [
+            {
+                "exercise_id": mock_exercise.id,
+                "sets": 3,
+                "reps": reps,
+                "weight": 60.0,
+                "date": f"2025-05-0{reps}T10:00:00Z",
+                "idempotency_key": f"sync-1-{reps}",
+            }
+            for reps in range(1, 6)
+        ]
+    }
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        response = await test_client.post(
+            "/api/exercise_results/batch",
+            headers={"Authorization": f"Bearer {mock_user.user_id}"},
+            json=batch,
+        )
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert response.status_code == 201
+    results = response.json()
+    assert [result["created"] for result in results] == [True] * 5
+    inserts = [s for s in statements if s.startswith("INSERT INTO exercise_results")]
+    assert len(inserts) == 1
+
+    # Retrying the sync, with one more result, only records the new result
+    batch["exercise_results"].append(
+        {
+            "exercise_id": mock_exercise.id,
+            "sets": 3,
+            "reps": 6,
+            "weight": 60.0,
+            "idempotency_key": "sync-2-1",
+        }
+    )
+    retry_response = await test_client.post(
+        "/api/exercise_results/batch",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json=batch,
+    )
+    assert retry_response.status_code == 201
+    retry_results = retry_response.json()
+    assert retry_results[:5] == [{**result, "created": False} for result in results]
+    assert retry_results[5]["created"] is True
+
+    get_response = await test_client.get(
+        "/api/exercise_results",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    exercise_results = get_response.json()
+    assert len(exercise_results) == 6
+    assert "idempotency_key" not in exercise_results[0]
+    assert {result["id"] for result in exercise_results} == {
+        result["id"] for result in retry_results
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "exercise_results",
+    [
+        [],
+        [
+            {"sets": 3, "reps": 5, "weight": 60.0, "idempotency_key": "a"},
+            {"sets": 3, "reps": 5, "weight": 60.0, "idempotency_key": "a"},
+        ],
+        [{"exercise_id": 999, "sets": 3, "reps": 5, "weight": 60.0}],
+    ],
+)
+async def test_post_exercise_results_batch_rejects_invalid_batches(
+    test_client: AsyncTestClient,
+    mock_user: MockUser,
+    mock_exercise: Exercise,
+    exercise_results: list[dict],
+):
+    response = await test_client.post(
+        "/api/exercise_results/batch",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        json={"exercise_results": exercise_results},
+    )
+    assert response.status_code == 400
+
+
+@pytest_asyncio.fixture(scope="function")
+async def mock_weekly_exercise_results(
+    db_session: AsyncSession,
+    mock_user: MockUser,
+    mock_admin_user: MockUser,
+    mock_exercises: list[Exercise],
+) -> list[ExerciseResult]:
+    squat, bench = mock_exercises[:2]
+    # Sunday night and Monday morning fall in different ISO weeks
+    results = [
+        (mock_user, squat, 3, 5, 60.0, datetime(2025, 1, 5, 23, 30)),
+        (mock_user, squat, 3, 5, 70.0, datetime(2025, 1, 6, 0, 10)),
+        (mock_user, squat, 2, 5, 80.0, datetime(2025, 1, 8, 18)),
+        (mock_user, bench, 3, 10, 20.0, datetime(2025, 1, 7, 18)),
+        (mock_admin_user, squat, 5, 5, 200.0, datetime(2025, 1, 7, 18)),
+    ]
+    exercise_results = [
+        ExerciseResult(
+            user_id=user.user_id,
+            exercise_id=exercise.id,
+            sets=sets,
+            reps=reps,
+            weight=weight,
+            date=date.replace(tzinfo=timezone.utc),
+        )
+        for user, exercise, sets, reps, weight, date in results
+    ]
+    db_session.add_all(exercise_results)
+    await db_session.commit()
+    return exercise_results
+
+
+@pytest.mark.asyncio
+async def test_get_exercise_result_stats(
+    test_client: AsyncTestClient,
+    mock_exercises: list[Exercise],
+    mock_weekly_exercise_results: list[ExerciseResult],
+    mock_user: MockUser,
+):
+    squat, bench = mock_exercises[:2]
+    response = await test_client.get(
+        "/api/exercise_results/stats",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "exercises": [
+            {
+                "exercise_id": squat.id,
+                "week_starts": ["2024-12-30", "2025-01-06"],
+                "volume": [900.0, 1850.0],
+                "sets": [3, 5],
+                "max_weight": [60.0, 80.0],
+                "best_weight": 80.0,
+                "best_volume": 1850.0,
+            },
+            {
+                "exercise_id": bench.id,
+                "week_starts": ["2025-01-06"],
+                "volume": [600.0],
+                "sets": [3],
+                "max_weight": [20.0],
+                "best_weight": 20.0,
+                "best_volume": 600.0,
+            },
+        ],
+        "week_starts": ["2024-12-30", "2025-01-06"],
+        "tonnage": [900.0, 2450.0],
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_exercise_result_stats_between_dates(
+    test_client: AsyncTestClient,
+    mock_weekly_exercise_results: list[ExerciseResult],
+    mock_user: MockUser,
+):
+    response = await test_client.get(
+        "/api/exercise_results/stats",
+        headers={"Authorization": f"Bearer {mock_user.user_id}"},
+        params={"from": "2025-01-06T00:00:00", "to": "2025-01-08T00:00:00"},
+    )
+    assert response.status_code == 200
+    assert response.json()["week_starts"] == ["2025-01-06"]
+    assert response.json()["tonnage"] == [1050.0 + 600.0]
+
+
+@pytest.mark.asyncio
+async def test_exercise_result_stats_use_the_user_date_index(
+    db_engine: AsyncEngine,
+    mock_user: MockUser,
+):
+    query = weekly_stats_query(mock_user.user_id, from_date=datetime(2025, 1, 1))
+    compiled = query.compile(db_engine, compile_kwargs={"literal_binds": True})
+    async with db_engine.connect() as conn:
+        plan = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")
+        details = " ".join(row.detail for row in plan)
+    assert "ix_exercise_results_user_id_date" in details
+
+
+def test_iso_week_start_compiles_for_mysql():
+    query = select(iso_week_start(ExerciseResult.date))
+    assert str(query.compile(dialect=mysql.dialect())) == (
+        "SELECT DATE(DATE_SUB(exercise_results.date, "
+        "INTERVAL WEEKDAY(exercise_results.date) DAY)) AS iso_week_start_1 \n"
+        "FROM exercise_results"
+    )